@@ -0,0 +1,116 @@
+"""
+Compare wall time of the single-pass segmenter in split_video against the
+previous one-ffmpeg-call-per-part loop, on synthetic audio generated with
+ffmpeg's lavfi source.
+
+Usage:
+    python benchmarks/bench_split_video.py --duration 10800 --max-size-mb 5
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+from tempfile import mkdtemp
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from domain.handler.donwload_audio import split_video
+from infra.media import MediaRunner
+from synthetic_audio import make_audio
+
+
+def get_video_duration(file_path: str) -> int:
+    cmd = [
+        'ffprobe', '-i', file_path,
+        '-show_entries', 'format=duration',
+        '-v', 'quiet',
+        '-of', 'default=noprint_wrappers=1:nokey=1'
+    ]
+    output = subprocess.check_output(cmd).decode().strip()
+    return int(float(output))
+
+
+def split_video_loop(input_path: str, max_size_mb: int = 23) -> List[str]:
+    """Previous implementation: one ffmpeg invocation per part"""
+    output_files = []
+    temp_dir = os.path.dirname(input_path)
+    filename = os.path.splitext(os.path.basename(input_path))[0]
+    total_duration = get_video_duration(input_path)
+    current_duration = 0
+    part = 1
+
+    while current_duration < total_duration:
+        output_path = os.path.join(temp_dir, f"{filename}-part{part}.mp4")
+        duration_per_mb = total_duration / (os.path.getsize(input_path) / (1024 * 1024))
+        segment_duration = int(duration_per_mb * max_size_mb)
+
+        cmd = [
+            'ffmpeg', '-i', input_path,
+            '-ss', str(current_duration),
+            '-t', str(segment_duration),
+            '-c', 'copy',
+            output_path
+        ]
+        subprocess.run(cmd, check=True, capture_output=True)
+
+        if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+            break
+
+        output_files.append(output_path)
+        current_duration += segment_duration
+        part += 1
+
+    return output_files
+
+
+def run(name: str, split: Callable, source: str, max_size_mb: int, repeat: int) -> float:
+    best = float('inf')
+    parts = []
+    for _ in range(repeat):
+        work_dir = mkdtemp()
+        try:
+            input_path = os.path.join(work_dir, 'audio.mp4')
+            shutil.copy(source, input_path)
+            start = time.perf_counter()
+            parts = split(input_path, max_size_mb)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"{name:>12}: {best:8.3f}s  ({len(parts)} parts)")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=int, default=3 * 60 * 60, help='seconds of audio')
+    parser.add_argument('--bitrate', default='64k')
+    parser.add_argument('--max-size-mb', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    source_dir = mkdtemp()
+    try:
+        source = os.path.join(source_dir, 'source.mp4')
+        make_audio(source, args.duration, args.bitrate)
+        size_mb = os.path.getsize(source) / (1024 * 1024)
+        print(f"source: {args.duration}s, {size_mb:.1f} MB, parts of {args.max_size_mb} MB")
+
+        loop = run('n-pass loop', split_video_loop, source, args.max_size_mb, args.repeat)
+        single = run(
+            'single-pass',
+            lambda path, max_size_mb: asyncio.run(split_video(MediaRunner(), path, max_size_mb)),
+            source,
+            args.max_size_mb,
+            args.repeat
+        )
+        print(f"{'speedup':>12}: {loop / single:8.2f}x")
+    finally:
+        shutil.rmtree(source_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import asyncio
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
+import pytest
+from synthetic_audio import make_audio
+
+@pytest.fixture(scope='session')
+def audio_source(tmp_path_factory) -> Callable[[int], Path]:
+    """Cached lavfi audio of a given length in seconds, generated once per session"""
+    if shutil.which('ffmpeg') is None:
+        pytest.skip("ffmpeg is not on PATH")
+
+    source_dir = tmp_path_factory.mktemp('audio')
+    sources: Dict[int, Path] = {}
+
+    def get(duration: int) -> Path:
+        if duration not in sources:
+            path = source_dir / f'source-{duration}.mp4'
+            make_audio(str(path), duration)
+            sources[duration] = path
+        return sources[duration]
+
+    return get
+
+@pytest.fixture
+def run_async() -> Callable[[Callable[[], Awaitable]], object]:
+    """Run a coroutine factory to completion on one loop shared by the test's rounds"""
+    loop = asyncio.new_event_loop()
+    yield lambda factory: loop.run_until_complete(factory())
+    loop.close()
@@ -0,0 +1,403 @@
+"""
+Flood the youtube_audio_requested stream with synthetic events and run the
+worker against local stand-ins, reporting throughput, end-to-end latency
+percentiles, peak RSS and open file descriptors.
+
+Stand-ins: yt-dlp is replaced by a pool that serves lavfi-generated audio,
+MinIO by LocalFileStorage, and the transcription API by a local stub
+server. Redis is real; the run uses its own database (15 by default) and
+deletes the request and result streams there before starting.
+
+Usage:
+    python benchmarks/soak.py --events 200 --concurrency 8
+    python benchmarks/soak.py --duration 1800 --rate 2 --unique 50
+    python benchmarks/soak.py --events 200 --concurrency 8 --long-every 10 --lanes
+    python benchmarks/soak.py --events 300 --bulk 250 --tenants 5 --tenant-prefetch 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import mkdtemp
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from redis.asyncio import Redis
+from domain.constants import EventStoreConfig, FairQueueConfig, ServiceConfig
+from infra.core_types import Event
+from infra.local_storage import LocalFileStorage
+from infra.redis import BackpressureError, RedisEventStore, StreamLimits
+from domain.lanes import build_lanes
+from youtube_downloader import YoutubeDownloaderMicroservice
+from synthetic_audio import make_audio
+
+RESULT_STREAM = 'transcriptions_created'
+
+
+def is_long(video_id: str, long_every: int) -> bool:
+    return bool(long_every) and int(video_id[len('soak'):]) % long_every == 0
+
+class FakeYoutubeDLPool:
+    """
+    YoutubeDLPool stand-in that "downloads" a pre-generated track. Every
+    long_every-th video reports a five hour duration and takes long_delay
+    seconds to download instead of delay.
+    """
+    def __init__(self, source: str, duration: int, delay: float = 0.0, long_every: int = 0, long_delay: float = 0.0):
+        self.source = source
+        self.duration = duration
+        self.delay = delay
+        self.long_every = long_every
+        self.long_delay = long_delay
+
+    def _download(self, outtmpl: str, delay: float) -> int:
+        time.sleep(delay)
+        shutil.copyfile(self.source, outtmpl)
+        return os.path.getsize(outtmpl)
+
+    async def extract_info(
+        self,
+        url: str,
+        opts: Dict[str, Any],
+        download: bool = True,
+        outtmpl: Optional[str] = None,
+        on_progress=None
+    ) -> Dict[str, Any]:
+        video_id = url.rsplit('=', 1)[-1]
+        long = is_long(video_id, self.long_every)
+        info = {
+            'id': video_id,
+            'title': f'Soak {video_id}',
+            'extractor_key': 'Youtube',
+            'duration': 5 * 3600 if long else self.duration
+        }
+        if download and outtmpl:
+            started = time.perf_counter()
+            delay = self.long_delay if long else self.delay
+            size = await asyncio.get_running_loop().run_in_executor(None, self._download, outtmpl, delay)
+            if on_progress:
+                on_progress({
+                    'status': 'finished',
+                    'downloaded_bytes': size,
+                    'elapsed': time.perf_counter() - started
+                })
+        return info
+
+    def close(self) -> None:
+        pass
+
+
+def start_transcription_stub(delay: float) -> ThreadingHTTPServer:
+    """OpenAI-compatible transcription endpoint that answers with fixed text"""
+    class Handler(BaseHTTPRequestHandler):
+        def _read_body(self) -> None:
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    self.rfile.read(size + 2)
+                    if size == 0:
+                        break
+            else:
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self) -> None:
+            self._read_body()
+            time.sleep(delay)
+            body = b'stub transcript'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ResourceSampler:
+    """Samples this process's RSS and open file descriptors"""
+    def __init__(self):
+        self.peak_rss = 0
+        self.fds: List[int] = []
+
+    @staticmethod
+    def rss() -> int:
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except FileNotFoundError:
+            pass
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    @staticmethod
+    def open_fds() -> Optional[int]:
+        for fd_dir in ('/proc/self/fd', '/dev/fd'):
+            if os.path.isdir(fd_dir):
+                return len(os.listdir(fd_dir))
+        return None
+
+    def sample(self) -> None:
+        self.peak_rss = max(self.peak_rss, self.rss())
+        fds = self.open_fds()
+        if fds is not None:
+            self.fds.append(fds)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def tenant_of(n: int, bulk: int, tenants: int) -> str:
+    """The first bulk requests come from one tenant, the rest round-robin over the others"""
+    return 'bulk' if n < bulk else f'tenant-{n % tenants}'
+
+def request_event(n: int, unique: int, bulk: int = 0, tenants: int = 1) -> Event:
+    request_id = f'soak-{n}'
+    url = f'https://www.youtube.com/watch?v=soak{n % unique:07d}'
+    return Event(
+        id=request_id,
+        name=ServiceConfig.EVENT_NAME,
+        data={'url': url},
+        meta={'request_id': request_id, 'url': url, 'tenant_id': tenant_of(n, bulk, tenants)}
+    )
+
+
+async def produce(
+    store: RedisEventStore,
+    submitted: Dict[str, float],
+    held_back: Dict[str, int],
+    events: int,
+    rate: Optional[float],
+    duration: Optional[float],
+    unique: int,
+    bulk: int = 0,
+    tenants: int = 1
+) -> None:
+    if duration is None and not rate:
+        # Burst: publish in pipelined batches
+        for first in range(0, events, 100):
+            batch = [request_event(n, unique, bulk, tenants) for n in range(first, min(first + 100, events))]
+            sent_at = time.monotonic()
+            try:
+                written = await store.write_events(batch)
+            except BackpressureError:
+                held_back['rejected'] += len(batch)
+                continue
+            if not written:
+                held_back['shed'] += len(batch)
+                continue
+            for event in batch:
+                submitted[event.id] = sent_at
+        return
+
+    started = time.monotonic()
+    n = 0
+    while True:
+        if duration is not None and time.monotonic() - started >= duration:
+            break
+        if duration is None and n >= events:
+            break
+
+        event = request_event(n, unique, bulk, tenants)
+        sent_at = time.monotonic()
+        try:
+            if await store.write_event(event) is None:
+                held_back['shed'] += 1
+            else:
+                submitted[event.id] = sent_at
+        except BackpressureError:
+            held_back['rejected'] += 1
+        n += 1
+        if rate:
+            await asyncio.sleep(max(0.0, started + n / rate - time.monotonic()))
+
+
+async def collect(redis: Redis, submitted: Dict[str, float], latencies: Dict[str, float]) -> None:
+    last_id = '0'
+    while True:
+        response = await redis.xread({RESULT_STREAM: last_id}, block=1000)
+        for _, messages in response or []:
+            for message_id, data in messages:
+                last_id = message_id
+                request_id = json.loads(data[b'meta'])['request_id']
+                if request_id in submitted:
+                    latencies[request_id] = time.monotonic() - submitted[request_id]
+
+
+async def soak(args: argparse.Namespace) -> int:
+    work_dir = mkdtemp(prefix='soak-')
+    source = os.path.join(work_dir, 'source.mp4')
+    make_audio(source, args.media_duration)
+
+    stub = start_transcription_stub(args.transcription_delay)
+    os.environ['OPENAI_BASE_URL'] = f'http://127.0.0.1:{stub.server_port}/v1'
+    os.environ.setdefault('OPENAI_API_KEY', 'soak')
+
+    redis = Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db)
+    await redis.delete(ServiceConfig.EVENT_NAME, RESULT_STREAM)
+
+    ytdl_pool = FakeYoutubeDLPool(source, args.media_duration, args.download_delay, args.long_every, args.long_delay)
+    service = YoutubeDownloaderMicroservice(
+        Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db),
+        LocalFileStorage(os.path.join(work_dir, 'storage')),
+        max_concurrency=args.concurrency,
+        lanes=build_lanes() if args.lanes else None,
+        ack_batch_size=args.ack_batch_size,
+        publish_with_ack=EventStoreConfig.PUBLISH_WITH_ACK,
+        ytdl_pool=ytdl_pool,
+        probe_pool=ytdl_pool,
+        tenant_meta_key=FairQueueConfig.TENANT_META_KEY,
+        prefetch=FairQueueConfig.PREFETCH,
+        tenant_prefetch=args.tenant_prefetch or None,
+        max_deferrals=FairQueueConfig.MAX_DEFERRALS
+    )
+    for store in [service.event_store, *service.lane_stores.values()]:
+        await redis.delete(store.stream_name, store.retry_key, store.dead_letter_stream)
+    producer_limits = StreamLimits(
+        max_len=args.max_len,
+        max_backlog=args.max_backlog,
+        overload=args.overload
+    )
+    producer_store = RedisEventStore(
+        redis,
+        ServiceConfig.EVENT_NAME,
+        'soak-producer',
+        stream_limits={ServiceConfig.EVENT_NAME: producer_limits},
+        backlog_check_interval=0.1
+    )
+
+    sampler = ResourceSampler()
+    sampler.sample()
+    fds_before = sampler.fds[-1] if sampler.fds else None
+    submitted: Dict[str, float] = {}
+    latencies: Dict[str, float] = {}
+    held_back = {'rejected': 0, 'shed': 0}
+
+    started = time.monotonic()
+    service_task = asyncio.create_task(service.start())
+    background = [
+        asyncio.create_task(sampler.run(args.sample_interval)),
+        asyncio.create_task(collect(redis, submitted, latencies))
+    ]
+    try:
+        await produce(
+            producer_store, submitted, held_back, args.events, args.rate, args.duration, args.unique,
+            args.bulk, args.tenants
+        )
+        deadline = time.monotonic() + args.drain_timeout
+        while len(latencies) < len(submitted) and time.monotonic() < deadline:
+            if service_task.done():
+                break
+            await asyncio.sleep(0.1)
+        elapsed = time.monotonic() - started
+    finally:
+        service_task.cancel()
+        for task in background:
+            task.cancel()
+        await asyncio.gather(service_task, *background, return_exceptions=True)
+        sampler.sample()
+        stub.shutdown()
+        await redis.aclose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    failure = None
+    if service_task.done() and not service_task.cancelled() and service_task.exception():
+        failure = service_task.exception()
+
+    values = list(latencies.values())
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    print(f"submitted:   {len(submitted)} events ({args.unique} distinct videos, {args.media_duration}s audio)")
+    if args.max_backlog:
+        print(f"held back:   {held_back['rejected']} rejected, {held_back['shed']} shed (backlog limit {args.max_backlog})")
+    print(f"completed:   {len(values)} in {elapsed:.1f}s ({len(values) / elapsed:.2f} events/s)")
+    def print_latency(label: str, values: List[float]) -> None:
+        if values:
+            print(
+                f"{label:<13}p50 {percentile(values, 50):.2f}s  p95 {percentile(values, 95):.2f}s  "
+                f"p99 {percentile(values, 99):.2f}s  max {max(values):.2f}s"
+            )
+
+    print_latency('latency:', values)
+    if args.long_every:
+        long_ids = {
+            request_id for request_id in latencies
+            if is_long(f"soak{int(request_id.split('-')[1]) % args.unique:07d}", args.long_every)
+        }
+        print_latency('  long:', [latencies[request_id] for request_id in long_ids])
+        print_latency('  other:', [value for request_id, value in latencies.items() if request_id not in long_ids])
+    if args.bulk:
+        bulk_ids = {request_id for request_id in latencies if int(request_id.split('-')[1]) < args.bulk}
+        print_latency('  bulk:', [latencies[request_id] for request_id in bulk_ids])
+        print_latency('  others:', [value for request_id, value in latencies.items() if request_id not in bulk_ids])
+    print(f"peak RSS:    {sampler.peak_rss / 2 ** 20:.1f} MiB (largest child {children / 2 ** 20:.1f} MiB)")
+    if sampler.fds:
+        print(f"open fds:    {fds_before} before, peak {max(sampler.fds)}, {sampler.fds[-1]} after")
+    if failure is not None:
+        print(f"worker failed: {failure!r}")
+    return 0 if failure is None and len(values) == len(submitted) else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=100, help='events to send when --duration is not set')
+    parser.add_argument('--duration', type=float, help='soak for this many seconds instead of sending --events')
+    parser.add_argument('--rate', type=float, help='events per second; default sends as fast as possible')
+    parser.add_argument('--unique', type=int, default=None, help='distinct video IDs; repeats exercise the caches')
+    parser.add_argument('--concurrency', type=int, default=4, help='worker MAX_CONCURRENCY')
+    parser.add_argument('--ack-batch-size', type=int, default=EventStoreConfig.ACK_BATCH_SIZE)
+    parser.add_argument('--max-len', type=int, help='approximate MAXLEN for the request stream')
+    parser.add_argument('--max-backlog', type=int, help='producer backpressure threshold for the request stream')
+    parser.add_argument('--overload', choices=['reject', 'delay', 'shed'], default='delay')
+    parser.add_argument('--media-duration', type=int, default=60, help='seconds of generated audio per video')
+    parser.add_argument('--download-delay', type=float, default=0.0, help='simulated download seconds')
+    parser.add_argument('--long-every', type=int, default=0, help='make every Nth video a five hour one')
+    parser.add_argument('--long-delay', type=float, default=10.0, help='simulated download seconds of long videos')
+    parser.add_argument('--lanes', action='store_true', help='route requests to duration-aware priority lanes')
+    parser.add_argument('--bulk', type=int, default=0, help='send the first N events from a single bulk tenant')
+    parser.add_argument('--tenants', type=int, default=1, help='tenants sharing the remaining events')
+    parser.add_argument(
+        '--tenant-prefetch', type=int, default=FairQueueConfig.TENANT_PREFETCH,
+        help="waiting messages per tenant before its excess is deferred; 0 (the service default) never defers"
+    )
+    parser.add_argument('--transcription-delay', type=float, default=0.1, help='stub API response seconds')
+    parser.add_argument('--drain-timeout', type=float, default=300, help='seconds to wait for outstanding events')
+    parser.add_argument('--sample-interval', type=float, default=0.5)
+    parser.add_argument('--redis-host', default=os.getenv('REDIS_HOST', 'localhost'))
+    parser.add_argument('--redis-port', type=int, default=int(os.getenv('REDIS_PORT', 6379)))
+    parser.add_argument('--redis-db', type=int, default=15)
+    args = parser.parse_args()
+    if args.duration is not None and not args.rate:
+        parser.error('--duration needs --rate')
+    args.unique = args.unique or (args.events if args.duration is None else 1_000_000)
+
+    # Per-event handler logs would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(asyncio.run(soak(args)))
+
+
+if __name__ == '__main__':
+    main()
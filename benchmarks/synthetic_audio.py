@@ -0,0 +1,12 @@
+"""Synthetic inputs for the benchmarks, generated with ffmpeg's lavfi source"""
+import subprocess
+
+
+def make_audio(path: str, duration: int, bitrate: str = '64k') -> None:
+    """Generate a synthetic AAC track of the given duration"""
+    subprocess.run([
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+        '-c:a', 'aac', '-b:a', bitrate,
+        path
+    ], check=True, capture_output=True)
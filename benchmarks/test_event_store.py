@@ -0,0 +1,61 @@
+import pytest
+from infra.codec import get_codec
+from infra.core_types import Event
+from infra.redis import decode_message, decode_messages, encode_event
+
+BATCH = 100
+
+def raw_entry(i: int, parts: int, codec: str = 'json'):
+    """A stream entry shaped like redis-py returns it, with bytes keys and values"""
+    data = [
+        {'title': f'Video title {i}-part{n}.mp4', 'path': f'Video title {i}-part{n}'}
+        for n in range(parts)
+    ]
+    event = Event(
+        id='',
+        name='youtube_audio_downloaded',
+        data=data,
+        meta={'request_id': f'req-{i}', 'url': 'https://youtu.be/jNQXAC9IVRw'},
+        timestamp='2024-01-01T00:00:00+00:00'
+    )
+    fields = encode_event(event, get_codec(codec))
+    return f'1700000000000-{i}'.encode(), {
+        key.encode(): value if isinstance(value, bytes) else str(value).encode()
+        for key, value in fields.items()
+    }
+
+@pytest.mark.parametrize('parts', [1, 50])
+def test_decode_messages(benchmark, parts):
+    entries = [raw_entry(i, parts) for i in range(BATCH)]
+
+    events = benchmark(lambda: [decode_message(message_id, data) for message_id, data in entries])
+
+    assert len(events) == BATCH
+    assert len(events[0].data) == parts
+
+@pytest.mark.parametrize('codec', ['json', 'orjson', 'msgpack'])
+@pytest.mark.parametrize('parts', [1, 50])
+def test_decode_messages_batch(benchmark, codec, parts):
+    pytest.importorskip(codec)
+    entries = [raw_entry(i, parts, codec) for i in range(BATCH)]
+
+    events, failures = benchmark(decode_messages, entries, get_codec(codec))
+
+    assert not failures
+    assert len(events) == BATCH
+    assert len(events[0].data) == parts
+
+@pytest.mark.parametrize('codec', ['json', 'orjson', 'msgpack'])
+def test_encode_event(benchmark, codec):
+    pytest.importorskip(codec)
+    event = Event(
+        id='',
+        name='transcriptions_created',
+        data=[{'title': f'part{n}', 'path': f'part{n}', 'text': 'word ' * 200} for n in range(10)],
+        meta={'request_id': 'req', 'url': 'https://youtu.be/jNQXAC9IVRw'}
+    )
+
+    fields = benchmark(encode_event, event, get_codec(codec))
+
+    benchmark.extra_info['data_bytes'] = len(fields['data'])
+    assert fields['name'] == event.name
@@ -0,0 +1,44 @@
+import shutil
+import pytest
+from domain.handler.donwload_audio import split_video
+from domain.handler.transcribe_audio import convert_to_mp3
+from infra.media import MediaRunner
+
+# 10 minutes, 1 hour and 3 hours of 64 kbit/s audio
+DURATIONS = [600, 3600, 10800]
+
+@pytest.mark.parametrize('duration', DURATIONS)
+def test_split_video(benchmark, audio_source, run_async, tmp_path, duration):
+    source = audio_source(duration)
+    runner = MediaRunner()
+    rounds = iter(range(1000))
+
+    def setup():
+        # split_video writes parts next to its input, so each round gets a fresh copy
+        work_dir = tmp_path / str(next(rounds))
+        work_dir.mkdir()
+        input_path = work_dir / 'audio.mp4'
+        shutil.copy(source, input_path)
+        return (str(input_path),), {}
+
+    parts = benchmark.pedantic(
+        lambda input_path: run_async(lambda: split_video(runner, input_path, max_size_mb=2)),
+        setup=setup,
+        rounds=3
+    )
+    assert len(parts) > 1
+
+@pytest.mark.parametrize('duration', DURATIONS[:1])
+def test_convert_to_mp3(benchmark, audio_source, run_async, tmp_path, duration):
+    source = str(audio_source(duration))
+    runner = MediaRunner()
+    rounds = iter(range(1000))
+
+    def setup():
+        return (str(tmp_path / f'converted-{next(rounds)}.mp3'),), {}
+
+    benchmark.pedantic(
+        lambda mp3_path: run_async(lambda: convert_to_mp3(runner, source, mp3_path)),
+        setup=setup,
+        rounds=3
+    )
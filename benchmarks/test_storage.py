@@ -0,0 +1,73 @@
+import os
+import pytest
+from infra.local_storage import LocalFileStorage
+from infra.minio import PART_SIZE, MinioFileStorage, _IterableReader
+
+SIZE = 32 * 1024 * 1024
+CHUNK = 64 * 1024
+
+@pytest.fixture(scope='module', params=['local', 'minio'])
+def storage(request, tmp_path_factory):
+    """
+    The local stand-in always runs; MinIO only when BENCH_MINIO_ENDPOINT
+    points at a server, so both backends can be compared on one machine.
+    """
+    if request.param == 'local':
+        return LocalFileStorage(str(tmp_path_factory.mktemp('storage')))
+
+    endpoint = os.getenv('BENCH_MINIO_ENDPOINT')
+    if not endpoint:
+        pytest.skip("BENCH_MINIO_ENDPOINT is not set")
+    return MinioFileStorage(
+        endpoint=endpoint,
+        access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
+        secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin'),
+        bucket='benchmarks',
+        secure=False
+    )
+
+@pytest.fixture(scope='module')
+def local_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp('source') / 'audio.mp4'
+    path.write_bytes(os.urandom(SIZE))
+    return str(path)
+
+def test_write_file(benchmark, storage, run_async, local_file):
+    benchmark(run_async, lambda: storage.write_file('bench/audio', local_file))
+
+def test_read_to_file(benchmark, storage, run_async, local_file, tmp_path):
+    run_async(lambda: storage.write_file('bench/audio', local_file))
+    target = str(tmp_path / 'copy.mp4')
+
+    benchmark(run_async, lambda: storage.read_to_file('bench/audio', target))
+    assert os.path.getsize(target) == SIZE
+
+def test_write_stream(benchmark, storage, run_async):
+    chunk = os.urandom(CHUNK)
+
+    benchmark(run_async, lambda: storage.write_stream(
+        'bench/stream',
+        (chunk for _ in range(SIZE // CHUNK))
+    ))
+
+def test_open_stream(benchmark, storage, run_async, local_file):
+    run_async(lambda: storage.write_file('bench/audio', local_file))
+
+    async def consume():
+        total = 0
+        async for chunk in storage.open_stream('bench/audio'):
+            total += len(chunk)
+        return total
+
+    assert benchmark(run_async, consume) == SIZE
+
+def test_iterable_reader(benchmark):
+    """The in-process half of MinioFileStorage.write_stream: re-chunking into parts"""
+    chunk = os.urandom(CHUNK)
+
+    def drain():
+        reader = _IterableReader(chunk for _ in range(SIZE // CHUNK))
+        while reader.read(PART_SIZE):
+            pass
+
+    benchmark(drain)
@@ -1,13 +1,38 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from redis.asyncio import Redis
 import yt_dlp
+import asyncio
+import json
 import logging
+import os
+import sys
+import time
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar
 import uuid
 import re
+from urllib.parse import quote
+from src.infra.cache import TTLCache
+from src.infra.disk_cache import DirectoryInUseError, DiskCache
+from src.infra.single_flight import SingleFlight
+from src.infra.ytdlp import get_video_key
 
-app = FastAPI(title="YouTube Downloader API")
+T = TypeVar('T')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_download_cache()
+    try:
+        yield
+    finally:
+        download_cache.close()
+
+app = FastAPI(title="YouTube Downloader API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +48,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-DOWNLOAD_DIR = Path("downloads")
-DOWNLOAD_DIR.mkdir(exist_ok=True)
+DOWNLOAD_DIR = Path(os.getenv('DOWNLOAD_DIR', 'downloads'))
+# Downloads in progress, and ones that can't be cached, live here
+INCOMING_DIR = DOWNLOAD_DIR / "incoming"
+
+DOWNLOAD_FORMAT = 'worstaudio/worst'
+
+# Finished downloads are kept in DOWNLOAD_DIR as an LRU cache keyed by
+# video ID and format, bounded by DOWNLOAD_CACHE_MAX_BYTES per process.
+# Opened at startup, not import, so importing this module touches no files
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv('DOWNLOAD_CACHE_MAX_BYTES', 5 * 1024 * 1024 * 1024))
+MAX_CACHE_WORKERS = 64
+download_cache: Optional[DiskCache] = None
+
+def open_download_cache() -> None:
+    """
+    Open the download cache in the first cache directory no other process
+    holds: DOWNLOAD_DIR itself, then DOWNLOAD_DIR/worker-1, worker-2, ...
+    so each uvicorn worker keeps its own files and index across restarts.
+    """
+    global download_cache
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    for slot in range(MAX_CACHE_WORKERS):
+        directory = DOWNLOAD_DIR if slot == 0 else DOWNLOAD_DIR / f"worker-{slot}"
+        try:
+            download_cache = DiskCache(directory, DOWNLOAD_CACHE_MAX_BYTES, exclusive=True)
+        except DirectoryInUseError:
+            continue
+        logger.info(f"Download cache in {directory}")
+        return
+    raise RuntimeError(f"No free download cache directory under {DOWNLOAD_DIR}")
+
+# Downloads run on a bounded pool so they never block the event loop.
+# Requests beyond the running + queued limit get a 503 with Retry-After.
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv('MAX_CONCURRENT_DOWNLOADS', 4))
+MAX_QUEUED_DOWNLOADS = int(os.getenv('MAX_QUEUED_DOWNLOADS', 16))
+DOWNLOAD_RETRY_AFTER = int(os.getenv('DOWNLOAD_RETRY_AFTER', 30))
+
+# /info responses are cached by canonical video ID in process, and
+# optionally in Redis so every API replica shares one cache
+INFO_CACHE_TTL = int(os.getenv('INFO_CACHE_TTL', 300))
+INFO_CACHE_MAX_ENTRIES = int(os.getenv('INFO_CACHE_MAX_ENTRIES', 1024))
+INFO_CACHE_REDIS_URL = os.getenv('INFO_CACHE_REDIS_URL')
+
+info_cache: TTLCache[dict] = TTLCache(max_size=INFO_CACHE_MAX_ENTRIES, ttl=INFO_CACHE_TTL)
+info_cache_redis: Optional[Redis] = Redis.from_url(INFO_CACHE_REDIS_URL) if INFO_CACHE_REDIS_URL else None
+info_cache_redis_hits = 0
+
+download_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_DOWNLOADS,
+    thread_name_prefix='download'
+)
+pending_downloads = 0
+
+# Concurrent requests for the same video share one download. Files that
+# don't fit the download cache are removed once every sharer has sent them.
+download_flight = SingleFlight()
+incoming_refs: Dict[str, int] = {}
+incoming_files: Dict[str, Set[Path]] = {}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def reserve_download_slot() -> None:
+    """Count a download as pending, or reject it when the queue is full."""
+    global pending_downloads
+    if pending_downloads >= MAX_CONCURRENT_DOWNLOADS + MAX_QUEUED_DOWNLOADS:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many downloads in progress, try again later",
+            headers={"Retry-After": str(DOWNLOAD_RETRY_AFTER)}
+        )
+    pending_downloads += 1
+
+def release_download_slot() -> None:
+    global pending_downloads
+    pending_downloads -= 1
+
+async def run_download(fn: Callable[..., T], *args) -> Tuple[T, float]:
+    """
+    Run a blocking download on the download pool.
+    Returns the result and how long the call waited for a free worker.
+    """
+    reserve_download_slot()
+    submitted = time.monotonic()
+    queue_time = 0.0
+
+    def timed():
+        nonlocal queue_time
+        queue_time = time.monotonic() - submitted
+        return fn(*args)
+
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(download_executor, timed)
+        return result, queue_time
+    finally:
+        release_download_slot()
+
+async def release_incoming(key: str, path: Optional[Path] = None) -> None:
+    """
+    Drop one request's claim on the file key's download produced. After the
+    last, an uncached file is removed and a cached one's pin is released.
+    Async so the response background task runs it on the event loop.
+    """
+    if path is not None:
+        incoming_files.setdefault(key, set()).add(path)
+    incoming_refs[key] -= 1
+    if incoming_refs[key] == 0:
+        del incoming_refs[key]
+        for incoming_path in incoming_files.pop(key, set()):
+            if incoming_path.parent == INCOMING_DIR:
+                incoming_path.unlink(missing_ok=True)
+            else:
+                download_cache.release(incoming_path)
 
 def sanitize_filename(title: str) -> str:
     """
@@ -34,17 +170,22 @@ def sanitize_filename(title: str) -> str:
     # Replace only explicitly invalid filename characters
     return re.sub(r'[<>:"/\\|?*]', '_', title)
 
+def download_cache_key(url: str) -> Optional[str]:
+    video_key = get_video_key(url)
+    return f"{video_key}:{DOWNLOAD_FORMAT}" if video_key else None
+
 def download_audio_file(url: str) -> tuple[Path, str]:
     """
     Download audio from YouTube and return the file path and title.
+    The file is moved into the download cache when it can be cached.
     """
     try:
         # Generate unique identifier
         file_id = str(uuid.uuid4())
         
         ydl_opts = {
-            'format': 'worstaudio/worst',
-            'outtmpl': str(DOWNLOAD_DIR / f'{file_id}_%(title)s.%(ext)s'),
+            'format': DOWNLOAD_FORMAT,
+            'outtmpl': str(INCOMING_DIR / f'{file_id}_%(title)s.%(ext)s'),
             'merge_output_format': 'mp4',
             'quiet': True,
             'no_warnings': True
@@ -55,8 +196,15 @@ def download_audio_file(url: str) -> tuple[Path, str]:
             title = info['title']
             
             # Find our file with the unique identifier
-            downloaded_file = next(DOWNLOAD_DIR.glob(f"{file_id}_*"))
+            downloaded_file = next(INCOMING_DIR.glob(f"{file_id}_*"))
             logger.info(f"Found downloaded file at: {downloaded_file}")
+
+            cache_key = download_cache_key(url)
+            if cache_key:
+                # Pinned until every request sharing this download has sent it
+                downloaded_file = download_cache.put(
+                    cache_key, downloaded_file, {'title': title}, pin=True
+                ) or downloaded_file
             
             return downloaded_file, title
             
@@ -64,21 +212,146 @@ def download_audio_file(url: str) -> tuple[Path, str]:
         logger.error(f"Error downloading file: {str(e)}")
         raise
 
+def stream_command(url: str) -> List[str]:
+    """yt-dlp command that writes the audio to stdout"""
+    return [
+        sys.executable, '-m', 'yt_dlp',
+        '--format', DOWNLOAD_FORMAT,
+        '--output', '-',
+        '--quiet',
+        '--no-warnings',
+        url
+    ]
+
+async def stream_audio_file(url: str, title: Awaitable[str]) -> AsyncIterator[bytes]:
+    """
+    Stream audio from yt-dlp's stdout as it downloads, teeing the bytes to
+    disk. The file is added to the download cache only once the download
+    completes; partial files are removed.
+    """
+    part_path = INCOMING_DIR / f"{uuid.uuid4()}.mp4.part"
+    process = await asyncio.create_subprocess_exec(
+        *stream_command(url),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    # Drained alongside stdout so a full stderr pipe can't stall yt-dlp
+    stderr_task = asyncio.create_task(process.stderr.read())
+    try:
+        with open(part_path, 'wb') as f:
+            while chunk := await process.stdout.read(STREAM_CHUNK_SIZE):
+                f.write(chunk)
+                yield chunk
+
+        stderr = await stderr_task
+        if await process.wait() != 0:
+            raise RuntimeError(f"yt-dlp exited with {process.returncode}: {stderr.decode().strip()}")
+
+        cache_key = download_cache_key(url)
+        if cache_key:
+            save_path = part_path.with_suffix('')
+            part_path.rename(save_path)
+            if download_cache.put(cache_key, save_path, {'title': await title}):
+                logger.info(f"Streamed download cached as: {cache_key}")
+            else:
+                save_path.unlink(missing_ok=True)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        stderr_task.cancel()
+        await asyncio.gather(stderr_task, return_exceptions=True)
+        part_path.unlink(missing_ok=True)
+
+async def load_title(url: str) -> str:
+    """Video title for the response filename; a failed lookup doesn't fail the stream"""
+    try:
+        info = await load_video_info(url)
+    except Exception as e:
+        logger.warning(f"Title lookup failed for {url}: {str(e)}")
+        return 'audio'
+    return info.get('title') or 'audio'
+
+async def stream_audio_response(url: str) -> StreamingResponse:
+    """Start a streamed download and respond once the first bytes arrive."""
+    reserve_download_slot()
+    # The title is looked up while yt-dlp starts the stream, not before it
+    title = asyncio.ensure_future(load_title(url))
+    chunks = stream_audio_file(url, title)
+    try:
+        # Surface yt-dlp failures as errors before the 200 is sent
+        first_chunk = await chunks.__anext__()
+        filename = f"{await title}.mp4"
+    except BaseException:
+        title.cancel()
+        await chunks.aclose()
+        release_download_slot()
+        raise
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+            release_download_slot()
+
+    return StreamingResponse(
+        body(),
+        media_type='video/mp4',
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
+    )
+
 @app.get("/audio/download")
-async def download_audio(url: str):
-    """Download and serve YouTube audio."""
+async def download_audio(url: str, stream: bool = False):
+    """Download and serve YouTube audio. With stream=true, bytes are sent as they download."""
     try:
         logger.info(f"Starting audio download for URL: {url}")
         
-        downloaded_file, title = download_audio_file(url)
-        logger.info(f"Preparing to send file: {downloaded_file}")
-        
+        cache_key = download_cache_key(url)
+        cached = download_cache.get(cache_key, pin=True) if cache_key else None
+        if cached:
+            cached_file, metadata = cached
+            logger.info(f"Serving cached download: {cached_file}")
+            # Eviction leaves the file in place until it has been sent
+            return FileResponse(
+                path=str(cached_file),
+                filename=f"{metadata['title']}.mp4",
+                media_type='video/mp4',
+                headers={"X-Cache": "HIT"},
+                background=BackgroundTask(download_cache.release, cached_file)
+            )
+
+        if stream:
+            return await stream_audio_response(url)
+
+        flight_key = cache_key or url
+        incoming_refs[flight_key] = incoming_refs.get(flight_key, 0) + 1
+        try:
+            (downloaded_file, title), queue_time = await download_flight.do(
+                flight_key,
+                lambda: run_download(download_audio_file, url)
+            )
+        except BaseException:
+            await release_incoming(flight_key)
+            raise
+        logger.info(f"Preparing to send file: {downloaded_file} (queued {queue_time:.3f}s)")
+
+        # Files that didn't make it into the cache are removed once sent,
+        # and cached ones unpinned
+        cleanup = BackgroundTask(release_incoming, flight_key, downloaded_file)
+
         return FileResponse(
             path=str(downloaded_file),
             filename=f"{title}.mp4",
-            media_type='video/mp4'
+            media_type='video/mp4',
+            headers={"X-Queue-Time": f"{queue_time:.3f}", "X-Cache": "MISS"},
+            background=cleanup
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in audio download: {str(e)}")
         raise HTTPException(
@@ -86,34 +359,101 @@ async def download_audio(url: str):
             detail=f"Audio download failed: {str(e)}"
         )
 
+def fetch_video_info(url: str) -> dict:
+    """Extract video metadata with yt-dlp (blocking)."""
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': True
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        return {
+            "title": info.get('title'),
+            "duration": info.get('duration'),
+            "view_count": info.get('view_count'),
+            "uploader": info.get('uploader'),
+            "formats": [
+                {
+                    "quality": f.get('height', 'N/A'),
+                    "ext": f.get('ext'),
+                    "filesize": f.get('filesize'),
+                    "vcodec": f.get('vcodec')
+                }
+                for f in info.get('formats', [])
+            ]
+        }
+
+async def get_cached_info(video_key: str) -> Optional[dict]:
+    """Look up video info in the process cache, then the shared Redis tier."""
+    global info_cache_redis_hits
+    info = info_cache.get(video_key)
+    if info is not None or info_cache_redis is None:
+        return info
+
+    try:
+        cached = await info_cache_redis.get(f"info:{video_key}")
+    except Exception as e:
+        logger.warning(f"Info cache Redis lookup failed: {str(e)}")
+        return None
+
+    if cached is None:
+        return None
+    info_cache_redis_hits += 1
+    info = json.loads(cached)
+    info_cache.set(video_key, info)
+    return info
+
+async def set_cached_info(video_key: str, info: dict) -> None:
+    info_cache.set(video_key, info)
+    if info_cache_redis is None:
+        return
+    try:
+        await info_cache_redis.set(f"info:{video_key}", json.dumps(info), ex=INFO_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Info cache Redis write failed: {str(e)}")
+
+async def load_video_info(url: str, no_cache: bool = False) -> dict:
+    """Video info from the cache, or from yt-dlp off the event loop."""
+    video_key = get_video_key(url)
+    if video_key and not no_cache:
+        info = await get_cached_info(video_key)
+        if info is not None:
+            return info
+
+    loop = asyncio.get_running_loop()
+    info = await loop.run_in_executor(None, fetch_video_info, url)
+    if video_key:
+        await set_cached_info(video_key, info)
+    return info
+
 @app.get("/info")
-async def get_video_info(url: str):
+async def get_video_info(url: str, no_cache: bool = False):
     """Get information about a YouTube video."""
     try:
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            return {
-                "title": info.get('title'),
-                "duration": info.get('duration'),
-                "view_count": info.get('view_count'),
-                "uploader": info.get('uploader'),
-                "formats": [
-                    {
-                        "quality": f.get('height', 'N/A'),
-                        "ext": f.get('ext'),
-                        "filesize": f.get('filesize'),
-                        "vcodec": f.get('vcodec')
-                    }
-                    for f in info.get('formats', [])
-                ]
-            }
+        return await load_video_info(url, no_cache)
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Error fetching video info: {str(e)}"
         )
+
+@app.get("/audio/cache")
+async def get_download_cache_stats():
+    """Size and hit/miss counters for the download cache."""
+    return download_cache.stats()
+
+@app.get("/audio/inflight")
+async def get_download_flight_stats():
+    """Downloads in flight and how many requests shared another's download"""
+    return download_flight.stats()
+
+@app.get("/info/cache")
+async def get_info_cache_stats():
+    """Hit/miss counters for the /info cache."""
+    # A Redis hit is counted as a miss by the in-process tier
+    return {
+        **info_cache.stats(),
+        "redis_enabled": info_cache_redis is not None,
+        "redis_hits": info_cache_redis_hits
+    }
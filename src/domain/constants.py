@@ -4,3 +4,81 @@ from dataclasses import dataclass
 class ServiceConfig:
     NAME: str = "youtube-downloader"
     EVENT_NAME: str = "youtube_audio_requested"
+    RESULT_EVENT_NAME: str = "transcriptions_created"
+
+@dataclass(frozen=True)
+class DownloadCacheConfig:
+    TTL: int = 24 * 60 * 60
+    MAX_BYTES: int = 10 * 1024 * 1024 * 1024
+
+@dataclass(frozen=True)
+class TranscriptionCacheConfig:
+    MAX_BYTES: int = 256 * 1024 * 1024
+
+@dataclass(frozen=True)
+class TranscriptionLimitConfig:
+    MAX_CONCURRENCY: int = 4
+    REQUESTS_PER_MINUTE: int = 50
+
+@dataclass(frozen=True)
+class MediaConfig:
+    MAX_PROCESSES: int = 4
+    TIMEOUT: int = 60 * 60
+
+@dataclass(frozen=True)
+class YtDlpConfig:
+    WORKERS: int = 2
+
+@dataclass(frozen=True)
+class LaneConfig:
+    # Longest video, in seconds, routed to the short and medium lanes
+    SHORT_MAX_DURATION: float = 10 * 60
+    MEDIUM_MAX_DURATION: float = 60 * 60
+    # Share of MAX_CONCURRENCY each lane gets
+    WEIGHTS: str = 'short=5,medium=3,long=2'
+    # Requests probed and routed at once
+    ROUTER_CONCURRENCY: int = 4
+    # Approximate MAXLEN of each lane stream; 0 disables
+    STREAM_MAX_LEN: int = 100_000
+
+@dataclass(frozen=True)
+class SingleFlightConfig:
+    LOCK_TIMEOUT: int = 30
+    RESULT_TTL: int = 60
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    # 0 disables the Prometheus endpoint
+    PORT: int = 9100
+
+@dataclass(frozen=True)
+class EventStoreConfig:
+    ACK_BATCH_SIZE: int = 10
+    ACK_INTERVAL: float = 1.0
+    PUBLISH_WITH_ACK: bool = True
+    # Pending messages idle this long are claimed from their consumer
+    CLAIM_MIN_IDLE: float = 5 * 60
+    CLAIM_INTERVAL: float = 30
+    # Failed messages are retried with exponential backoff, then dead-lettered
+    MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: float = 5
+    RETRY_MAX_DELAY: float = 60
+    # data/meta encoding for published events: json, orjson or msgpack
+    CODEC: str = 'json'
+    # Approximate MAXLEN of the streams this service writes; 0 disables
+    RESULT_STREAM_MAX_LEN: int = 100_000
+    DEAD_LETTER_MAX_LEN: int = 10_000
+
+@dataclass(frozen=True)
+class FairQueueConfig:
+    # meta field naming the tenant; requests without one share a tenant
+    TENANT_META_KEY: str = 'tenant_id'
+    # Handler slots one tenant may hold per stream; 0 for no cap
+    TENANT_CONCURRENCY: int = 0
+    # Messages read beyond the free slots, for the scheduler to choose from
+    PREFETCH: int = 10
+    # Waiting messages per tenant before more of its messages are moved to
+    # the back of the stream, 0 to never move them; and how many times one
+    # message may be moved
+    TENANT_PREFETCH: int = 0
+    MAX_DEFERRALS: int = 1
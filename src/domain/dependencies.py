@@ -1,11 +1,57 @@
-from typing import Any
+from typing import Any, Optional
+from infra.cache import TTLCache
 from infra.core_types import FileStorage, EventStore
+from infra.limiter import RateLimiter
+from infra.media import MediaRunner
+from infra.single_flight import SingleFlight
+from infra.ytdlp import YoutubeDLPool
+from domain.constants import DownloadCacheConfig, MediaConfig, TranscriptionCacheConfig, SingleFlightConfig, TranscriptionLimitConfig, YtDlpConfig
 
 class Dependencies:
     def __init__(
         self,
         file_storage: FileStorage,
-        event_store: EventStore
+        event_store: EventStore,
+        download_cache: Optional[TTLCache] = None,
+        transcription_cache: Optional[TTLCache] = None,
+        transcription_limiter: Optional[RateLimiter] = None,
+        media_runner: Optional[MediaRunner] = None,
+        ytdl_pool: Optional[YoutubeDLPool] = None,
+        single_flight: Optional[SingleFlight] = None
     ):
         self.file_storage = file_storage
         self.event_store = event_store
+        if download_cache is None:
+            download_cache = TTLCache(
+                max_size=DownloadCacheConfig.MAX_BYTES,
+                ttl=DownloadCacheConfig.TTL,
+                sizeof=lambda cached: cached.size
+            )
+        self.download_cache = download_cache
+        if transcription_cache is None:
+            transcription_cache = TTLCache(
+                max_size=TranscriptionCacheConfig.MAX_BYTES,
+                sizeof=lambda cached: cached.size
+            )
+        self.transcription_cache = transcription_cache
+        if transcription_limiter is None:
+            transcription_limiter = RateLimiter(
+                max_concurrency=TranscriptionLimitConfig.MAX_CONCURRENCY,
+                requests_per_minute=TranscriptionLimitConfig.REQUESTS_PER_MINUTE
+            )
+        self.transcription_limiter = transcription_limiter
+        if media_runner is None:
+            media_runner = MediaRunner(
+                max_processes=MediaConfig.MAX_PROCESSES,
+                timeout=MediaConfig.TIMEOUT
+            )
+        self.media_runner = media_runner
+        if ytdl_pool is None:
+            ytdl_pool = YoutubeDLPool(workers=YtDlpConfig.WORKERS)
+        self.ytdl_pool = ytdl_pool
+        if single_flight is None:
+            single_flight = SingleFlight(
+                lock_timeout=SingleFlightConfig.LOCK_TIMEOUT,
+                result_ttl=SingleFlightConfig.RESULT_TTL
+            )
+        self.single_flight = single_flight
@@ -1,56 +1,67 @@
+import json
+import asyncio
 import shutil
-import yt_dlp
 import re
-import subprocess
 import os
+import time
 import logging
 from tempfile import NamedTemporaryFile, mkdtemp
-from typing import List
-from domain.types import Deps, YoutubeAudioRequestedEvent, YoutubeAudioDownloadedEvent
+from typing import Awaitable, Callable, List, Optional
+from infra.aio import gather_or_cancel
+from infra.media import MediaRunner
+from infra.metrics import observe_stage, track_stage
+from infra.ytdlp import get_video_key
+from domain.types import Deps, CachedDownload, YoutubeAudioRequestedEvent, YoutubeAudioDownloadedEvent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_video_duration(file_path: str) -> int:
+async def get_video_duration(runner: MediaRunner, file_path: str) -> int:
     cmd = [
         'ffprobe', '-i', file_path,
         '-show_entries', 'format=duration',
         '-v', 'quiet',
         '-of', 'default=noprint_wrappers=1:nokey=1'
     ]
-    output = subprocess.check_output(cmd).decode().strip()
+    with track_stage('ffprobe'):
+        output = (await runner.run(cmd)).decode().strip()
     return int(float(output))
 
-def split_video(input_path: str, max_size_mb: int = 23) -> List[str]:
-    """Split video into chunks of max_size_mb"""
-    output_files = []
+async def split_video(runner: MediaRunner, input_path: str, max_size_mb: int = 23) -> List[str]:
+    """Split video into chunks of max_size_mb in a single ffmpeg pass"""
+    file_size_mb = os.path.getsize(input_path) / (1024 * 1024)
+    if file_size_mb <= max_size_mb:
+        return [input_path]
+
     temp_dir = os.path.dirname(input_path)
     filename = os.path.splitext(os.path.basename(input_path))[0]
-    total_duration = get_video_duration(input_path)
-    current_duration = 0
-    part = 1
+    total_duration = await get_video_duration(runner, input_path)
+    duration_per_mb = total_duration / file_size_mb
+    segment_duration = max(1, int(duration_per_mb * max_size_mb))
+
+    # The segment muxer writes every part while demuxing the input once
+    cmd = [
+        'ffmpeg', '-i', input_path,
+        '-f', 'segment',
+        '-segment_time', str(segment_duration),
+        '-segment_start_number', '1',
+        '-reset_timestamps', '1',
+        '-c', 'copy',
+        os.path.join(temp_dir, f"{filename}-part%d.mp4")
+    ]
+    with track_stage('split') as stage:
+        stage.bytes = os.path.getsize(input_path)
+        await runner.run(cmd)
 
-    while current_duration < total_duration:
+    output_files = []
+    part = 1
+    while True:
         output_path = os.path.join(temp_dir, f"{filename}-part{part}.mp4")
-        duration_per_mb = total_duration / (os.path.getsize(input_path) / (1024 * 1024))
-        segment_duration = int(duration_per_mb * max_size_mb)
-        
-        cmd = [
-            'ffmpeg', '-i', input_path,
-            '-ss', str(current_duration),
-            '-t', str(segment_duration),
-            '-c', 'copy',
-            output_path
-        ]
-        subprocess.run(cmd, check=True, capture_output=True)
-        
         if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
             break
-            
         output_files.append(output_path)
-        current_duration += segment_duration
         part += 1
-    
+
     return output_files
 
 def sanitize_filename(title: str) -> str:
@@ -61,60 +72,154 @@ def sanitize_filename(title: str) -> str:
     # Replace only explicitly invalid filename characters
     return re.sub(r'[<>:"/\\|?*]', '_', title)
 
-async def download_youtube_audio(deps: Deps, event: YoutubeAudioRequestedEvent) -> YoutubeAudioDownloadedEvent:
-    temp_dir = None
-    logger.info(f"Event: {event}")
-    try:
-        temp_dir = mkdtemp()
-        temp_file_path = os.path.join(temp_dir, 'audio.mp4')
+YDL_OPTS = {
+    'format': 'worstaudio/worst',
+    'merge_output_format': 'mp4',
+    'quiet': True,
+    'no_warnings': True
+}
+
+# Called with (part info, local file path) while the part is still on disk
+PartHandler = Callable[[dict, str], Awaitable[None]]
+
+async def fetch_youtube_audio(
+    deps: Deps,
+    url: str,
+    temp_dir: str,
+    start_part: Optional[Callable[[dict, str], None]] = None
+) -> List[dict]:
+    """
+    Download and split YouTube audio into temp_dir and store the parts,
+    returning them. start_part is called for each part as its upload starts;
+    the local file stays in temp_dir for the caller to remove.
+    """
+    temp_file_path = os.path.join(temp_dir, 'audio.mp4')
+
+    started = time.perf_counter()
+    extracted = False
+
+    def log_progress(status: dict) -> None:
+        nonlocal extracted
+        # The first progress report ends extraction and starts the download
+        if not extracted:
+            extracted = True
+            observe_stage('ytdlp_extract', time.perf_counter() - started)
+        if status.get('status') == 'finished':
+            logger.info(
+                f"Downloaded {status.get('downloaded_bytes')} bytes "
+                f"in {status.get('elapsed') or 0:.1f}s"
+            )
+            observe_stage(
+                'ytdlp_download',
+                status.get('elapsed') or 0,
+                size=status.get('downloaded_bytes') or status.get('total_bytes')
+            )
+
+    with track_stage('ytdlp'):
+        info = await deps.ytdl_pool.extract_info(
+            url,
+            YDL_OPTS,
+            download=True,
+            outtmpl=temp_file_path,
+            on_progress=log_progress
+        )
+    base_title = sanitize_filename(info['title'])
+    # Objects are named by video, not title, so two videos with the same
+    # title never overwrite parts the download cache still points at
+    video_key = f"{info['extractor_key']}:{info['id']}"
+    
+    if not os.path.exists(temp_file_path):
+        raise ValueError("Download failed - file not created")
         
-        ydl_opts = {
-            'format': 'worstaudio/worst',
-            'outtmpl': temp_file_path,
-            'merge_output_format': 'mp4',
-            'quiet': True,
-            'no_warnings': True
+    split_files = [
+        file_path for file_path in await split_video(deps.media_runner, temp_file_path)
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0
+    ]
+
+    async def store_part(i: int, file_path: str) -> dict:
+        part_suffix = f"-part{i+1}" if len(split_files) > 1 else ""
+        file_info = {
+            'path': f"{video_key}{part_suffix}",
+            'title': f"{base_title}{part_suffix}.mp4"
         }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(event.data['url'], download=True)
-            base_title = sanitize_filename(info['title'])
-            
-            if not os.path.exists(temp_file_path):
-                raise ValueError("Download failed - file not created")
-                
-            split_files = split_video(temp_file_path)
-            stored_data = []
-            
-            for i, file_path in enumerate(split_files):
-                if not os.path.exists(file_path):
-                    continue
-                    
-                with open(file_path, 'rb') as f:
-                    file_content = f.read()
-                    if len(file_content) == 0:
-                        continue
-                        
-                    part_suffix = f"-part{i+1}" if len(split_files) > 1 else ""
-                    title = f"{base_title}{part_suffix}.mp4"
-                    path = f"{base_title}{part_suffix}"
-                    await deps.file_storage.write(path, file_content)
-                    stored_data.append({
-                        'path': path,
-                        'title': title
-                    })
-            
-            if not stored_data:
-                raise ValueError("No valid files were produced")
-                
+        if start_part:
+            start_part(dict(file_info), file_path)
+        with track_stage('storage_upload') as stage:
+            stage.bytes = os.path.getsize(file_path)
+            await deps.file_storage.write_file(file_info['path'], file_path)
+        return file_info
+
+    stored_data = await gather_or_cancel(*(
+        store_part(i, file_path) for i, file_path in enumerate(split_files)
+    ))
+    stored_size = sum(os.path.getsize(file_path) for file_path in split_files)
+
+    if not stored_data:
+        raise ValueError("No valid files were produced")
+
+    deps.download_cache.set(
+        video_key,
+        CachedDownload(parts=[dict(part) for part in stored_data], size=stored_size)
+    )
+    return stored_data
+
+async def download_youtube_audio(
+    deps: Deps,
+    event: YoutubeAudioRequestedEvent,
+    on_part: Optional[PartHandler] = None
+) -> YoutubeAudioDownloadedEvent:
+    """
+    Download, split and store YouTube audio. If on_part is given it runs for
+    every part alongside that part's upload, before the local copy is removed.
+    Parts served from the download cache, or from a download another caller
+    already had in flight for the same video, are not passed to on_part.
+    Only the download, split and upload are shared: callers waiting on the
+    same video never wait for, or fail with, the leader's on_part.
+    """
+    logger.info(f"Event: {event}")
+    try:
+        url = event.data['url']
+        video_key = get_video_key(url)
+        cached = deps.download_cache.get(video_key) if video_key else None
+        logger.info(
+            f"Download cache {'hit' if cached else 'miss'} for {video_key} "
+            f"(hit rate {deps.download_cache.hit_rate:.2%})"
+        )
+        if cached:
             return YoutubeAudioDownloadedEvent(
                 name="youtube_audio_downloaded",
-                data=stored_data,
+                data=[dict(part) for part in cached.parts],
                 meta=event.meta
             )
-            
+
+        temp_dir = mkdtemp()
+        part_tasks: List[asyncio.Task] = []
+
+        def start_part(file_info: dict, file_path: str) -> None:
+            part_tasks.append(asyncio.ensure_future(on_part(file_info, file_path)))
+
+        try:
+            # Concurrent requests for the same video share one download
+            stored_data = await deps.single_flight.do(
+                f"download:{video_key or url}",
+                lambda: fetch_youtube_audio(deps, url, temp_dir, start_part if on_part else None),
+                encode=json.dumps,
+                decode=json.loads
+            )
+            # on_part started during this caller's download finishes outside
+            # the shared call
+            await gather_or_cancel(*part_tasks)
+        finally:
+            for task in part_tasks:
+                task.cancel()
+            await asyncio.gather(*part_tasks, return_exceptions=True)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return YoutubeAudioDownloadedEvent(
+            name="youtube_audio_downloaded",
+            data=[dict(part) for part in stored_data],
+            meta=event.meta
+        )
+        
     except Exception as e:
         raise ValueError(f"Download youtube audio failed: {e}")
-    finally:
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
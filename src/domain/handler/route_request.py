@@ -0,0 +1,61 @@
+import logging
+from typing import Any, Dict, List, Optional
+from infra.core_types import Event
+from infra.metrics import LANE_ROUTED, track_stage
+from infra.ytdlp import YoutubeDLPool, get_video_key
+from domain.constants import ServiceConfig
+from domain.lanes import Lane, lane_for
+from domain.types import Deps, YoutubeAudioRequestedEvent
+
+logger = logging.getLogger(__name__)
+
+# Metadata only: no format processing of playlist entries, nothing downloaded
+PROBE_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'extract_flat': 'in_playlist'
+}
+
+def lane_stream(lane: Lane) -> str:
+    return f"{ServiceConfig.EVENT_NAME}:{lane.name}"
+
+async def probe_duration(ytdl_pool: YoutubeDLPool, url: str) -> Optional[float]:
+    """Duration in seconds from yt-dlp metadata; None for live or unknown"""
+    with track_stage('probe'):
+        info: Dict[str, Any] = await ytdl_pool.extract_info(url, PROBE_OPTS, download=False)
+    if info.get('is_live'):
+        return None
+    return info.get('duration')
+
+async def route_youtube_audio(
+    deps: Deps,
+    event: YoutubeAudioRequestedEvent,
+    lanes: List[Lane],
+    probe_pool: Optional[YoutubeDLPool] = None
+) -> Event:
+    """
+    Pick the lane for a request and return it as an event on that lane's
+    stream. Videos already in the download cache skip the probe and go to
+    the fastest lane, as they cost no more than a short one.
+    """
+    url = event.data['url']
+    video_key = get_video_key(url)
+    # Peek, so the lane handler's own lookup is the only one counted
+    if video_key and deps.download_cache.peek(video_key) is not None:
+        duration = None
+        lane = lanes[0]
+    else:
+        duration = await probe_duration(probe_pool or deps.ytdl_pool, url)
+        lane = lane_for(duration, lanes)
+
+    LANE_ROUTED.labels(lane.name).inc()
+    logger.info(f"Routing {url} ({duration if duration is not None else '?'}s) to the {lane.name} lane")
+    return Event(
+        id=event.id,
+        name=lane_stream(lane),
+        data={**event.data, 'duration': duration},
+        meta=event.meta,
+        # Keeps the original request time on the lane entry
+        timestamp=getattr(event, 'timestamp', None)
+    )
@@ -1,87 +1,184 @@
 import os
+import asyncio
 import shutil
+import hashlib
 import subprocess
 import logging
+from functools import partial
 from tempfile import mkdtemp
+from typing import Dict, List, Optional, Tuple
 from openai import AsyncOpenAI
+from infra.aio import gather_or_cancel
+from infra.limiter import RateLimiter
+from infra.media import MediaRunner
+from infra.metrics import track_stage
 from domain.handler.donwload_audio import download_youtube_audio
-from domain.types import Deps, YoutubeAudioDownloadedEvent, TranscriptionCreatedEvent, YoutubeAudioRequestedEvent
+from domain.types import Deps, CachedTranscription, YoutubeAudioDownloadedEvent, TranscriptionCreatedEvent, YoutubeAudioRequestedEvent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def transcribe_audio(deps: Deps, event: YoutubeAudioDownloadedEvent) -> TranscriptionCreatedEvent:
-    MAX_SIZE = 23 * 1024 * 1024
+# Transcoding and transcription parameters, all part of the result cache key
+MAX_SIZE = 23 * 1024 * 1024
+MP3_BITRATE = '64k'
+SEGMENT_TIME = 600
+TRANSCRIPTION_MODEL = "whisper-1"
+TRANSCRIPTION_FORMAT = "text"
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(partial(f.read, 1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+async def transcription_cache_key(audio_path: str) -> str:
+    """
+    Key a transcription by the audio content and every parameter that affects
+    the transcoded chunks and the transcript, so a hit is safe to reuse.
+    Hashing a part runs on the default executor to keep the loop free.
+    """
+    loop = asyncio.get_running_loop()
+    digest = await loop.run_in_executor(None, file_digest, audio_path)
+    return ':'.join([
+        digest,
+        MP3_BITRATE,
+        str(SEGMENT_TIME),
+        str(MAX_SIZE),
+        TRANSCRIPTION_MODEL,
+        TRANSCRIPTION_FORMAT
+    ])
+
+async def transcribe_file(limiter: RateLimiter, client: AsyncOpenAI, path: str) -> str:
+    async with limiter:
+        with track_stage('transcription_api') as stage, open(path, "rb") as f:
+            stage.bytes = os.path.getsize(path)
+            return await client.audio.transcriptions.create(
+                model=TRANSCRIPTION_MODEL,
+                file=f,
+                response_format=TRANSCRIPTION_FORMAT
+            )
+
+async def convert_to_mp3(runner: MediaRunner, input_path: str, mp3_path: str) -> None:
+    """Transcode a downloaded part to mp3 for the transcription API"""
+    # Use lower bitrate for MP3 conversion
+    with track_stage('transcode') as stage:
+        stage.bytes = os.path.getsize(input_path)
+        await runner.run([
+            'ffmpeg', '-i', input_path,
+            '-vn',
+            '-acodec', 'libmp3lame',
+            '-ab', MP3_BITRATE,  # Lower bitrate
+            mp3_path
+        ])
+
+async def transcribe_part(
+    deps: Deps,
+    client: AsyncOpenAI,
+    mp4_path: str,
+    work_dir: str
+) -> List[Tuple[Optional[str], str]]:
+    """
+    Transcode a downloaded part to mp3 and transcribe it. Returns
+    (chunk file name, transcript) pairs; the name is None if the part
+    was small enough to send in one request.
+    """
+    mp3_path = os.path.join(work_dir, "converted.mp3")
+
+    await convert_to_mp3(deps.media_runner, mp4_path, mp3_path)
+
+    # Process single file if under limit
+    if os.path.getsize(mp3_path) <= MAX_SIZE:
+        return [(None, await transcribe_file(deps.transcription_limiter, client, mp3_path))]
+
+    # Split MP3 if still too large
+    logger.info(f"MP3 too large ({os.path.getsize(mp3_path)}), splitting...")
+    split_dir = os.path.join(work_dir, "splits")
+    os.makedirs(split_dir, exist_ok=True)
+
+    with track_stage('transcode_split') as stage:
+        stage.bytes = os.path.getsize(mp3_path)
+        await deps.media_runner.run([
+            'ffmpeg', '-i', mp3_path,
+            '-f', 'segment',
+            '-segment_time', str(SEGMENT_TIME),
+            '-c:a', 'libmp3lame',
+            '-ab', MP3_BITRATE,
+            os.path.join(split_dir, f'chunk_%03d.mp3')
+        ])
+
+    # Transcribe chunks concurrently; gather keeps them in order
+    chunk_files = sorted(os.listdir(split_dir))
+    transcripts = await gather_or_cancel(*(
+        transcribe_file(deps.transcription_limiter, client, os.path.join(split_dir, chunk_file))
+        for chunk_file in chunk_files
+    ))
+    return list(zip(chunk_files, transcripts))
+
+async def transcribe_local_part(
+    deps: Deps,
+    client: AsyncOpenAI,
+    file_info: dict,
+    mp4_path: str,
+    work_dir: str
+) -> List[dict]:
+    """Transcribe one part from local disk and write its transcripts to storage"""
+    cache_key = await transcription_cache_key(mp4_path)
+    cached = deps.transcription_cache.get(cache_key)
+    logger.info(
+        f"Transcription cache {'hit' if cached else 'miss'} for {file_info['path']} "
+        f"(hit rate {deps.transcription_cache.hit_rate:.2%})"
+    )
+    if cached:
+        chunks = cached.chunks
+    else:
+        chunks = await transcribe_part(deps, client, mp4_path, work_dir)
+        deps.transcription_cache.set(cache_key, CachedTranscription(
+            chunks=chunks,
+            size=sum(len(transcript) for _, transcript in chunks)
+        ))
+
     transcriptions = []
+    for chunk_file, transcript in chunks:
+        if chunk_file is None:
+            title = file_info['title']
+            transcription_path = f"transcription:{file_info['path']}"
+        else:
+            title = f"{os.path.splitext(file_info['title'])[0]}-{chunk_file}"
+            transcription_path = f"transcription:{file_info['path']}-{chunk_file}"
+        await deps.file_storage.write(transcription_path, transcript.encode())
+        transcriptions.append({
+            'title': title,
+            'path': transcription_path
+        })
+    return transcriptions
+
+async def transcribe_stored_part(
+    deps: Deps,
+    client: AsyncOpenAI,
+    file_info: dict,
+    work_dir: str
+) -> List[dict]:
+    """Fetch one stored part from file storage and transcribe it"""
+    mp4_path = os.path.join(work_dir, f"input_{file_info['title']}")
+    with track_stage('storage_download') as stage:
+        await deps.file_storage.read_to_file(file_info['path'], mp4_path)
+        stage.bytes = os.path.getsize(mp4_path)
+    return await transcribe_local_part(deps, client, file_info, mp4_path, work_dir)
+
+async def transcribe_audio(deps: Deps, event: YoutubeAudioDownloadedEvent) -> TranscriptionCreatedEvent:
     client = AsyncOpenAI()
     temp_dir = mkdtemp()
     logger.info(f"Event: {event}")
 
     try:
-        for file_info in event.data:
-            audio_data = await deps.file_storage.read(file_info['path'])
-            mp4_path = os.path.join(temp_dir, f"input_{file_info['title']}")
-            mp3_path = os.path.join(temp_dir, f"converted_{file_info['title']}.mp3")
-            
-            with open(mp4_path, "wb") as f:
-                f.write(audio_data)
-
-            # Use lower bitrate for MP3 conversion
-            subprocess.run([
-                'ffmpeg', '-i', mp4_path,
-                '-vn',
-                '-acodec', 'libmp3lame',
-                '-ab', '64k',  # Lower bitrate
-                mp3_path
-            ], check=True, capture_output=True)
-
-            # Split MP3 if still too large
-            if os.path.getsize(mp3_path) > MAX_SIZE:
-                logger.info(f"MP3 too large ({os.path.getsize(mp3_path)}), splitting...")
-                split_dir = os.path.join(temp_dir, "splits")
-                os.makedirs(split_dir, exist_ok=True)
-                
-                subprocess.run([
-                    'ffmpeg', '-i', mp3_path,
-                    '-f', 'segment',
-                    '-segment_time', '600',
-                    '-c:a', 'libmp3lame',
-                    '-ab', '64k',
-                    os.path.join(split_dir, f'chunk_%03d.mp3')
-                ], check=True, capture_output=True)
-                
-                # Process each chunk
-                for chunk_file in sorted(os.listdir(split_dir)):
-                    chunk_path = os.path.join(split_dir, chunk_file)
-                    with open(chunk_path, "rb") as f:
-                        transcript = await client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=f,
-                            response_format="text"
-                        )
-                        
-                    chunk_title = f"{os.path.splitext(file_info['title'])[0]}-{chunk_file}"
-                    transcription_path = f"transcription:{chunk_title}"
-                    await deps.file_storage.write(transcription_path, transcript.encode())
-                    transcriptions.append({
-                        'title': chunk_title,
-                        'path': transcription_path
-                    })
-            else:
-                # Process single file if under limit
-                with open(mp3_path, "rb") as f:
-                    transcript = await client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=f,
-                        response_format="text"
-                    )
-
-                transcription_path = f"transcription:{file_info['path']}"
-                await deps.file_storage.write(transcription_path, transcript.encode())
-                transcriptions.append({
-                    'title': file_info['title'],
-                    'path': transcription_path
-                })
+        # Parts run concurrently; API calls are bounded by the shared limiter
+        results = await gather_or_cancel(*(
+            transcribe_stored_part(deps, client, file_info, mkdtemp(dir=temp_dir))
+            for file_info in event.data
+        ))
+        transcriptions = [item for part in results for item in part]
 
         return TranscriptionCreatedEvent(
             name='transcriptions_created',
@@ -96,9 +193,62 @@ async def transcribe_audio(deps: Deps, event: YoutubeAudioDownloadedEvent) -> Tr
     finally:
         shutil.rmtree(temp_dir, ignore_errors=True)
 
-async def process_youtube_audio(deps: Deps, event: YoutubeAudioRequestedEvent) -> YoutubeAudioDownloadedEvent:
-    """Download and transcribe YouTube audio"""
-    download_event = await download_youtube_audio(deps, event)
-    out_event = await transcribe_audio(deps, download_event)
-    await deps.event_store.write_event(out_event);
-    logger.info(f"Event written: {out_event}")
+async def process_youtube_audio(
+    deps: Deps,
+    event: YoutubeAudioRequestedEvent,
+    publish: bool = True
+) -> TranscriptionCreatedEvent:
+    """
+    Download and transcribe YouTube audio. Each part is transcribed from the
+    local copy as soon as it is split, while the parts are still uploading.
+    With publish=False the caller publishes the returned event itself.
+    """
+    client = AsyncOpenAI()
+    temp_dir = mkdtemp()
+    transcribed: Dict[str, List[dict]] = {}
+
+    async def on_part(file_info: dict, local_path: str) -> None:
+        try:
+            transcribed[file_info['path']] = await transcribe_local_part(
+                deps, client, file_info, local_path, mkdtemp(dir=temp_dir)
+            )
+        except subprocess.CalledProcessError as e:
+            raise ValueError(f"FFmpeg conversion failed: {e.stderr.decode()}")
+
+    try:
+        download_event = await download_youtube_audio(deps, event, on_part=on_part)
+
+        # Parts served from the download cache or a shared in-flight
+        # download were never on local disk for this call
+        missing = [
+            file_info for file_info in download_event.data
+            if file_info['path'] not in transcribed
+        ]
+        if missing:
+            results = await gather_or_cancel(*(
+                transcribe_stored_part(deps, client, file_info, mkdtemp(dir=temp_dir))
+                for file_info in missing
+            ))
+            transcribed.update({
+                file_info['path']: result
+                for file_info, result in zip(missing, results)
+            })
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"FFmpeg conversion failed: {e.stderr.decode()}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    out_event = TranscriptionCreatedEvent(
+        name='transcriptions_created',
+        meta=event.meta,
+        data=[
+            item
+            for file_info in download_event.data
+            for item in transcribed[file_info['path']]
+        ]
+    )
+    if publish:
+        with track_stage('event_publish'):
+            await deps.event_store.write_event(out_event)
+        logger.info(f"Event written: {out_event}")
+    return out_event
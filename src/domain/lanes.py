@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from domain.constants import LaneConfig
+
+@dataclass(frozen=True)
+class Lane:
+    name: str
+    # Longest duration in seconds routed here; None takes everything longer
+    max_duration: Optional[float]
+    weight: float
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "short=5,medium=3,long=2" into lane weights"""
+    weights = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        if not weight:
+            raise ValueError(f"Invalid lane weight: {item!r}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+def build_lanes(
+    short_max: float = LaneConfig.SHORT_MAX_DURATION,
+    medium_max: float = LaneConfig.MEDIUM_MAX_DURATION,
+    weights: str = LaneConfig.WEIGHTS
+) -> List[Lane]:
+    """The short, medium and long lanes, ordered by duration"""
+    if not 0 < short_max < medium_max:
+        raise ValueError("Lane durations must satisfy 0 < short < medium")
+    parsed = parse_weights(weights)
+    names = ['short', 'medium', 'long']
+    if sorted(parsed) != sorted(names) or any(weight <= 0 for weight in parsed.values()):
+        raise ValueError(f"Lane weights need a positive weight for each of {', '.join(names)}")
+    return [
+        Lane('short', short_max, parsed['short']),
+        Lane('medium', medium_max, parsed['medium']),
+        Lane('long', None, parsed['long'])
+    ]
+
+def lane_for(duration: Optional[float], lanes: List[Lane]) -> Lane:
+    """The first lane the duration fits; unknown durations (live, missing) go last"""
+    if duration is not None:
+        for lane in lanes:
+            if lane.max_duration is None or duration <= lane.max_duration:
+                return lane
+    return lanes[-1]
+
+def allocate_concurrency(total: int, lanes: List[Lane]) -> Dict[str, int]:
+    """
+    Split total handler slots between lanes by weight (largest remainder).
+    Every lane gets at least one slot, so the total can exceed the budget
+    when it is smaller than the number of lanes.
+    """
+    weight_sum = sum(lane.weight for lane in lanes)
+    budget = max(total, len(lanes)) - len(lanes)
+    shares = {lane.name: budget * lane.weight / weight_sum for lane in lanes}
+    slots = {name: 1 + int(share) for name, share in shares.items()}
+    leftover = budget - sum(int(share) for share in shares.values())
+    for name in sorted(shares, key=lambda name: shares[name] - int(shares[name]), reverse=True)[:leftover]:
+        slots[name] += 1
+    return slots
@@ -1,6 +1,11 @@
 from dataclasses import dataclass
-from typing import Any, Protocol, List
+from typing import Any, Protocol, List, Optional, Tuple
+from infra.cache import TTLCache
 from infra.core_types import EventStore, FileStorage
+from infra.limiter import RateLimiter
+from infra.media import MediaRunner
+from infra.single_flight import SingleFlight
+from infra.ytdlp import YoutubeDLPool
 
 @dataclass
 class YoutubeAudioRequestData:
@@ -10,6 +15,8 @@ class YoutubeAudioRequestData:
 class YoutubeAudioMeta:
     request_id: str
     url: str
+    # Who submitted the request; jobs are shared fairly between tenants
+    tenant_id: Optional[str] = None
 
 @dataclass
 class YoutubeAudioRequestedEvent:
@@ -18,15 +25,32 @@ class YoutubeAudioRequestedEvent:
     data: YoutubeAudioRequestData
     meta: YoutubeAudioMeta
 
-class Deps(Protocol):
-    file_storage: FileStorage
-    event_store: EventStore
-
 @dataclass
 class YoutubeAudioData:
     title: str
     path: str
 
+@dataclass
+class CachedDownload:
+    parts: List[YoutubeAudioData]
+    size: int
+
+@dataclass
+class CachedTranscription:
+    # (chunk file name or None for an unsplit part, transcript)
+    chunks: List[Tuple[Optional[str], str]]
+    size: int
+
+class Deps(Protocol):
+    file_storage: FileStorage
+    event_store: EventStore
+    download_cache: TTLCache[CachedDownload]
+    transcription_cache: TTLCache[CachedTranscription]
+    transcription_limiter: RateLimiter
+    media_runner: MediaRunner
+    ytdl_pool: YoutubeDLPool
+    single_flight: SingleFlight
+
 @dataclass
 class YoutubeAudioDownloadedEvent:
     name: str
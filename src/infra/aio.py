@@ -0,0 +1,13 @@
+import asyncio
+from typing import Awaitable
+
+async def gather_or_cancel(*aws: Awaitable) -> list:
+    """Like asyncio.gather, but cancels the remaining awaitables if one fails"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
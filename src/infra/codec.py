@@ -0,0 +1,86 @@
+import json
+from typing import Any, Dict, List, Protocol
+
+class Codec(Protocol):
+    # Wire format written to the entry; codecs sharing one can read each other
+    format: str
+    def encode(self, value: Any) -> bytes: ...
+    def decode(self, raw: bytes) -> Any: ...
+    def decode_many(self, raws: List[bytes]) -> List[Any]: ...
+
+class JsonCodec:
+    """
+    The default, and the only format other services reading the streams are
+    guaranteed to understand
+    """
+    format = 'json'
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+    def decode_many(self, raws: List[bytes]) -> List[Any]:
+        # Each value is parsed on its own: joining them into one array would
+        # let a value like b'{"a":1},{"b":2}' spill into its neighbours
+        return [json.loads(raw) for raw in raws]
+
+class OrjsonCodec:
+    """JSON through orjson; entries stay readable by JsonCodec"""
+    format = 'json'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def encode(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def decode(self, raw: bytes) -> Any:
+        return self._orjson.loads(raw)
+
+    def decode_many(self, raws: List[bytes]) -> List[Any]:
+        loads = self._orjson.loads
+        return [loads(raw) for raw in raws]
+
+class MsgpackCodec:
+    """MessagePack; the most compact, but needs msgpack on every reader"""
+    format = 'msgpack'
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, raw: bytes) -> Any:
+        return self._msgpack.unpackb(raw, raw=False)
+
+    def decode_many(self, raws: List[bytes]) -> List[Any]:
+        return [self.decode(raw) for raw in raws]
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+    'msgpack': MsgpackCodec
+}
+
+_instances: Dict[str, Codec] = {}
+
+def get_codec(name: str) -> Codec:
+    """
+    Shared codec instance by name. orjson and msgpack are optional
+    dependencies, imported the first time their codec is asked for.
+    """
+    codec = _instances.get(name)
+    if codec is None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec: {name}")
+        try:
+            codec = CODECS[name]()
+        except ImportError as e:
+            raise ValueError(f"Codec {name} needs the {e.name} package installed") from e
+        _instances[name] = codec
+    return codec
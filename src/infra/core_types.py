@@ -1,19 +1,24 @@
 from dataclasses import dataclass
-from typing import Protocol, Any, Optional
+from typing import Protocol, Any, AsyncIterator, Iterable, List, Optional
 from typing_extensions import Callable
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     id: str
     name: str
     data: Any
-    meta: Any
+    meta: Any = None
     timestamp: Optional[str] = None
 
 class FileStorage(Protocol):
     async def read(self, path: str) -> bytes: ...
+    async def read_to_file(self, path: str, local_path: str) -> None: ...
+    def open_stream(self, path: str, offset: Optional[int] = None, length: Optional[int] = None) -> AsyncIterator[bytes]: ...
     async def write(self, path: str, data: bytes) -> None: ...
+    async def write_file(self, path: str, local_path: str) -> None: ...
+    async def write_stream(self, path: str, chunks: Iterable[bytes], length: Optional[int] = None) -> None: ...
 
 class EventStore(Protocol):
-    async def write_event(self, data: Event) -> str: ...
+    async def write_event(self, data: Event) -> Optional[str]: ...
+    async def write_events(self, events: List[Event]) -> List[str]: ...
     async def process_events(self, handler: Callable) -> None: ...
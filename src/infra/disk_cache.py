@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no directory locking
+    fcntl = None
+
+class DirectoryInUseError(RuntimeError):
+    """Another process already holds the cache directory"""
+
+class DiskCache:
+    """
+    Byte-bounded LRU cache of files in one directory. Entries are indexed in a
+    JSON file next to them, so the cache survives restarts. Files in the
+    directory that the index doesn't know about are removed on startup.
+    Safe to use from several threads.
+
+    Files handed out with pin=True are not unlinked until release() is called
+    for them, even if their entry is evicted or replaced meanwhile. Access
+    times from get() are written to the index at most every save_interval
+    seconds, or with the next put() or flush().
+
+    With exclusive=True the directory is locked for this instance's process,
+    since two processes sharing one would delete each other's files as
+    untracked and overwrite each other's index; a second process gets
+    DirectoryInUseError.
+    """
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        index_name: str = 'index.json',
+        save_interval: float = 60,
+        exclusive: bool = False
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.directory / index_name
+        self.lock_path = self.directory / '.lock'
+        self._lock_file = self._acquire_directory() if exclusive else None
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Pin counts by filename, and pinned files already dropped from the index
+        self._pins: Dict[str, int] = {}
+        self._orphaned: Set[str] = set()
+        self._dirty = False
+        self._saved_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _acquire_directory(self):
+        lock_file = open(self.lock_path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise DirectoryInUseError(f"Cache directory {self.directory} is in use by another process")
+        return lock_file
+
+    def close(self) -> None:
+        """Save pending access times and release the directory lock"""
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _load(self) -> None:
+        try:
+            self._entries = json.loads(self.index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+        # Drop entries whose file is gone, and files nothing points to
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if (self.directory / entry['filename']).exists()
+        }
+        known = {entry['filename'] for entry in self._entries.values()}
+        for path in self.directory.iterdir():
+            if path.is_file() and path not in (self.index_path, self.lock_path) and path.name not in known:
+                path.unlink(missing_ok=True)
+
+        self._evict()
+        self._save()
+
+    def _save(self) -> None:
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(self._entries))
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _remove_file(self, filename: str) -> None:
+        """Unlink a file dropped from the index, or leave it to its last release()"""
+        if self._pins.get(filename):
+            self._orphaned.add(filename)
+        else:
+            (self.directory / filename).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        by_age = sorted(self._entries.items(), key=lambda item: item[1]['last_access'])
+        total = self.size
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            self._remove_file(entry['filename'])
+            del self._entries[key]
+            total -= entry['size']
+            self.evictions += 1
+
+    def _pin(self, filename: str) -> None:
+        self._pins[filename] = self._pins.get(filename, 0) + 1
+
+    def get(self, key: str, pin: bool = False) -> Optional[Tuple[Path, Dict[str, Any]]]:
+        """Cached file path and its metadata, or None. pin=True needs a release()"""
+        with self._lock:
+            entry = self._entries.get(key)
+            path = self.directory / entry['filename'] if entry else None
+            if entry is None or not path.exists():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            entry['last_access'] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+            if pin:
+                self._pin(entry['filename'])
+            self.hits += 1
+            return path, entry['metadata']
+
+    def release(self, path: Path) -> None:
+        """Drop a pin taken by get() or put(), unlinking the file if it was evicted"""
+        filename = Path(path).name
+        with self._lock:
+            count = self._pins.get(filename, 0) - 1
+            if count > 0:
+                self._pins[filename] = count
+                return
+            self._pins.pop(filename, None)
+            if filename in self._orphaned:
+                self._orphaned.discard(filename)
+                (self.directory / filename).unlink(missing_ok=True)
+
+    def flush(self) -> None:
+        """Write access times recorded since the last save to the index"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def put(
+        self,
+        key: str,
+        source: Path,
+        metadata: Optional[Dict[str, Any]] = None,
+        pin: bool = False
+    ) -> Optional[Path]:
+        """
+        Move source into the cache under key and return its new path.
+        Files larger than the whole budget are left in place and None is returned.
+        With pin=True the returned path needs a release().
+        """
+        source = Path(source)
+        if source.stat().st_size > self.max_bytes:
+            return None
+
+        filename = hashlib.sha256(key.encode()).hexdigest()[:32] + source.suffix
+        path = self.directory / filename
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old and old['filename'] != filename:
+                self._remove_file(old['filename'])
+
+            os.replace(source, path)
+            # The new file takes over the name from any evicted pinned one
+            self._orphaned.discard(filename)
+            if pin:
+                self._pin(filename)
+            self._entries[key] = {
+                'filename': filename,
+                'size': path.stat().st_size,
+                'last_access': time.time(),
+                'metadata': metadata or {}
+            }
+            self._evict()
+            self._save()
+        return path
+
+    @property
+    def size(self) -> int:
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
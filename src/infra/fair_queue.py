@@ -0,0 +1,101 @@
+from collections import deque
+from typing import Deque, Dict, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+class FairQueue(Generic[T]):
+    """
+    Per-key FIFO sub-queues served by deficit round robin: each key, in
+    turn, may take up to quantum items before the next key gets its turn.
+    Keys with max_in_flight items taken and not yet done are skipped until
+    one finishes. Not thread-safe; meant for a single event loop.
+    """
+    def __init__(self, quantum: int = 1, max_in_flight: Optional[int] = None):
+        if quantum < 1:
+            raise ValueError("quantum must be at least 1")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.quantum = quantum
+        self.max_in_flight = max_in_flight
+        self._queues: Dict[Hashable, Deque[T]] = {}
+        # Keys with queued items, in round-robin order; the head has the turn
+        self._active: Deque[Hashable] = deque()
+        self._deficit: Dict[Hashable, int] = {}
+        self._in_flight: Dict[Hashable, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depth(self, key: Hashable) -> int:
+        queue = self._queues.get(key)
+        return len(queue) if queue else 0
+
+    def in_flight(self, key: Hashable) -> int:
+        return self._in_flight.get(key, 0)
+
+    def depths(self) -> Dict[Hashable, int]:
+        """Queued items per key, for keys with any"""
+        return {key: len(queue) for key, queue in self._queues.items()}
+
+    def keys(self) -> Iterable[Hashable]:
+        """Keys with queued or in-flight items"""
+        return set(self._queues) | set(self._in_flight)
+
+    def push(self, key: Hashable, item: T) -> None:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._active.append(key)
+            self._deficit[key] = 0
+        queue.append(item)
+        self._size += 1
+
+    def _capped(self, key: Hashable) -> bool:
+        return self.max_in_flight is not None and self._in_flight.get(key, 0) >= self.max_in_flight
+
+    def _end_turn(self) -> None:
+        self._deficit[self._active[0]] = 0
+        self._active.rotate(-1)
+
+    def pop(self) -> Optional[Tuple[Hashable, T]]:
+        """Next (key, item) to run, or None if nothing queued can run now"""
+        for _ in range(len(self._active)):
+            key = self._active[0]
+            if self._capped(key):
+                self._end_turn()
+                continue
+            if self._deficit[key] == 0:
+                # Start of this key's turn
+                self._deficit[key] = self.quantum
+
+            queue = self._queues[key]
+            item = queue.popleft()
+            self._size -= 1
+            self._deficit[key] -= 1
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            if not queue:
+                del self._queues[key]
+                del self._deficit[key]
+                self._active.popleft()
+            elif self._deficit[key] == 0:
+                self._active.rotate(-1)
+            return key, item
+        return None
+
+    def done(self, key: Hashable) -> None:
+        """Mark an item taken with pop as finished"""
+        count = self._in_flight.get(key, 0) - 1
+        if count > 0:
+            self._in_flight[key] = count
+        else:
+            self._in_flight.pop(key, None)
+
+    def drain(self) -> List[Tuple[Hashable, T]]:
+        """Remove and return every queued (key, item); in-flight counts are kept"""
+        items = [(key, item) for key, queue in self._queues.items() for item in queue]
+        self._queues.clear()
+        self._active.clear()
+        self._deficit.clear()
+        self._size = 0
+        return items
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional
+
+class RateLimiter:
+    """
+    Async limiter shared by every job in the process. Caps how many calls run
+    at once and, optionally, how many start in any rolling 60 second window.
+    """
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: Optional[int] = None
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._started: Deque[float] = deque()
+
+    async def _wait_for_rate(self) -> None:
+        if not self.requests_per_minute:
+            return
+
+        # Calls queue on the lock so they start in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._started and now - self._started[0] >= 60:
+                    self._started.popleft()
+                if len(self._started) < self.requests_per_minute:
+                    self._started.append(now)
+                    return
+                await asyncio.sleep(60 - (now - self._started[0]))
+
+    async def __aenter__(self) -> 'RateLimiter':
+        await self._semaphore.acquire()
+        try:
+            await self._wait_for_rate()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._semaphore.release()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import shutil
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+from infra.core_types import FileStorage
+
+# Chunk size for streamed reads and copies
+CHUNK_SIZE = 1024 * 1024
+
+class LocalFileStorage(FileStorage):
+    """
+    FileStorage on a local directory. Stands in for MinIO in benchmarks,
+    load tests and single-host setups; blocking file I/O runs on the default
+    executor like the MinIO client calls do.
+    """
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _resolve(self, path: str) -> Path:
+        full_path = (self.root / path).resolve()
+        if not full_path.is_relative_to(self.root):
+            raise ValueError(f"Path escapes storage root: {path}")
+        return full_path
+
+    def _open_for_write(self, path: str):
+        full_path = self._resolve(path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        return open(full_path, 'wb')
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(fn, *args))
+
+    async def read(self, path: str) -> bytes:
+        return await self._run(self._resolve(path).read_bytes)
+
+    def _copy_to_file(self, path: str, local_path: str) -> None:
+        shutil.copyfile(self._resolve(path), local_path)
+
+    async def read_to_file(self, path: str, local_path: str) -> None:
+        await self._run(self._copy_to_file, path, local_path)
+
+    async def open_stream(
+        self,
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream a file, or a byte range of it, in fixed-size chunks"""
+        f = await self._run(open, self._resolve(path), 'rb')
+        try:
+            if offset:
+                f.seek(offset)
+            remaining = length or None
+            while remaining is None or remaining > 0:
+                size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = await self._run(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+
+    def _write(self, path: str, data: bytes) -> None:
+        with self._open_for_write(path) as f:
+            f.write(data)
+
+    async def write(self, path: str, data: bytes) -> None:
+        await self._run(self._write, path, data)
+
+    def _write_file(self, path: str, local_path: str) -> None:
+        full_path = self._resolve(path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, full_path)
+
+    async def write_file(self, path: str, local_path: str) -> None:
+        await self._run(self._write_file, path, local_path)
+
+    def _write_stream(self, path: str, chunks: Iterable[bytes]) -> None:
+        with self._open_for_write(path) as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    async def write_stream(
+        self,
+        path: str,
+        chunks: Iterable[bytes],
+        length: Optional[int] = None
+    ) -> None:
+        await self._run(self._write_stream, path, chunks)
+
+    async def delete(self, path: str) -> None:
+        await self._run(os.remove, self._resolve(path))
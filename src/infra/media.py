@@ -0,0 +1,48 @@
+import asyncio
+import subprocess
+from typing import List, Optional
+
+class MediaRunner:
+    """
+    Runs ffmpeg/ffprobe as asyncio subprocesses so transcodes never block the
+    event loop. Caps how many processes run at once across the whole worker.
+    Failures raise subprocess.CalledProcessError (with captured stderr) and
+    timeouts raise subprocess.TimeoutExpired, as subprocess.run would.
+    """
+    def __init__(self, max_processes: int = 4, timeout: Optional[float] = None):
+        if max_processes < 1:
+            raise ValueError("max_processes must be at least 1")
+        self.max_processes = max_processes
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_processes)
+
+    async def run(self, cmd: List[str], timeout: Optional[float] = None) -> bytes:
+        """Run cmd and return its stdout"""
+        timeout = timeout if timeout is not None else self.timeout
+
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            except BaseException:
+                # Cancelled: don't leave the child running
+                await self._kill(process)
+                raise
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return stdout
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Stages run from sub-second API calls up to hour-long downloads
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+STAGE_SECONDS = Histogram(
+    'youtube_downloader_stage_seconds',
+    'Time spent in each pipeline stage',
+    ['stage', 'outcome'],
+    buckets=STAGE_BUCKETS
+)
+STAGE_BYTES = Counter(
+    'youtube_downloader_stage_bytes',
+    'Bytes moved by each pipeline stage',
+    ['stage', 'outcome']
+)
+STAGE_THROUGHPUT = Histogram(
+    'youtube_downloader_stage_bytes_per_second',
+    'Throughput of each byte-moving pipeline stage',
+    ['stage'],
+    buckets=tuple(2 ** n * 1024 for n in range(4, 18, 2))
+)
+
+PENDING_MESSAGES = Gauge(
+    'youtube_downloader_pending_messages',
+    'Delivered but unacked stream messages per consumer',
+    ['stream', 'consumer']
+)
+PENDING_OLDEST_IDLE = Gauge(
+    'youtube_downloader_pending_oldest_idle_seconds',
+    'Idle time of the longest-waiting pending message in the group',
+    ['stream']
+)
+CLAIMED_MESSAGES = Counter(
+    'youtube_downloader_claimed_messages',
+    'Stalled messages claimed from other consumers',
+    ['stream']
+)
+
+FAILED_MESSAGES = Counter(
+    'youtube_downloader_failed_messages',
+    'Failed stream messages by what happened next',
+    ['stream', 'action']
+)
+
+STREAM_BACKLOG = Gauge(
+    'youtube_downloader_stream_backlog',
+    'Undelivered plus pending messages of the slowest consumer group, as seen by producers',
+    ['stream']
+)
+BACKPRESSURE_EVENTS = Counter(
+    'youtube_downloader_backpressure_events',
+    'Writes held back by producer backpressure',
+    ['stream', 'action']
+)
+
+LANE_ROUTED = Counter(
+    'youtube_downloader_lane_routed',
+    'Requests routed to each priority lane',
+    ['lane']
+)
+
+TENANT_QUEUE_DEPTH = Gauge(
+    'youtube_downloader_tenant_queue_depth',
+    'Messages read and waiting for a handler slot, per tenant',
+    ['stream', 'tenant']
+)
+TENANT_IN_FLIGHT = Gauge(
+    'youtube_downloader_tenant_in_flight',
+    'Messages being handled, per tenant',
+    ['stream', 'tenant']
+)
+DEFERRED_MESSAGES = Counter(
+    'youtube_downloader_deferred_messages',
+    'Messages moved to the tail of the stream to reach other tenants',
+    ['stream']
+)
+
+class CacheCollector:
+    """
+    Exports the counters of registered caches when scraped, so lookups
+    don't have to update metrics themselves. Any cache with hits, misses,
+    evictions, size and __len__ (TTLCache) can be registered.
+    """
+    def __init__(self):
+        self.caches: Dict[str, Any] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily('youtube_downloader_cache_hits', 'Cache lookups that found an entry', labels=['cache'])
+        misses = CounterMetricFamily('youtube_downloader_cache_misses', 'Cache lookups that found nothing', labels=['cache'])
+        evictions = CounterMetricFamily('youtube_downloader_cache_evictions', 'Entries evicted to stay within budget', labels=['cache'])
+        size = GaugeMetricFamily('youtube_downloader_cache_size', 'Size of the cached entries, in the unit of the cache budget', labels=['cache'])
+        entries = GaugeMetricFamily('youtube_downloader_cache_entries', 'Entries in the cache', labels=['cache'])
+        for name, cache in list(self.caches.items()):
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            evictions.add_metric([name], cache.evictions)
+            size.add_metric([name], cache.size)
+            entries.add_metric([name], len(cache))
+        return [hits, misses, evictions, size, entries]
+
+CACHE_COLLECTOR = CacheCollector()
+REGISTRY.register(CACHE_COLLECTOR)
+
+def register_cache(name: str, cache: Any) -> None:
+    """Export cache's counters labelled cache=name, replacing any cache registered under it"""
+    CACHE_COLLECTOR.caches[name] = cache
+
+class StageTimer:
+    """Handle for a running stage; set bytes to record how much it moved"""
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.bytes: Optional[int] = None
+
+def observe_stage(stage: str, seconds: float, outcome: str = 'success', size: Optional[int] = None) -> None:
+    """Record one finished run of a stage timed elsewhere"""
+    STAGE_SECONDS.labels(stage, outcome).observe(seconds)
+    if size is not None:
+        STAGE_BYTES.labels(stage, outcome).inc(size)
+        if outcome == 'success' and seconds > 0:
+            STAGE_THROUGHPUT.labels(stage).observe(size / seconds)
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[StageTimer]:
+    """
+    Time a pipeline stage and count it under outcome "success", "error" or
+    "cancelled". Bytes set on the yielded timer are added to the byte
+    counter and, for successful stages, to the throughput histogram.
+    """
+    timer = StageTimer(stage)
+    outcome = 'success'
+    start = time.perf_counter()
+    try:
+        yield timer
+    except asyncio.CancelledError:
+        outcome = 'cancelled'
+        raise
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, outcome, timer.bytes)
+
+def start_metrics_server(port: int, addr: str = '0.0.0.0') -> None:
+    """Serve the Prometheus text exposition on a background thread"""
+    start_http_server(port, addr=addr)
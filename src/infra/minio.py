@@ -3,7 +3,35 @@ from minio.error import S3Error
 from infra.core_types import FileStorage
 import io
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+# Multipart chunk size for streamed uploads (MinIO minimum is 5 MiB)
+PART_SIZE = 10 * 1024 * 1024
+# Chunk size for streamed downloads
+CHUNK_SIZE = 1024 * 1024
+
+class _IterableReader(io.RawIOBase):
+    """File-like adapter so minio can read() from an iterable of bytes"""
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._buffer = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
 
 class MinioFileStorage(FileStorage):
     def __init__(
@@ -12,7 +40,8 @@ class MinioFileStorage(FileStorage):
         access_key: str,
         secret_key: str,
         bucket: str,
-        secure: bool = True
+        secure: bool = True,
+        io_workers: int = 4
     ):
         self.client = Minio(
             endpoint,
@@ -21,6 +50,11 @@ class MinioFileStorage(FileStorage):
             secure=secure
         )
         self.bucket = bucket
+        # Dedicated pool so long streamed copies don't starve the default executor
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=io_workers,
+            thread_name_prefix='minio-io'
+        )
         self._ensure_bucket()
         
     def _ensure_bucket(self) -> None:
@@ -56,6 +90,63 @@ class MinioFileStorage(FileStorage):
                 response.close()
                 response.release_conn()
 
+    def _copy_to_file(self, path: str, local_path: str) -> None:
+        response = self.client.get_object(self.bucket, path)
+        try:
+            with open(local_path, 'wb') as f:
+                for chunk in response.stream(CHUNK_SIZE):
+                    f.write(chunk)
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def read_to_file(self, path: str, local_path: str) -> None:
+        """Download a file from MinIO to local disk in fixed-size chunks"""
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self._io_executor,
+                partial(self._copy_to_file, path, local_path)
+            )
+
+        except S3Error as e:
+            raise Exception(f"Failed to read file from MinIO: {e}")
+
+    async def open_stream(
+        self,
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream a file, or a byte range of it, from MinIO in fixed-size chunks"""
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                self._io_executor,
+                partial(
+                    self.client.get_object,
+                    self.bucket,
+                    path,
+                    offset=offset or 0,
+                    length=length or 0
+                )
+            )
+        except S3Error as e:
+            raise Exception(f"Failed to read file from MinIO: {e}")
+
+        try:
+            while True:
+                chunk = await loop.run_in_executor(
+                    self._io_executor,
+                    partial(response.read, CHUNK_SIZE)
+                )
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
     async def write(self, path: str, data: bytes) -> None:
         """Write file to MinIO asynchronously"""
         try:
@@ -81,6 +172,48 @@ class MinioFileStorage(FileStorage):
             if 'data_stream' in locals():
                 data_stream.close()
 
+    async def write_file(self, path: str, local_path: str) -> None:
+        """Upload a local file to MinIO, streaming it from disk in parts"""
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None,
+                partial(
+                    self.client.fput_object,
+                    self.bucket,
+                    path,
+                    local_path,
+                    part_size=PART_SIZE
+                )
+            )
+
+        except S3Error as e:
+            raise Exception(f"Failed to write file to MinIO: {e}")
+
+    async def write_stream(
+        self,
+        path: str,
+        chunks: Iterable[bytes],
+        length: Optional[int] = None
+    ) -> None:
+        """Upload an iterable of bytes to MinIO using multipart upload"""
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None,
+                partial(
+                    self.client.put_object,
+                    self.bucket,
+                    path,
+                    _IterableReader(chunks),
+                    length if length is not None else -1,
+                    part_size=PART_SIZE
+                )
+            )
+
+        except S3Error as e:
+            raise Exception(f"Failed to write file to MinIO: {e}")
+
     async def delete(self, path: str) -> None:
         """Delete file from MinIO asynchronously"""
         try:
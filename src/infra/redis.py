@@ -1,20 +1,310 @@
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
 from redis.asyncio import Redis
-import json
+from redis.exceptions import ResponseError
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from infra.codec import Codec, get_codec
 from infra.core_types import Event, EventStore
+from infra.fair_queue import FairQueue
+from infra.metrics import (
+    BACKPRESSURE_EVENTS,
+    CLAIMED_MESSAGES,
+    DEFERRED_MESSAGES,
+    FAILED_MESSAGES,
+    PENDING_MESSAGES,
+    PENDING_OLDEST_IDLE,
+    STREAM_BACKLOG,
+    TENANT_IN_FLIGHT,
+    TENANT_QUEUE_DEPTH,
+    track_stage
+)
+
+logger = logging.getLogger(__name__)
+
+# Version of the entry layout; entries written before it existed have none
+SCHEMA_VERSION = 1
+
+Entry = Tuple[bytes, Dict[bytes, bytes]]
+
+def _entry_codec(data: Dict[bytes, bytes], codec: Optional[Codec]) -> Codec:
+    version = int(data.get(b'v', 1))
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Unsupported event schema version {version}")
+    fmt = data[b'codec'].decode() if b'codec' in data else 'json'
+    if codec is not None and codec.format == fmt:
+        return codec
+    return get_codec(fmt)
+
+def decode_message(message_id: bytes, data: Dict[bytes, bytes], codec: Optional[Codec] = None) -> Event:
+    """
+    Build an Event from a raw stream entry. The entry's own codec field
+    decides the format; codec is used for it when it reads that format.
+    """
+    entry_codec = _entry_codec(data, codec)
+    timestamp = data.get(b'timestamp')
+    return Event(
+        message_id.decode(),
+        data[b'name'].decode(),
+        entry_codec.decode(data[b'data']),
+        entry_codec.decode(data[b'meta']),
+        timestamp.decode() if timestamp is not None else None
+    )
+
+def decode_messages(
+    entries: List[Entry],
+    codec: Optional[Codec] = None
+) -> Tuple[List[Event], List[Tuple[Entry, Exception]]]:
+    """
+    Decode a batch of raw entries, returning the events and the entries that
+    failed with their errors. Empty entries (deleted messages still pending)
+    are skipped. A batch sharing one format is decoded with one call per
+    field; if that fails, or doesn't return a value per entry, entries are
+    decoded one by one to isolate the bad ones.
+    """
+    entries = [entry for entry in entries if entry[1]]
+    if not entries:
+        return [], []
+
+    try:
+        entry_codec = _entry_codec(entries[0][1], codec)
+        if all(_entry_codec(data, codec) is entry_codec for _, data in entries[1:]):
+            values = entry_codec.decode_many([data[b'data'] for _, data in entries])
+            metas = entry_codec.decode_many([data[b'meta'] for _, data in entries])
+            if not len(values) == len(metas) == len(entries):
+                raise ValueError("Batch decode returned the wrong number of values")
+            events = []
+            for (message_id, data), value, meta in zip(entries, values, metas):
+                timestamp = data.get(b'timestamp')
+                events.append(Event(
+                    message_id.decode(),
+                    data[b'name'].decode(),
+                    value,
+                    meta,
+                    timestamp.decode() if timestamp is not None else None
+                ))
+            return events, []
+    except Exception:
+        pass
+
+    events, failures = [], []
+    for message_id, data in entries:
+        try:
+            events.append(decode_message(message_id, data, codec))
+        except Exception as e:
+            failures.append(((message_id, data), e))
+    return events, failures
+
+def encode_event(event: Any, codec: Optional[Codec] = None) -> Dict[str, Any]:
+    """Stream entry fields for an Event or any event dataclass with name/data/meta"""
+    codec = codec or get_codec('json')
+    event_data = {
+        'name': event.name,
+        'meta': codec.encode(event.meta),
+        'data': codec.encode(event.data)
+    }
+    # Add timestamp if not provided
+    if getattr(event, 'timestamp', None):
+        event_data['timestamp'] = event.timestamp
+    else:
+        event_data['timestamp'] = datetime.now(timezone.utc).isoformat()
+    event_data['v'] = SCHEMA_VERSION
+    # JSON entries stay in the layout other services already read
+    if codec.format != 'json':
+        event_data['codec'] = codec.format
+    return event_data
+
+# How often a blocked read wakes up to look for due retries
+RETRY_POLL_INTERVAL = 1.0
+
+OVERLOAD_ACTIONS = ('reject', 'delay', 'shed')
+
+# Tenant of events tenant_key can't place
+DEFAULT_TENANT = 'default'
+
+class BackpressureError(Exception):
+    """A write was refused because the stream's consumers are too far behind"""
+    def __init__(self, stream: str, backlog: int):
+        super().__init__(f"Stream {stream} has a backlog of {backlog} messages")
+        self.stream = stream
+        self.backlog = backlog
+
+@dataclass
+class StreamLimits:
+    """
+    Retention and producer backpressure for one stream.
+
+    Every XADD to the stream trims it approximately, to about max_len
+    entries or to those younger than max_age seconds (one or the other).
+    Trimming doesn't look at consumer groups, so the bound has to be well
+    above what consumers can fall behind by; entries trimmed while still
+    pending are acked when they come back empty.
+
+    With max_backlog set, writes check the slowest group's backlog (lag
+    plus pending) first and, at or above it, overload decides: "reject"
+    raises BackpressureError, "shed" drops the write, and "delay" waits up
+    to overload_timeout for the backlog to drain and then raises.
+    """
+    max_len: Optional[int] = None
+    max_age: Optional[float] = None
+    max_backlog: Optional[int] = None
+    overload: str = 'reject'
+    overload_timeout: float = 30.0
+
+    def __post_init__(self):
+        if self.max_len is not None and self.max_age is not None:
+            raise ValueError("Set max_len or max_age, not both")
+        if self.overload not in OVERLOAD_ACTIONS:
+            raise ValueError(f"overload must be one of {', '.join(OVERLOAD_ACTIONS)}")
+
+    def xadd_args(self) -> Dict[str, Any]:
+        """Trimming arguments for XADD"""
+        if self.max_len is not None:
+            return {'maxlen': self.max_len, 'approximate': True}
+        if self.max_age is not None:
+            return {'minid': f"{int((time.time() - self.max_age) * 1000)}-0", 'approximate': True}
+        return {}
 
 class RedisEventStore(EventStore):
+    """
+    Consumer-group reader and writer for one Redis stream.
+
+    Acks are batched: they are flushed once ack_batch_size are waiting or the
+    oldest has waited ack_interval seconds (the default batch of 1 acks each
+    message as soon as its handler finishes). With publish_results, whatever
+    a handler returns (an event or a list of events) is published and the
+    input acked in one MULTI transaction, so a crash can't leave the output
+    published but the input unacked.
+
+    The consumer name defaults to "<service>-<hostname>-<pid>-<random>",
+    unique to this store, since a consumer starts by re-processing its own
+    pending messages and two stores sharing a name would run each other's.
+    Pass a stable consumer_name to have a restarted worker resume its own
+    pending messages instead. With claim_min_idle set, every claim_interval
+    seconds the store also keeps its in-flight messages from looking idle
+    and claims messages that another consumer left pending for longer than
+    claim_min_idle, so work stranded by a node that went away, or by a
+    restarted worker that came back under a new name, is picked up by a
+    live one. Consumers left with nothing pending and idle for longer than
+    claim_min_idle are then deleted from the group, so the default names
+    of past processes don't accumulate.
+
+    A failing handler doesn't stop the consumer. The message stays pending
+    and is scheduled in a sorted set ("<stream>:<group>:retry", scored by
+    due time) with exponential backoff; any consumer in the group picks it
+    up once due. When its delivery count reaches max_attempts, or it can't
+    be decoded at all, it is moved to the dead-letter stream (by default
+    "<stream>:dead") with the error and acked.
+
+    data and meta are written with codec (JSON by default; see infra.codec)
+    and entries carry a schema version. Reading follows each entry's own
+    codec field, so producers can switch codecs without a coordinated
+    consumer rollout, and every read is decoded as one batch.
+
+    stream_limits maps stream names to StreamLimits: approximate trimming on
+    every write to that stream, and backpressure for writes through
+    write_event and write_events. Published handler results and dead
+    letters are trimmed but never held back.
+
+    Messages wait for a handler slot in per-tenant sub-queues served by
+    deficit round robin (see FairQueue), with tenant_key picking each
+    event's tenant (all events share one tenant, i.e. plain FIFO, without
+    it) and tenant_concurrency capping how many slots one tenant holds.
+    prefetch reads that many messages beyond the free slots, so the
+    scheduler can choose among tenants. A stream is still one FIFO, though:
+    with tenant_prefetch set, once a tenant has that many messages waiting
+    here, more of its messages are re-added at the tail of the stream (up
+    to max_deferrals times each) so the consumer can reach other tenants'
+    messages behind a bulk submission. Re-adding gives a message a new ID
+    and reorders it, so it only happens while another tenant has messages
+    queued, running or in the same read.
+    """
     def __init__(
         self,
         redis: Redis,
         event_name: str,
-        service_name: str
+        service_name: str,
+        max_concurrency: int = 1,
+        ack_batch_size: int = 1,
+        ack_interval: float = 1.0,
+        publish_results: bool = False,
+        consumer_name: Optional[str] = None,
+        claim_min_idle: Optional[float] = None,
+        claim_interval: float = 30.0,
+        max_attempts: int = 5,
+        retry_base_delay: float = 5.0,
+        retry_max_delay: float = 60.0,
+        codec: Optional[Codec] = None,
+        stream_limits: Optional[Dict[str, StreamLimits]] = None,
+        backlog_check_interval: float = 1.0,
+        dead_letter_stream: Optional[str] = None,
+        tenant_key: Optional[Callable[[Event], Optional[Hashable]]] = None,
+        tenant_concurrency: Optional[int] = None,
+        quantum: int = 1,
+        prefetch: int = 0,
+        tenant_prefetch: Optional[int] = None,
+        max_deferrals: int = 1
     ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if ack_batch_size < 1:
+            raise ValueError("ack_batch_size must be at least 1")
+        if claim_min_idle is not None and claim_interval >= claim_min_idle:
+            raise ValueError("claim_interval must be shorter than claim_min_idle")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if claim_min_idle is not None and retry_max_delay >= claim_min_idle:
+            # Otherwise a message waiting for its retry looks stalled and is claimed early
+            raise ValueError("retry_max_delay must be shorter than claim_min_idle")
+        if tenant_concurrency is not None and tenant_concurrency < 1:
+            raise ValueError("tenant_concurrency must be at least 1")
+        if prefetch < 0:
+            raise ValueError("prefetch can't be negative")
+        if tenant_prefetch is not None and tenant_prefetch < 1:
+            raise ValueError("tenant_prefetch must be at least 1")
         self.redis = redis
         self.stream_name = event_name
         self.service_name = service_name
-        self.consumer_name = f"{service_name}-{id(self)}"
+        self.consumer_name = consumer_name or (
+            f"{service_name}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.max_concurrency = max_concurrency
+        self.ack_batch_size = ack_batch_size
+        self.ack_interval = ack_interval
+        self.publish_results = publish_results
+        self.claim_min_idle = claim_min_idle
+        self.claim_interval = claim_interval
+        self._claim_cursor = '0-0'
+        # Consumers this store has exported a pending gauge for
+        self._gauged_consumers: Set[str] = set()
+        self._next_claim = 0.0
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_key = f"{event_name}:{service_name}:retry"
+        self.dead_letter_stream = dead_letter_stream or f"{event_name}:dead"
+        self.codec = codec or get_codec('json')
+        self.stream_limits = stream_limits or {}
+        self.backlog_check_interval = backlog_check_interval
+        # stream -> (checked at, backlog)
+        self._backlogs: Dict[str, Tuple[float, int]] = {}
+        self.tenant_key = tenant_key
+        self.tenant_concurrency = tenant_concurrency
+        self.quantum = quantum
+        self.prefetch = prefetch
+        self.tenant_prefetch = tenant_prefetch
+        self.max_deferrals = max_deferrals
+        # message ID -> times deferred, for entries read back after a deferral
+        self._deferrals: Dict[str, int] = {}
+        self._in_flight_ids: Set[str] = set()
+        self._backlog_cursor: Optional[str] = None
+        self._pending_acks: List[str] = []
+        self._acks_due: Optional[float] = None
         self._running = False
         
     async def ensure_consumer_group(self) -> None:
@@ -29,72 +319,559 @@ class RedisEventStore(EventStore):
             if 'BUSYGROUP' not in str(e):
                 raise
 
-    async def write_event(self, event: Event) -> str:
-        event_data = {
-            'name': event.name,
-            'meta': json.dumps(event.meta),
-            'data': json.dumps(event.data)
+    def _xadd_args(self, stream: str) -> Dict[str, Any]:
+        limits = self.stream_limits.get(stream)
+        return limits.xadd_args() if limits else {}
+
+    async def backlog(self, stream: str) -> int:
+        """
+        Messages the slowest consumer group of a stream has yet to finish:
+        entries not delivered to it yet plus its pending entries
+        """
+        try:
+            groups = await self.redis.xinfo_groups(stream)
+        except ResponseError:
+            # No such stream yet
+            return 0
+        backlog = 0
+        for group in groups:
+            lag = group.get('lag')
+            if lag is None:
+                # Redis can't tell after entries were deleted; assume the worst
+                lag = await self.redis.xlen(stream)
+            backlog = max(backlog, lag + group['pending'])
+        STREAM_BACKLOG.labels(stream).set(backlog)
+        return backlog
+
+    async def _cached_backlog(self, stream: str, refresh: bool = False) -> int:
+        now = asyncio.get_running_loop().time()
+        checked = self._backlogs.get(stream)
+        if refresh or checked is None or now - checked[0] >= self.backlog_check_interval:
+            checked = (now, await self.backlog(stream))
+            self._backlogs[stream] = checked
+        return checked[1]
+
+    async def _admit(self, stream: str) -> bool:
+        """Apply the stream's backpressure; False means shed the write"""
+        limits = self.stream_limits.get(stream)
+        if limits is None or limits.max_backlog is None:
+            return True
+
+        backlog = await self._cached_backlog(stream)
+        if backlog < limits.max_backlog:
+            return True
+
+        if limits.overload == 'shed':
+            BACKPRESSURE_EVENTS.labels(stream, 'shed').inc()
+            logger.warning(f"Shedding write to {stream}, backlog {backlog}")
+            return False
+        if limits.overload == 'delay':
+            BACKPRESSURE_EVENTS.labels(stream, 'delayed').inc()
+            deadline = asyncio.get_running_loop().time() + limits.overload_timeout
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(self.backlog_check_interval)
+                backlog = await self._cached_backlog(stream, refresh=True)
+                if backlog < limits.max_backlog:
+                    return True
+        BACKPRESSURE_EVENTS.labels(stream, 'rejected').inc()
+        raise BackpressureError(stream, backlog)
+
+    async def write_event(self, event: Event) -> Optional[str]:
+        """Publish an event; None if backpressure shed it"""
+        if not await self._admit(event.name):
+            return None
+        message_id = await self.redis.xadd(
+            event.name,
+            encode_event(event, self.codec),
+            **self._xadd_args(event.name)
+        )
+        return message_id.decode()
+
+    async def write_events(self, events: List[Event]) -> List[str]:
+        """
+        Publish several events in one pipelined round-trip. Backpressure is
+        checked once per stream for the whole batch; shed streams are skipped,
+        so fewer IDs than events can come back.
+        """
+        admitted = {name: await self._admit(name) for name in {event.name for event in events}}
+        events = [event for event in events if admitted[event.name]]
+        if not events:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(event.name, encode_event(event, self.codec), **self._xadd_args(event.name))
+            message_ids = await pipe.execute()
+        return [message_id.decode() for message_id in message_ids]
+
+    def _take_pending_acks(self) -> List[str]:
+        ids, self._pending_acks = self._pending_acks, []
+        self._acks_due = None
+        return ids
+
+    async def _flush_acks(self) -> None:
+        """Ack every message whose handler has finished"""
+        ids = self._take_pending_acks()
+        if not ids:
+            return
+        try:
+            await self.redis.xack(self.stream_name, self.service_name, *ids)
+        except BaseException:
+            # Keep them for the next flush
+            self._pending_acks[:0] = ids
+            self._acks_due = asyncio.get_running_loop().time()
+            raise
+
+    def _acks_ready(self) -> bool:
+        return bool(self._pending_acks) and (
+            len(self._pending_acks) >= self.ack_batch_size
+            or asyncio.get_running_loop().time() >= self._acks_due
+        )
+
+    async def _publish_and_ack(self, event: Event, results: List[Any]) -> None:
+        """Publish handler results and ack the input, plus any waiting acks, atomically"""
+        ids = [event.id, *self._take_pending_acks()]
+        try:
+            with track_stage('event_publish'):
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    for result in results:
+                        pipe.xadd(result.name, encode_event(result, self.codec), **self._xadd_args(result.name))
+                    pipe.xack(self.stream_name, self.service_name, *ids)
+                    await pipe.execute()
+        except BaseException:
+            self._pending_acks.extend(ids[1:])
+            if self._pending_acks:
+                self._acks_due = asyncio.get_running_loop().time()
+            raise
+
+    async def _read_entries(
+        self,
+        count: int,
+        start: str = '>',
+        block: int = 5000
+    ) -> List[Entry]:
+        """
+        Read up to count new raw entries for this consumer, or with start set
+        to a message ID, this consumer's own pending entries after it
+        """
+        messages = await self.redis.xreadgroup(
+            groupname=self.service_name,
+            consumername=self.consumer_name,
+            streams={self.stream_name: start},
+            count=count,
+            block=block if start == '>' else None
+        )
+        return [entry for _, message_list in messages or [] for entry in message_list]
+
+    async def _decode_entries(self, entries: List[Entry]) -> List[Event]:
+        """Decode raw entries, dead-lettering any that can't be decoded"""
+        events, failures = decode_messages(entries, self.codec)
+        for message_id, data in entries:
+            if b'deferrals' in data:
+                self._deferrals[message_id.decode()] = int(data[b'deferrals'])
+        # Pending entries whose message was trimmed or deleted come back empty
+        deleted = [message_id.decode() for message_id, data in entries if not data]
+        if deleted:
+            await self.redis.xack(self.stream_name, self.service_name, *deleted)
+            logger.warning(f"Acked {len(deleted)} pending messages that no longer exist in {self.stream_name}")
+        for (message_id, data), error in failures:
+            await self._dead_letter(message_id.decode(), data, error, attempts=1)
+        return events
+
+    async def _read_events(self, count: int, start: str = '>', block: int = 5000) -> List[Event]:
+        return await self._decode_entries(await self._read_entries(count, start, block))
+
+    async def _claim_events(self, count: int) -> List[Event]:
+        """Claim up to count messages other consumers left idle too long"""
+        response = await self.redis.xautoclaim(
+            self.stream_name,
+            self.service_name,
+            self.consumer_name,
+            min_idle_time=int(self.claim_min_idle * 1000),
+            start_id=self._claim_cursor,
+            count=count
+        )
+        cursor, messages = response[0], response[1]
+        self._claim_cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+        events = await self._decode_entries(messages)
+        if events:
+            CLAIMED_MESSAGES.labels(self.stream_name).inc(len(events))
+            logger.info(f"Claimed {len(events)} stalled messages from {self.stream_name}")
+        try:
+            await self._remove_idle_consumers()
+        except Exception as e:
+            logger.warning(f"Removing idle consumers failed: {e}")
+        return events
+
+    async def _remove_idle_consumers(self) -> None:
+        """
+        Delete other consumers that have nothing pending and haven't read
+        for claim_min_idle, such as workers that went away and whose
+        messages were claimed, so they don't pile up in the group
+        """
+        min_idle = int(self.claim_min_idle * 1000)
+        for consumer in await self.redis.xinfo_consumers(self.stream_name, self.service_name):
+            name = consumer['name'].decode() if isinstance(consumer['name'], bytes) else consumer['name']
+            if name == self.consumer_name or consumer['pending'] or consumer['idle'] < min_idle:
+                continue
+            await self.redis.xgroup_delconsumer(self.stream_name, self.service_name, name)
+            self._forget_consumer(name)
+            logger.info(f"Removed idle consumer {name} from {self.stream_name}")
+
+    def _forget_consumer(self, consumer: str) -> None:
+        self._gauged_consumers.discard(consumer)
+        try:
+            PENDING_MESSAGES.remove(self.stream_name, consumer)
+        except KeyError:
+            pass
+
+    async def _retry_events(self, count: int) -> List[Event]:
+        """Take up to count messages whose retry is due"""
+        due = await self.redis.zrangebyscore(self.retry_key, '-inf', time.time(), start=0, num=count)
+        message_ids = []
+        for message_id in due:
+            # Only the consumer that removes the entry runs the retry
+            if await self.redis.zrem(self.retry_key, message_id):
+                message_ids.append(message_id)
+        if not message_ids:
+            return []
+
+        # Claiming moves the message to this consumer and counts the delivery
+        messages = await self.redis.xclaim(
+            self.stream_name,
+            self.service_name,
+            self.consumer_name,
+            min_idle_time=0,
+            message_ids=message_ids
+        )
+        return await self._decode_entries(messages)
+
+    async def _fetch_events(self, count: int) -> List[Event]:
+        """
+        Next messages to handle: this consumer's own pending messages first
+        (left over from before a restart), then due retries, then any due
+        claim of stalled messages, then new messages.
+        """
+        if self._backlog_cursor is not None:
+            entries = await self._read_entries(count, self._backlog_cursor)
+            if entries:
+                self._backlog_cursor = entries[-1][0].decode()
+                return await self._decode_entries(entries)
+            self._backlog_cursor = None
+
+        events = await self._retry_events(count)
+        if events:
+            return events
+
+        loop = asyncio.get_running_loop()
+        if self.claim_min_idle is not None and loop.time() >= self._next_claim:
+            self._next_claim = loop.time() + self.claim_interval
+            events = await self._claim_events(count)
+            if events:
+                return events
+
+        # Don't block past the next retry check or claim
+        wait = RETRY_POLL_INTERVAL
+        if self.claim_min_idle is not None:
+            wait = min(wait, self._next_claim - loop.time())
+        return await self._read_events(count, block=int(max(0.001, wait) * 1000))
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt after attempts failed deliveries"""
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+
+    async def _delivery_count(self, message_id: str) -> int:
+        pending = await self.redis.xpending_range(
+            self.stream_name,
+            self.service_name,
+            min=message_id,
+            max=message_id,
+            count=1
+        )
+        return pending[0]['times_delivered'] if pending else 1
+
+    async def _dead_letter(self, message_id: str, data: Dict[Any, Any], error: BaseException, attempts: int) -> None:
+        """Move a message to the dead-letter stream and ack it"""
+        entry = {
+            **data,
+            'original_id': message_id,
+            'error': f"{type(error).__name__}: {error}",
+            'attempts': attempts,
+            'consumer': self.consumer_name
         }
-        # Add timestamp if not provided
-        if hasattr(event, 'timestamp') and event.timestamp:
-            event_data['timestamp'] = event.timestamp
-        else:
-            event_data['timestamp'] = datetime.now(timezone.utc).isoformat()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(self.dead_letter_stream, entry, **self._xadd_args(self.dead_letter_stream))
+            pipe.xack(self.stream_name, self.service_name, message_id)
+            pipe.zrem(self.retry_key, message_id)
+            await pipe.execute()
+        FAILED_MESSAGES.labels(self.stream_name, 'dead_letter').inc()
+        logger.error(f"Dead-lettered {message_id} after {attempts} attempts: {error!r}")
+
+    async def _handle_failure(self, event: Event, error: Exception) -> None:
+        """Schedule a retry for a failed message, or dead-letter it"""
+        attempts = await self._delivery_count(event.id)
+        if attempts >= self.max_attempts:
+            await self._dead_letter(event.id, encode_event(event, self.codec), error, attempts)
+            return
+
+        delay = self.retry_delay(attempts)
+        await self.redis.zadd(self.retry_key, {event.id: time.time() + delay})
+        FAILED_MESSAGES.labels(self.stream_name, 'retry').inc()
+        logger.warning(
+            f"Handler failed for {event.id} (attempt {attempts} of {self.max_attempts}), "
+            f"retrying in {delay:.1f}s: {error!r}"
+        )
+
+    async def _keep_in_flight(self) -> None:
+        """
+        Periodically reset the idle time of messages still being handled so
+        other consumers don't claim them, and refresh the pending gauges
+        """
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            try:
+                if self._in_flight_ids:
+                    await self.redis.xclaim(
+                        self.stream_name,
+                        self.service_name,
+                        self.consumer_name,
+                        min_idle_time=0,
+                        message_ids=list(self._in_flight_ids),
+                        justid=True
+                    )
+                await self.pending_stats()
+            except Exception as e:
+                logger.warning(f"Pending entry maintenance failed: {e}")
+
+    async def pending_stats(self) -> Dict[str, Any]:
+        """
+        Summary of the group's pending entries list: the total, the oldest
+        entry's idle seconds and the count per consumer. Also updates the
+        pending gauges.
+        """
+        summary = await self.redis.xpending(self.stream_name, self.service_name)
+        consumers = {
+            (c['name'].decode() if isinstance(c['name'], bytes) else c['name']): c['pending']
+            for c in summary.get('consumers') or []
+        }
+        oldest_idle = 0.0
+        if summary['pending']:
+            oldest = await self.redis.xpending_range(
+                self.stream_name,
+                self.service_name,
+                min='-',
+                max='+',
+                count=1
+            )
+            if oldest:
+                oldest_idle = oldest[0]['time_since_delivered'] / 1000
 
+        # Consumers with nothing pending are left out of the summary
+        for consumer in self._gauged_consumers - consumers.keys():
+            self._forget_consumer(consumer)
+        for consumer, pending in consumers.items():
+            PENDING_MESSAGES.labels(self.stream_name, consumer).set(pending)
+        self._gauged_consumers = set(consumers)
+        PENDING_OLDEST_IDLE.labels(self.stream_name).set(oldest_idle)
+        return {
+            'pending': summary['pending'],
+            'oldest_idle': oldest_idle,
+            'consumers': consumers
+        }
+
+    async def _handle_message(self, handler: Any, event: Event) -> None:
+        """Run the handler for a single message and ack it once it succeeds; failures are retried"""
+        self._in_flight_ids.add(event.id)
         try:
-            message_id = await self.redis.xadd(event.name, event_data)
-            return message_id.decode()
+            result = await handler(event)
         except Exception as e:
-            raise
+            await self._handle_failure(event, e)
+            return
+        finally:
+            self._in_flight_ids.discard(event.id)
+        if self.publish_results and result is not None:
+            results = result if isinstance(result, list) else [result]
+            await self._publish_and_ack(event, results)
+            return
+
+        self._pending_acks.append(event.id)
+        if self._acks_due is None:
+            self._acks_due = asyncio.get_running_loop().time() + self.ack_interval
+        if len(self._pending_acks) >= self.ack_batch_size:
+            await self._flush_acks()
+
+    def _tenant_of(self, event: Event) -> Hashable:
+        if self.tenant_key is None:
+            return DEFAULT_TENANT
+        tenant = self.tenant_key(event)
+        return DEFAULT_TENANT if tenant is None else tenant
+
+    def _observe_tenant(self, queue: FairQueue, tenant: Hashable) -> None:
+        if self.tenant_key is None:
+            return
+        depth, in_flight = queue.depth(tenant), queue.in_flight(tenant)
+        labels = (self.stream_name, str(tenant))
+        if depth or in_flight:
+            TENANT_QUEUE_DEPTH.labels(*labels).set(depth)
+            TENANT_IN_FLIGHT.labels(*labels).set(in_flight)
+        else:
+            # Drop idle tenants so label sets don't pile up
+            for gauge in (TENANT_QUEUE_DEPTH, TENANT_IN_FLIGHT):
+                try:
+                    gauge.remove(*labels)
+                except KeyError:
+                    pass
+
+    async def _defer(self, deferred: List[Tuple[Event, int]]) -> None:
+        """Re-add messages at the tail of the stream and ack the originals"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for event, deferrals in deferred:
+                fields = encode_event(event, self.codec)
+                fields['deferrals'] = deferrals
+                pipe.xadd(self.stream_name, fields, **self._xadd_args(self.stream_name))
+            pipe.xack(self.stream_name, self.service_name, *[event.id for event, _ in deferred])
+            await pipe.execute()
+        DEFERRED_MESSAGES.labels(self.stream_name).inc(len(deferred))
+
+    def _should_scan(self, queue: FairQueue) -> bool:
+        """
+        Whether to read past a full queue: only when every tenant in it has
+        its full share waiting, so anything read is either deferred or
+        another tenant's work
+        """
+        if self.tenant_prefetch is None or self.tenant_key is None or not queue:
+            return False
+        return all(depth >= self.tenant_prefetch for depth in queue.depths().values())
+
+    async def _enqueue(self, queue: FairQueue, events: List[Event]) -> int:
+        """Queue fetched messages by tenant, deferring a tenant's excess; returns how many were queued"""
+        deferred = []
+        queued = 0
+        tenants = [self._tenant_of(event) for event in events]
+        # Deferring only helps reach another tenant's messages
+        known = set(queue.keys()) | set(tenants)
+        for event, tenant in zip(events, tenants):
+            deferrals = self._deferrals.pop(event.id, 0)
+            if (
+                self.tenant_prefetch is not None
+                and queue.depth(tenant) >= self.tenant_prefetch
+                and deferrals < self.max_deferrals
+                and len(known) > 1
+            ):
+                deferred.append((event, deferrals + 1))
+                continue
+            # Queued messages are kept from looking idle like running ones
+            self._in_flight_ids.add(event.id)
+            queue.push(tenant, event)
+            queued += 1
+            self._observe_tenant(queue, tenant)
+        if deferred:
+            await self._defer(deferred)
+        return queued
+
+    async def _handle_queued(self, handler: Any, queue: FairQueue, tenant: Hashable, event: Event) -> None:
+        try:
+            await self._handle_message(handler, event)
+        finally:
+            queue.done(tenant)
+            self._observe_tenant(queue, tenant)
 
     async def process_events(self, handler: Any) -> None:
+        """
+        Consume the stream, running up to max_concurrency handlers at once.
+        Each message is handled in its own task and queued for ack when it
+        completes; failed messages are retried or dead-lettered without
+        stopping the loop. Waiting acks are flushed before this returns.
+        """
         await self.ensure_consumer_group()
         self._running = True
+        queue: FairQueue[Event] = FairQueue(self.quantum, self.tenant_concurrency)
+        in_flight: Set[asyncio.Task] = set()
+        read_task: Optional[asyncio.Task] = None
+        scanning = False
+        # Set when a scan past the full queue found nothing left to defer
+        scan_blocked = False
+        error: Optional[BaseException] = None
+        # Start from the beginning of this consumer's own pending entries
+        self._backlog_cursor = '0'
+        maintenance = None
+        if self.claim_min_idle is not None:
+            maintenance = asyncio.create_task(self._keep_in_flight())
 
-        while self._running:
-            try:
-                messages = await self.redis.xreadgroup(
-                    groupname=self.service_name,
-                    consumername=self.consumer_name,
-                    streams={self.stream_name: '>'},
-                    block=5000
+        try:
+            while self._running:
+                waiting = set(in_flight)
+                if read_task is None:
+                    room = self.max_concurrency + self.prefetch - len(in_flight) - len(queue)
+                    scanning = room <= 0 and not scan_blocked and self._should_scan(queue)
+                    if scanning:
+                        room = self.tenant_prefetch
+                    if room > 0:
+                        read_task = asyncio.create_task(self._fetch_events(room))
+                if read_task is not None:
+                    waiting.add(read_task)
+
+                timeout = None
+                if self._pending_acks:
+                    timeout = max(0, self._acks_due - asyncio.get_running_loop().time())
+
+                done, _ = await asyncio.wait(
+                    waiting,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
                 )
-                
-                if not messages:
-                    continue
-
-                for _, message_list in messages:
-                    for message_id, data in message_list:
-                        message_id = message_id.decode()
-                        
-                        # Decode message data
-                        decoded_data = {}
-                        for k, v in data.items():
-                            key = k.decode()
-                            value = v.decode()
-                            if key == 'data' or key == 'meta':
-                                decoded_data[key] = json.loads(value)
-                            else:
-                                decoded_data[key] = value
-
-                        event = Event(
-                            id=message_id,
-                            name=decoded_data['name'],
-                            meta=decoded_data['meta'],
-                            data=decoded_data['data']
-                            # timestamp is optional
-                        )
-
-                        try:
-                            await handler(event)
-                            await self.redis.xack(
-                                self.stream_name, 
-                                self.service_name, 
-                                message_id
-                            )
-                        except Exception as e:
-                            raise
 
-            except Exception as e:
-                self._running = False
-                raise
+                for task in done:
+                    if task is read_task:
+                        continue
+                    in_flight.discard(task)
+                    if task.exception() is not None:
+                        raise task.exception()
+
+                if read_task in done:
+                    events = read_task.result()
+                    read_task = None
+                    queued = await self._enqueue(queue, events)
+                    scan_blocked = scanning and queued > 0
+
+                # Start queued messages in fair order while slots are free
+                while len(in_flight) < self.max_concurrency:
+                    next_event = queue.pop()
+                    if next_event is None:
+                        break
+                    tenant, event = next_event
+                    self._observe_tenant(queue, tenant)
+                    in_flight.add(asyncio.create_task(
+                        self._handle_queued(handler, queue, tenant, event)
+                    ))
+
+                if self._acks_ready():
+                    await self._flush_acks()
+
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._running = False
+            for task in (read_task, maintenance):
+                if task is not None:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+            # Messages still queued stay pending for this consumer's next start
+            for tenant, event in queue.drain():
+                self._in_flight_ids.discard(event.id)
+                self._observe_tenant(queue, tenant)
+            # Let in-flight handlers finish; anything unacked stays pending
+            if in_flight:
+                if isinstance(error, asyncio.CancelledError):
+                    for task in in_flight:
+                        task.cancel()
+                results = await asyncio.gather(*in_flight, return_exceptions=True)
+            try:
+                await self._flush_acks()
+            except Exception:
+                if error is None:
+                    raise
+            if in_flight and error is None:
+                for result in results:
+                    if isinstance(result, Exception):
+                        raise result
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key so only one runs and every
+    caller gets its result.
+
+    In process, callers await the leader's future. With a Redis client, a
+    lock on the key extends this across workers: the worker holding the lock
+    runs the call and, if an encoder is given, publishes the result for
+    result_ttl seconds so waiting workers decode it instead of repeating the
+    work. If the leader fails or dies, a waiting worker takes over the lock.
+    """
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        namespace: str = 'singleflight',
+        lock_timeout: float = 30,
+        result_ttl: float = 60,
+        poll_interval: float = 0.5
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        encode: Optional[Callable[[T], str]] = None,
+        decode: Optional[Callable[[str], T]] = None
+    ) -> T:
+        """Run fn once for all concurrent callers with the same key"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even if nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            if self.redis is None:
+                self.leaders += 1
+                result = await fn()
+            else:
+                result = await self._run_shared(key, fn, encode, decode)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _run_shared(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        encode: Optional[Callable[[T], str]],
+        decode: Optional[Callable[[str], T]]
+    ) -> T:
+        result_key = f"{self.namespace}:{key}:result"
+        lock = self.redis.lock(
+            f"{self.namespace}:{key}:lock",
+            timeout=self.lock_timeout
+        )
+
+        while True:
+            if decode is not None:
+                published = await self.redis.get(result_key)
+                if published is not None:
+                    self.coalesced += 1
+                    if isinstance(published, bytes):
+                        published = published.decode()
+                    return decode(published)
+
+            if await lock.acquire(blocking=False):
+                break
+            # Another worker is running this call
+            await asyncio.sleep(self.poll_interval)
+
+        self.leaders += 1
+        heartbeat = asyncio.create_task(self._keep_lock(lock))
+        try:
+            result = await fn()
+            if encode is not None:
+                await self.redis.set(result_key, encode(result), px=int(self.result_ttl * 1000))
+            return result
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            try:
+                await lock.release()
+            except LockError:
+                # Lock expired or was taken over; nothing left to release
+                pass
+
+    async def _keep_lock(self, lock: Any) -> None:
+        """Keep the lock alive while a long call runs"""
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            await lock.reacquire()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._inflight),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced
+        }
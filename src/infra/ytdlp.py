@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import yt_dlp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from yt_dlp.extractor import gen_extractor_classes
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+def get_video_key(url: str) -> Optional[str]:
+    """
+    Canonical "<extractor>:<video id>" key for a URL, resolved from the URL
+    alone so it can be checked before anything is downloaded.
+    """
+    for ie in gen_extractor_classes():
+        if ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            return f"{ie.ie_key()}:{video_id}" if video_id else None
+    return None
+
+class YoutubeDLPool:
+    """
+    Runs yt-dlp on a dedicated thread pool so extraction and downloads never
+    block the event loop. Each worker thread keeps a warm YoutubeDL instance
+    per option set and reuses it across jobs; a thread only runs one job at a
+    time, so per-job settings (output template, progress callback) can be
+    swapped in safely before each call.
+    """
+    def __init__(self, workers: int = 2):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='yt-dlp'
+        )
+        self._local = threading.local()
+        self._instances: List[yt_dlp.YoutubeDL] = []
+        # Instances running a job; close() leaves these to their thread
+        self._busy: Set[int] = set()
+        self._closed = False
+        self._instances_lock = threading.Lock()
+
+    def _dispatch_progress(self, status: Dict[str, Any]) -> None:
+        callback = getattr(self._local, 'progress', None)
+        if callback is not None:
+            callback(status)
+
+    def _get_ydl(self, opts: Dict[str, Any]) -> yt_dlp.YoutubeDL:
+        if not hasattr(self._local, 'instances'):
+            self._local.instances = {}
+
+        key: Tuple = tuple(sorted((k, repr(v)) for k, v in opts.items()))
+        ydl = self._local.instances.get(key)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL({
+                **opts,
+                'progress_hooks': [self._dispatch_progress]
+            })
+            self._local.instances[key] = ydl
+            with self._instances_lock:
+                self._instances.append(ydl)
+        return ydl
+
+    def _extract(
+        self,
+        url: str,
+        opts: Dict[str, Any],
+        download: bool,
+        outtmpl: Optional[str],
+        progress: Optional[ProgressCallback]
+    ) -> Dict[str, Any]:
+        ydl = self._get_ydl(opts)
+        with self._instances_lock:
+            self._busy.add(id(ydl))
+        if outtmpl is not None:
+            ydl.params['outtmpl'] = {**ydl.params['outtmpl'], 'default': outtmpl}
+        self._local.progress = progress
+        try:
+            return ydl.extract_info(url, download=download)
+        finally:
+            self._local.progress = None
+            with self._instances_lock:
+                self._busy.discard(id(ydl))
+                if self._closed:
+                    ydl.close()
+
+    async def extract_info(
+        self,
+        url: str,
+        opts: Dict[str, Any],
+        download: bool = True,
+        outtmpl: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Run YoutubeDL.extract_info on the pool. outtmpl overrides the output
+        template for this call only; on_progress receives yt-dlp progress
+        dicts on the event loop thread.
+        """
+        loop = asyncio.get_running_loop()
+        progress = None
+        if on_progress is not None:
+            progress = lambda status: loop.call_soon_threadsafe(on_progress, status)
+
+        return await loop.run_in_executor(
+            self._executor,
+            self._extract,
+            url,
+            opts,
+            download,
+            outtmpl,
+            progress
+        )
+
+    def close(self) -> None:
+        """
+        Stop the worker threads and close the warm YoutubeDL instances
+        without waiting: queued jobs are cancelled, and a job already running
+        closes its instance when it finishes instead of blocking the caller.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._instances_lock:
+            self._closed = True
+            for ydl in self._instances:
+                if id(ydl) not in self._busy:
+                    ydl.close()
+            self._instances.clear()
@@ -1,5 +1,7 @@
 import pytest
+import asyncio
 from pathlib import Path
+from infra.core_types import Event
 from infra.minio import MinioFileStorage
 from domain.dependencies import Dependencies
 from domain.handler.donwload_audio import download_youtube_audio
@@ -62,3 +64,126 @@ async def test_large_file_download(minio_storage):
         output_path = Path("test_downloads") / file_info["path"]
         output_path.parent.mkdir(parents=True, exist_ok=True)
         output_path.write_bytes(data)
+
+@pytest.mark.asyncio
+async def test_repeat_download_hits_cache(minio_storage):
+    deps = Dependencies(
+        file_storage=minio_storage,
+        event_store=Mock()
+    )
+
+    first = await download_youtube_audio(deps, Event(
+        id="cache1",
+        name="youtube_audio_requested",
+        data={"url": "https://www.youtube.com/watch?v=jNQXAC9IVRw"},
+        meta={}
+    ))
+    # Same video behind a different URL form resolves to the same key
+    second = await download_youtube_audio(deps, Event(
+        id="cache2",
+        name="youtube_audio_requested",
+        data={"url": "https://youtu.be/jNQXAC9IVRw?t=1"},
+        meta={}
+    ))
+
+    assert second.data == first.data
+    assert deps.download_cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_downloads_share_one_download(minio_storage):
+    deps = Dependencies(
+        file_storage=minio_storage,
+        event_store=Mock()
+    )
+
+    results = await asyncio.gather(*(
+        download_youtube_audio(deps, Event(
+            id=f"flight{i}",
+            name="youtube_audio_requested",
+            data={"url": url},
+            meta={"request": i}
+        ))
+        for i, url in enumerate([
+            "https://www.youtube.com/watch?v=jNQXAC9IVRw",
+            "https://youtu.be/jNQXAC9IVRw"
+        ])
+    ))
+
+    assert results[0].data == results[1].data
+    assert [result.meta for result in results] == [{"request": 0}, {"request": 1}]
+    assert deps.single_flight.leaders == 1
+    assert deps.single_flight.coalesced == 1
+
+class FakeYoutubeDLPool:
+    """Writes fixed bytes instead of downloading"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.downloads = 0
+
+    async def extract_info(self, url, opts, download=True, outtmpl=None, on_progress=None):
+        video_id = url.rsplit('=', 1)[-1].rsplit('/', 1)[-1]
+        if download and outtmpl:
+            self.downloads += 1
+            await asyncio.sleep(self.delay)
+            Path(outtmpl).write_bytes(f"audio {video_id}".encode())
+        return {'id': video_id, 'title': 'Same title', 'extractor_key': 'Youtube'}
+
+class MemoryStorage:
+    def __init__(self):
+        self.files = {}
+
+    async def write_file(self, path, local_path):
+        self.files[path] = Path(local_path).read_bytes()
+
+    async def write(self, path, data):
+        self.files[path] = data
+
+    async def read_to_file(self, path, local_path):
+        Path(local_path).write_bytes(self.files[path])
+
+def request(event_id, video_id="jNQXAC9IVRw"):
+    return Event(
+        id=event_id,
+        name="youtube_audio_requested",
+        data={"url": f"https://www.youtube.com/watch?v={video_id}"},
+        meta={}
+    )
+
+@pytest.mark.asyncio
+async def test_followers_do_not_wait_for_leader_on_part():
+    deps = Dependencies(
+        file_storage=MemoryStorage(),
+        event_store=Mock(),
+        ytdl_pool=FakeYoutubeDLPool(delay=0.05)
+    )
+    release = asyncio.Event()
+    seen = []
+
+    async def on_part(file_info, local_path):
+        seen.append(Path(local_path).read_bytes())
+        await release.wait()
+        raise RuntimeError("transcription failed")
+
+    leader = asyncio.create_task(download_youtube_audio(deps, request("1"), on_part=on_part))
+    await asyncio.sleep(0.01)
+    follower = await asyncio.wait_for(download_youtube_audio(deps, request("2")), 1)
+
+    assert not leader.done()
+    assert deps.single_flight.stats()['in_flight'] == 0
+    release.set()
+    with pytest.raises(ValueError, match="transcription failed"):
+        await leader
+    assert seen == [b"audio jNQXAC9IVRw"]
+    assert follower.data == [{'path': 'Youtube:jNQXAC9IVRw', 'title': 'Same title.mp4'}]
+
+@pytest.mark.asyncio
+async def test_same_title_videos_are_stored_apart():
+    storage = MemoryStorage()
+    deps = Dependencies(file_storage=storage, event_store=Mock(), ytdl_pool=FakeYoutubeDLPool())
+
+    first = await download_youtube_audio(deps, request("1", "aaaaaaaaaaa"))
+    second = await download_youtube_audio(deps, request("2", "bbbbbbbbbbb"))
+
+    assert first.data[0]['path'] != second.data[0]['path']
+    assert storage.files[first.data[0]['path']] == b"audio aaaaaaaaaaa"
+    assert storage.files[second.data[0]['path']] == b"audio bbbbbbbbbbb"
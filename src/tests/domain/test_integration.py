@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 import pytest
 from unittest.mock import patch
 from redis.asyncio import Redis
+from infra.core_types import Event
 from infra.minio import MinioFileStorage
 from infra.redis import RedisEventStore
 from domain.dependencies import Dependencies
@@ -150,3 +151,19 @@ async def test_download_and_transcribe_video(deps):
 
         assert len(stored_file) > 0
         assert isinstance(stored_file.decode(), str)
+
+@pytest.mark.asyncio
+async def test_repeat_transcription_hits_cache(deps):
+    test_event = Event(
+        id="test-cache",
+        name="youtube_audio_requested",
+        data={"url": TEST_VIDEO_URL},
+        meta={"request_id": "test-cache", "url": TEST_VIDEO_URL}
+    )
+
+    download_event = await download_youtube_audio(deps, test_event)
+    first = await transcribe_audio(deps, download_event)
+    second = await transcribe_audio(deps, download_event)
+
+    assert second.data == first.data
+    assert deps.transcription_cache.hits == len(download_event.data)
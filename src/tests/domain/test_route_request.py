@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import Mock
+from infra.core_types import Event
+from domain.dependencies import Dependencies
+from domain.handler.route_request import route_youtube_audio
+from domain.lanes import Lane, allocate_concurrency, build_lanes, lane_for, parse_weights
+from domain.types import CachedDownload
+
+class ProbePool:
+    def __init__(self, info):
+        self.info = info
+        self.calls = []
+
+    async def extract_info(self, url, opts, download=True, outtmpl=None, on_progress=None):
+        self.calls.append((url, download))
+        return self.info
+
+def request(url="https://www.youtube.com/watch?v=jNQXAC9IVRw"):
+    return Event(
+        id="1-0",
+        name="youtube_audio_requested",
+        data={"url": url},
+        meta={"request_id": "req", "url": url},
+        timestamp="2024-01-01T00:00:00+00:00"
+    )
+
+def test_parse_weights():
+    assert parse_weights("short=5, medium=3,long=2") == {"short": 5, "medium": 3, "long": 2}
+    with pytest.raises(ValueError):
+        parse_weights("short")
+
+def test_build_lanes_validates():
+    with pytest.raises(ValueError):
+        build_lanes(short_max=600, medium_max=300)
+    with pytest.raises(ValueError):
+        build_lanes(weights="short=1,long=1")
+
+def test_lane_for():
+    lanes = build_lanes(short_max=600, medium_max=3600)
+    assert lane_for(30, lanes).name == "short"
+    assert lane_for(600, lanes).name == "short"
+    assert lane_for(601, lanes).name == "medium"
+    assert lane_for(5 * 3600, lanes).name == "long"
+    assert lane_for(None, lanes).name == "long"
+
+@pytest.mark.parametrize("total, expected", [
+    (10, {"short": 5, "medium": 3, "long": 2}),
+    (4, {"short": 2, "medium": 1, "long": 1}),
+    (1, {"short": 1, "medium": 1, "long": 1}),
+])
+def test_allocate_concurrency(total, expected):
+    lanes = build_lanes(weights="short=5,medium=3,long=2")
+    assert allocate_concurrency(total, lanes) == expected
+
+def test_allocate_concurrency_uses_whole_budget():
+    lanes = [Lane("a", 60, 1), Lane("b", None, 1)]
+    assert sum(allocate_concurrency(7, lanes).values()) == 7
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("info, lane", [
+    ({"duration": 120}, "short"),
+    ({"duration": 1800}, "medium"),
+    ({"duration": 5 * 3600}, "long"),
+    ({"is_live": True, "duration": 60}, "long"),
+])
+async def test_route_by_duration(info, lane):
+    deps = Dependencies(file_storage=Mock(), event_store=Mock())
+    pool = ProbePool(info)
+
+    routed = await route_youtube_audio(deps, request(), build_lanes(), probe_pool=pool)
+
+    assert routed.name == f"youtube_audio_requested:{lane}"
+    assert pool.calls == [("https://www.youtube.com/watch?v=jNQXAC9IVRw", False)]
+    assert routed.data["url"] == "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+    assert routed.meta == {"request_id": "req", "url": "https://www.youtube.com/watch?v=jNQXAC9IVRw"}
+    assert routed.timestamp == "2024-01-01T00:00:00+00:00"
+
+@pytest.mark.asyncio
+async def test_cached_download_skips_probe():
+    deps = Dependencies(file_storage=Mock(), event_store=Mock())
+    deps.download_cache.set("Youtube:jNQXAC9IVRw", CachedDownload(parts=[], size=1))
+    pool = ProbePool({"duration": 5 * 3600})
+
+    routed = await route_youtube_audio(deps, request(), build_lanes(), probe_pool=pool)
+
+    assert routed.name == "youtube_audio_requested:short"
+    assert pool.calls == []
+    assert deps.download_cache.hits == 0
@@ -0,0 +1,107 @@
+import pytest
+import asyncio
+from pathlib import Path
+from unittest.mock import Mock
+from infra.core_types import Event
+from domain.dependencies import Dependencies
+from domain.handler import transcribe_audio
+from domain.handler.transcribe_audio import process_youtube_audio
+
+class FakeYoutubeDLPool:
+    """Writes fixed bytes instead of downloading"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def extract_info(self, url, opts, download=True, outtmpl=None, on_progress=None):
+        video_id = url.rsplit('=', 1)[-1]
+        if download and outtmpl:
+            await asyncio.sleep(self.delay)
+            Path(outtmpl).write_bytes(f"audio {video_id}".encode())
+        return {'id': video_id, 'title': 'Title', 'extractor_key': 'Youtube'}
+
+class UploadStorage:
+    """Holds each upload until a transcription has started"""
+    def __init__(self, transcribing: asyncio.Event):
+        self.transcribing = transcribing
+        self.files = {}
+        self.reads = []
+
+    async def write_file(self, path, local_path):
+        await asyncio.wait_for(self.transcribing.wait(), 1)
+        self.files[path] = Path(local_path).read_bytes()
+
+    async def write(self, path, data):
+        self.files[path] = data
+
+    async def read_to_file(self, path, local_path):
+        self.reads.append(path)
+        Path(local_path).write_bytes(self.files[path])
+
+def request(event_id):
+    return Event(
+        id=event_id,
+        name="youtube_audio_requested",
+        data={"url": "https://www.youtube.com/watch?v=jNQXAC9IVRw"},
+        meta={"request": event_id}
+    )
+
+@pytest.fixture
+def transcribed(monkeypatch):
+    """Stub transcription that records the local file it was given"""
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    transcribing = asyncio.Event()
+    sources = []
+
+    async def transcribe_part(deps, client, mp4_path, work_dir):
+        transcribing.set()
+        # Still on disk: the part's temp dir is removed only afterwards
+        data = Path(mp4_path).read_bytes()
+        sources.append(mp4_path)
+        return [(None, data.decode())]
+
+    monkeypatch.setattr(transcribe_audio, 'transcribe_part', transcribe_part)
+    return transcribing, sources
+
+@pytest.mark.asyncio
+async def test_parts_are_transcribed_locally_while_uploading(transcribed):
+    transcribing, sources = transcribed
+    storage = UploadStorage(transcribing)
+    deps = Dependencies(file_storage=storage, event_store=Mock(), ytdl_pool=FakeYoutubeDLPool())
+
+    result = await process_youtube_audio(deps, request("1"), publish=False)
+
+    assert storage.reads == []
+    assert [Path(source).name for source in sources] == ['audio.mp4']
+    assert not Path(sources[0]).exists()
+    assert result.data == [{'title': 'Title.mp4', 'path': 'transcription:Youtube:jNQXAC9IVRw'}]
+    assert storage.files['transcription:Youtube:jNQXAC9IVRw'] == b"audio jNQXAC9IVRw"
+
+@pytest.mark.asyncio
+async def test_cached_parts_are_transcribed_from_storage(transcribed):
+    transcribing, _ = transcribed
+    storage = UploadStorage(transcribing)
+    deps = Dependencies(file_storage=storage, event_store=Mock(), ytdl_pool=FakeYoutubeDLPool())
+
+    await process_youtube_audio(deps, request("1"), publish=False)
+    result = await process_youtube_audio(deps, request("2"), publish=False)
+
+    assert deps.download_cache.hits == 1
+    assert storage.reads == ['Youtube:jNQXAC9IVRw']
+    assert result.meta == {"request": "2"}
+    assert result.data == [{'title': 'Title.mp4', 'path': 'transcription:Youtube:jNQXAC9IVRw'}]
+
+@pytest.mark.asyncio
+async def test_coalesced_parts_are_transcribed_from_storage(transcribed):
+    transcribing, _ = transcribed
+    storage = UploadStorage(transcribing)
+    deps = Dependencies(file_storage=storage, event_store=Mock(), ytdl_pool=FakeYoutubeDLPool(delay=0.05))
+
+    results = await asyncio.gather(
+        process_youtube_audio(deps, request("1"), publish=False),
+        process_youtube_audio(deps, request("2"), publish=False)
+    )
+
+    assert deps.single_flight.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 1}
+    # The leader transcribed its local copy, the follower the stored one
+    assert storage.reads == ['Youtube:jNQXAC9IVRw']
+    assert results[0].data == results[1].data
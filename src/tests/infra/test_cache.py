@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+from infra.cache import TTLCache
+
+def test_get_set():
+    cache = TTLCache(max_size=10)
+    assert cache.get("missing") is None
+
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_rate == 0.5
+
+def test_lru_eviction_by_count():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_peek_is_not_counted():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.peek("a") == 1  # "a" stays least recently used
+    assert cache.peek("missing") is None
+    cache.set("c", 3)
+
+    assert cache.peek("a") is None
+    assert cache.hits == cache.misses == 0
+
+def test_size_based_eviction():
+    cache = TTLCache(max_size=100, sizeof=len)
+    cache.set("a", b"x" * 60)
+    cache.set("b", b"x" * 30)
+    cache.set("c", b"x" * 30)
+
+    assert cache.get("a") is None
+    assert cache.size == 60
+
+    # Values larger than the whole budget are not stored
+    cache.set("huge", b"x" * 101)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
+
+def test_ttl_expiry():
+    cache = TTLCache(max_size=10, ttl=60)
+    with patch("infra.cache.time.monotonic", return_value=1000):
+        cache.set("key", "value")
+    with patch("infra.cache.time.monotonic", return_value=1059):
+        assert cache.get("key") == "value"
+    with patch("infra.cache.time.monotonic", return_value=1061):
+        assert cache.get("key") is None
+    assert len(cache) == 0
+
+def test_stats():
+    cache = TTLCache(max_size=10)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.delete("key")
+
+    stats = cache.stats()
+    assert stats["entries"] == 0
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 1.0
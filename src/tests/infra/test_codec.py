@@ -0,0 +1,41 @@
+import pytest
+from infra.codec import JsonCodec, get_codec
+
+def test_json_round_trip():
+    codec = JsonCodec()
+    value = {"title": "тест 🚀", "parts": [1, 2.5, None, True]}
+    assert codec.decode(codec.encode(value)) == value
+
+def test_json_encoding_is_compact():
+    assert JsonCodec().encode({"a": [1, 2]}) == b'{"a":[1,2]}'
+
+def test_decode_many():
+    codec = JsonCodec()
+    values = [{"n": n} for n in range(3)] + [None, "text"]
+    assert codec.decode_many([codec.encode(value) for value in values]) == values
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_decode_many_rejects_joined_values(name):
+    if name != "json":
+        pytest.importorskip(name)
+    codec = get_codec(name)
+    with pytest.raises(ValueError):
+        codec.decode_many([b'{"a":1},{"b":2}', b'{"c":3}'])
+
+@pytest.mark.parametrize("name", ["orjson", "msgpack"])
+def test_optional_codecs(name):
+    pytest.importorskip(name)
+    codec = get_codec(name)
+    values = [{"title": "тест", "n": 1}, [1, 2], None]
+    assert codec.decode_many([codec.encode(value) for value in values]) == values
+
+def test_orjson_reads_json():
+    pytest.importorskip("orjson")
+    assert get_codec("orjson").decode(JsonCodec().encode({"a": 1})) == {"a": 1}
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown codec"):
+        get_codec("xml")
+
+def test_codec_instances_are_shared():
+    assert get_codec("json") is get_codec("json")
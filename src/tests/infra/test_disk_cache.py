@@ -0,0 +1,112 @@
+import os
+import pytest
+from unittest.mock import patch
+from infra.disk_cache import DirectoryInUseError, DiskCache
+
+def make_file(directory, name, size):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return path
+
+@pytest.fixture
+def incoming(tmp_path):
+    path = tmp_path / "incoming"
+    path.mkdir()
+    return path
+
+def test_put_get(tmp_path, incoming):
+    cache = DiskCache(tmp_path / "cache", max_bytes=100)
+    path = cache.put("video:worst", make_file(incoming, "a.m4a", 10), {"title": "A"})
+
+    assert path.suffix == ".m4a"
+    assert path.read_bytes() == b"x" * 10
+    assert cache.get("video:worst") == (path, {"title": "A"})
+    assert cache.get("other") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+def test_lru_eviction(tmp_path, incoming):
+    cache = DiskCache(tmp_path / "cache", max_bytes=100)
+    with patch("infra.disk_cache.time.time", side_effect=range(1000)):
+        first = cache.put("a", make_file(incoming, "a", 40))
+        cache.put("b", make_file(incoming, "b", 40))
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", make_file(incoming, "c", 40))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (first, {})
+    assert cache.size == 80
+    assert cache.evictions == 1
+
+def test_file_larger_than_budget_is_not_cached(tmp_path, incoming):
+    cache = DiskCache(tmp_path / "cache", max_bytes=10)
+    source = make_file(incoming, "big", 11)
+
+    assert cache.put("big", source) is None
+    assert source.exists()
+    assert cache.get("big") is None
+
+def test_index_survives_restart(tmp_path, incoming):
+    directory = tmp_path / "cache"
+    cache = DiskCache(directory, max_bytes=100)
+    path = cache.put("a", make_file(incoming, "a.mp4", 10), {"title": "A"})
+    orphan = make_file(directory, "leftover.mp4", 10)
+
+    reopened = DiskCache(directory, max_bytes=100)
+    assert reopened.get("a") == (path, {"title": "A"})
+    assert not orphan.exists(), "Untracked files should be cleaned up"
+
+def test_restart_with_smaller_budget_evicts(tmp_path, incoming):
+    directory = tmp_path / "cache"
+    cache = DiskCache(directory, max_bytes=100)
+    cache.put("a", make_file(incoming, "a", 40))
+    cache.put("b", make_file(incoming, "b", 40))
+
+    reopened = DiskCache(directory, max_bytes=50)
+    assert len(os.listdir(directory)) == 2  # index + one entry
+    assert reopened.size == 40
+
+def test_pinned_file_outlives_eviction(tmp_path, incoming):
+    cache = DiskCache(tmp_path / "cache", max_bytes=50)
+    path = cache.put("a", make_file(incoming, "a", 40))
+    pinned, _ = cache.get("a", pin=True)
+    cache.put("b", make_file(incoming, "b", 40))
+
+    assert cache.get("a") is None
+    assert pinned.exists(), "Evicted file is still being served"
+    cache.release(pinned)
+    assert not path.exists()
+
+def test_put_pin_survives_replacement(tmp_path, incoming):
+    cache = DiskCache(tmp_path / "cache", max_bytes=100)
+    old = cache.put("a", make_file(incoming, "a.mp4", 10), pin=True)
+    new = cache.put("a", make_file(incoming, "a.m4a", 10))
+
+    assert old.exists()
+    cache.release(old)
+    assert not old.exists()
+    assert new.exists()
+
+def test_access_times_saved_lazily(tmp_path, incoming):
+    directory = tmp_path / "cache"
+    cache = DiskCache(directory, max_bytes=100, save_interval=3600)
+    cache.put("a", make_file(incoming, "a", 10))
+    saved = (directory / "index.json").read_text()
+
+    cache.get("a")
+    assert (directory / "index.json").read_text() == saved
+    cache.flush()
+    assert (directory / "index.json").read_text() != saved
+
+def test_exclusive_directory(tmp_path, incoming):
+    directory = tmp_path / "cache"
+    cache = DiskCache(directory, max_bytes=100, exclusive=True)
+    path = cache.put("a", make_file(incoming, "a", 10))
+
+    with pytest.raises(DirectoryInUseError):
+        DiskCache(directory, max_bytes=100, exclusive=True)
+    assert path.exists(), "A refused second opener must not clean up files"
+
+    cache.close()
+    reopened = DiskCache(directory, max_bytes=100, exclusive=True)
+    assert reopened.get("a") == (path, {})
+    reopened.close()
@@ -0,0 +1,78 @@
+import pytest
+from infra.fair_queue import FairQueue
+
+def drain_order(queue):
+    order = []
+    while (item := queue.pop()) is not None:
+        key, value = item
+        order.append(value)
+        queue.done(key)
+    return order
+
+def test_single_key_is_fifo():
+    queue = FairQueue()
+    for n in range(5):
+        queue.push("a", n)
+    assert drain_order(queue) == [0, 1, 2, 3, 4]
+    assert len(queue) == 0
+
+def test_round_robin_across_keys():
+    queue = FairQueue()
+    for n in range(4):
+        queue.push("bulk", f"bulk-{n}")
+    queue.push("small", "small-0")
+    queue.push("other", "other-0")
+    assert drain_order(queue) == ["bulk-0", "small-0", "other-0", "bulk-1", "bulk-2", "bulk-3"]
+
+def test_quantum():
+    queue = FairQueue(quantum=2)
+    for n in range(3):
+        queue.push("a", f"a{n}")
+        queue.push("b", f"b{n}")
+    assert drain_order(queue) == ["a0", "a1", "b0", "b1", "a2", "b2"]
+
+def test_max_in_flight_skips_busy_keys():
+    queue = FairQueue(max_in_flight=1)
+    queue.push("a", "a0")
+    queue.push("a", "a1")
+    queue.push("b", "b0")
+
+    assert queue.pop() == ("a", "a0")
+    assert queue.pop() == ("b", "b0")
+    assert queue.pop() is None, "a is at its cap"
+    assert queue.in_flight("a") == 1
+
+    queue.done("a")
+    assert queue.pop() == ("a", "a1")
+
+def test_depth_and_keys():
+    queue = FairQueue()
+    queue.push("a", 1)
+    queue.push("a", 2)
+    queue.push("b", 3)
+    assert queue.depth("a") == 2
+    assert queue.depth("missing") == 0
+    key, _ = queue.pop()
+    queue.pop()
+    queue.pop()
+    assert queue.keys() == {"a", "b"}, "Keys with in-flight items are still known"
+    queue.done("a")
+    queue.done("a")
+    queue.done("b")
+    assert queue.keys() == set()
+
+def test_drain():
+    queue = FairQueue()
+    queue.push("a", 1)
+    queue.push("b", 2)
+    queue.pop()
+    assert queue.drain() == [("b", 2)]
+    assert len(queue) == 0
+    assert queue.pop() is None
+    assert queue.in_flight("a") == 1
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        FairQueue(quantum=0)
+    with pytest.raises(ValueError):
+        FairQueue(max_in_flight=0)
@@ -0,0 +1,45 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+from infra.limiter import RateLimiter
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    limiter = RateLimiter(max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with limiter:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_requests_per_minute():
+    limiter = RateLimiter(max_concurrency=10, requests_per_minute=2)
+    now = 1000.0
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        nonlocal now
+        sleeps.append(seconds)
+        now += seconds
+
+    with patch("infra.limiter.time.monotonic", side_effect=lambda: now), \
+            patch("infra.limiter.asyncio.sleep", fake_sleep):
+        for _ in range(3):
+            async with limiter:
+                pass
+
+    # Third call has to wait for the first to leave the 60s window
+    assert sleeps == [60]
+
+def test_invalid_concurrency():
+    with pytest.raises(ValueError):
+        RateLimiter(max_concurrency=0)
@@ -0,0 +1,39 @@
+import pytest
+from infra.local_storage import LocalFileStorage
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalFileStorage(str(tmp_path / "storage"))
+
+@pytest.mark.asyncio
+async def test_write_read_delete(storage):
+    await storage.write("transcription:title", b"Hello, disk!")
+    assert await storage.read("transcription:title") == b"Hello, disk!"
+
+    await storage.delete("transcription:title")
+    with pytest.raises(FileNotFoundError):
+        await storage.read("transcription:title")
+
+@pytest.mark.asyncio
+async def test_file_and_stream_round_trip(storage, tmp_path):
+    source = tmp_path / "source.mp4"
+    source.write_bytes(bytes(range(256)) * 4096)
+
+    await storage.write_file("parts/title-part1", str(source))
+    await storage.read_to_file("parts/title-part1", str(tmp_path / "copy.mp4"))
+    assert (tmp_path / "copy.mp4").read_bytes() == source.read_bytes()
+
+    await storage.write_stream("streamed", (bytes([i]) * 1000 for i in range(10)))
+    assert await storage.read("streamed") == b"".join(bytes([i]) * 1000 for i in range(10))
+
+@pytest.mark.asyncio
+async def test_open_stream_range(storage):
+    await storage.write("ranged", bytes(range(256)))
+
+    chunks = [chunk async for chunk in storage.open_stream("ranged", offset=10, length=5)]
+    assert b"".join(chunks) == bytes(range(10, 15))
+
+@pytest.mark.asyncio
+async def test_rejects_paths_outside_root(storage):
+    with pytest.raises(ValueError):
+        await storage.write("../escape", b"data")
@@ -0,0 +1,59 @@
+import sys
+import pytest
+import asyncio
+import subprocess
+from unittest.mock import patch
+from infra.media import MediaRunner
+
+def python(code):
+    return [sys.executable, '-c', code]
+
+@pytest.mark.asyncio
+async def test_run_returns_stdout():
+    runner = MediaRunner()
+    assert await runner.run(python("print('ok')")) == b'ok\n'
+
+@pytest.mark.asyncio
+async def test_failure_captures_stderr():
+    runner = MediaRunner()
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        await runner.run(python("import sys; sys.stderr.write('boom'); sys.exit(3)"))
+    assert exc_info.value.returncode == 3
+    assert exc_info.value.stderr == b'boom'
+
+@pytest.mark.asyncio
+async def test_timeout_kills_process():
+    runner = MediaRunner(timeout=0.2)
+    with pytest.raises(subprocess.TimeoutExpired):
+        await runner.run(python("import time; time.sleep(10)"))
+
+@pytest.mark.asyncio
+async def test_process_cap():
+    runner = MediaRunner(max_processes=2)
+    active = 0
+    peak = 0
+    original = asyncio.create_subprocess_exec
+
+    async def tracked(*args, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        process = await original(*args, **kwargs)
+        original_wait = process.communicate
+
+        async def communicate():
+            nonlocal active
+            try:
+                return await original_wait()
+            finally:
+                active -= 1
+
+        process.communicate = communicate
+        return process
+
+    with patch("infra.media.asyncio.create_subprocess_exec", tracked):
+        await asyncio.gather(*(
+            runner.run(python("import time; time.sleep(0.1)")) for _ in range(5)
+        ))
+
+    assert peak == 2
@@ -0,0 +1,55 @@
+import pytest
+import asyncio
+from prometheus_client import REGISTRY
+from infra.cache import TTLCache
+from infra.metrics import register_cache, track_stage
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+@pytest.mark.asyncio
+async def test_stage_success_records_time_and_bytes():
+    before = sample('youtube_downloader_stage_seconds_count', stage='test_ok', outcome='success')
+
+    with track_stage('test_ok') as stage:
+        await asyncio.sleep(0.01)
+        stage.bytes = 1024
+
+    assert sample('youtube_downloader_stage_seconds_count', stage='test_ok', outcome='success') == before + 1
+    assert sample('youtube_downloader_stage_seconds_sum', stage='test_ok', outcome='success') >= 0.01
+    assert sample('youtube_downloader_stage_bytes_total', stage='test_ok', outcome='success') >= 1024
+    assert sample('youtube_downloader_stage_bytes_per_second_count', stage='test_ok') >= 1
+
+@pytest.mark.asyncio
+async def test_stage_outcomes():
+    with pytest.raises(ValueError):
+        with track_stage('test_outcome'):
+            raise ValueError("ffmpeg failed")
+
+    async def cancelled():
+        with track_stage('test_outcome'):
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(cancelled())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert sample('youtube_downloader_stage_seconds_count', stage='test_outcome', outcome='error') == 1
+    assert sample('youtube_downloader_stage_seconds_count', stage='test_outcome', outcome='cancelled') == 1
+    assert sample('youtube_downloader_stage_seconds_count', stage='test_outcome', outcome='success') == 0
+
+def test_registered_cache_is_exported():
+    cache = TTLCache(max_size=100, sizeof=len)
+    register_cache('test', cache)
+    cache.set('a', b'x' * 60)
+    cache.set('b', b'x' * 60)
+    cache.get('a')
+    cache.get('b')
+
+    assert sample('youtube_downloader_cache_hits_total', cache='test') == 1
+    assert sample('youtube_downloader_cache_misses_total', cache='test') == 1
+    assert sample('youtube_downloader_cache_evictions_total', cache='test') == 1
+    assert sample('youtube_downloader_cache_size', cache='test') == 60
+    assert sample('youtube_downloader_cache_entries', cache='test') == 1
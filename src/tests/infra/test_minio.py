@@ -47,3 +47,53 @@ async def test_delete_non_existent_file(minio_storage):
         await minio_storage.delete("non-existent-file.txt")
     except Exception as e:
         pytest.fail(f"Unexpected exception: {e}")
+
+@pytest.mark.asyncio
+async def test_write_file(minio_storage, tmp_path):
+    local_path = tmp_path / "upload.bin"
+    data = b"x" * (1024 * 1024)
+    local_path.write_bytes(data)
+
+    await minio_storage.write_file("test-upload.bin", str(local_path))
+    assert await minio_storage.read("test-upload.bin") == data
+
+    await minio_storage.delete("test-upload.bin")
+
+@pytest.mark.asyncio
+async def test_write_stream(minio_storage):
+    chunks = [b"Hello, ", b"", b"streamed ", b"MinIO!"]
+
+    await minio_storage.write_stream("test-stream.txt", iter(chunks))
+    assert await minio_storage.read("test-stream.txt") == b"Hello, streamed MinIO!"
+
+    await minio_storage.write_stream("test-stream.txt", chunks, length=22)
+    assert await minio_storage.read("test-stream.txt") == b"Hello, streamed MinIO!"
+
+    await minio_storage.delete("test-stream.txt")
+
+@pytest.mark.asyncio
+async def test_read_to_file(minio_storage, tmp_path):
+    data = b"0123456789" * 300000
+    await minio_storage.write("test-download.bin", data)
+
+    local_path = tmp_path / "download.bin"
+    await minio_storage.read_to_file("test-download.bin", str(local_path))
+    assert local_path.read_bytes() == data
+
+    await minio_storage.delete("test-download.bin")
+
+@pytest.mark.asyncio
+async def test_open_stream_range(minio_storage):
+    data = b"0123456789" * 300000
+    await minio_storage.write("test-range.bin", data)
+
+    chunks = [chunk async for chunk in minio_storage.open_stream("test-range.bin")]
+    assert b"".join(chunks) == data
+    assert len(chunks) > 1
+
+    ranged = b"".join([
+        chunk async for chunk in minio_storage.open_stream("test-range.bin", offset=5, length=12)
+    ])
+    assert ranged == data[5:17]
+
+    await minio_storage.delete("test-range.bin")
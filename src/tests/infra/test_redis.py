@@ -1,9 +1,19 @@
 import json
 import pytest
 import asyncio
+import time
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
-from infra.redis import RedisEventStore
+from prometheus_client import REGISTRY
+from infra.redis import (
+    SCHEMA_VERSION,
+    BackpressureError,
+    RedisEventStore,
+    StreamLimits,
+    decode_message,
+    decode_messages,
+    encode_event
+)
 from infra.core_types import Event
 
 @pytest.fixture
@@ -140,14 +150,76 @@ async def test_event_acknowledgment(event_store, test_event):
 
 # Error cases
 @pytest.mark.asyncio
-async def test_handler_error(event_store, test_event):
+async def test_handler_error(redis_client, test_event):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        max_attempts=2,
+        retry_base_delay=0.05
+    )
+    calls = []
     async def failing_handler(event):
+        calls.append(event)
         raise ValueError("Handler failed")
-    
-    await event_store.write_event(test_event)
-    
-    with pytest.raises(ValueError, match="Handler failed"):
-        await event_store.process_events(failing_handler)
+
+    await store.write_event(test_event)
+    task = asyncio.create_task(store.process_events(failing_handler))
+    for _ in range(50):
+        if await redis_client.xlen(store.dead_letter_stream):
+            break
+        await asyncio.sleep(0.1)
+    store._running = False
+    await task
+
+    assert len(calls) == 2, "Should retry once before giving up"
+    dead = await redis_client.xrange(store.dead_letter_stream)
+    assert len(dead) == 1
+    fields = dead[0][1]
+    assert fields[b'error'] == b"ValueError: Handler failed"
+    assert fields[b'attempts'] == b"2"
+    assert json.loads(fields[b'data']) == test_event.data
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+    assert await redis_client.zcard(store.retry_key) == 0
+
+@pytest.mark.asyncio
+async def test_failures_do_not_block_other_messages(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        max_attempts=3,
+        retry_base_delay=0.05
+    )
+    attempts = {}
+    processed = []
+    async def flaky_handler(event):
+        attempts[event.id] = attempts.get(event.id, 0) + 1
+        if event.data['n'] == 0 and attempts[event.id] < 3:
+            raise RuntimeError("Try again")
+        processed.append(event.data['n'])
+        if len(processed) == 3:
+            store._running = False
+
+    for n in range(3):
+        await store.write_event(Event(id=f"id-{n}", name="transcriptions_created", data={'n': n}))
+    await asyncio.wait_for(store.process_events(flaky_handler), timeout=10)
+
+    assert processed == [1, 2, 0], "Healthy messages should not wait for the retry"
+    assert await redis_client.xlen(store.dead_letter_stream) == 0
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+
+def test_retry_delay_backs_off(event_store):
+    store = RedisEventStore(
+        redis=event_store.redis,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        retry_base_delay=1.0,
+        retry_max_delay=10.0
+    )
+    assert [store.retry_delay(n) for n in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 10.0]
 
 @pytest.mark.asyncio
 async def test_missing_group_creation(event_store, test_event):
@@ -328,6 +400,566 @@ async def test_process_events_with_invalid_json(event_store):
         event_store._running = False
     
     task = asyncio.create_task(event_store.process_events(handler))
-    
-    with pytest.raises(json.JSONDecodeError):
-        await asyncio.wait_for(task, timeout=2.0)
+    await asyncio.sleep(0.1)
+    await event_store.write_event(Event(id="valid-id", name="transcriptions_created", data={}))
+    await asyncio.wait_for(task, timeout=2.0)
+
+    assert [event.data for event in processed] == [{}]
+    dead = await event_store.redis.xrange(event_store.dead_letter_stream)
+    assert len(dead) == 1
+    assert dead[0][1][b'data'] == b'invalid{json'
+    assert dead[0][1][b'error'].startswith(b'JSONDecodeError')
+
+@pytest.mark.asyncio
+async def test_concurrent_processing(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        max_concurrency=3
+    )
+    active = 0
+    peak = 0
+    processed = []
+    release = asyncio.Event()
+
+    async def handler(event):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await release.wait()
+        active -= 1
+        processed.append(event)
+        if len(processed) == 5:
+            store._running = False
+
+    task = asyncio.create_task(store.process_events(handler))
+    await asyncio.sleep(0.1)
+
+    for i in range(5):
+        await store.write_event(Event(id=f"test-{i}", name="transcriptions_created", data={"count": i}, meta={}))
+
+    await asyncio.sleep(0.5)
+    assert peak == 3, "Should run up to max_concurrency handlers at once"
+
+    release.set()
+    await asyncio.wait_for(task, timeout=2.0)
+
+    assert len(processed) == 5
+    pending = await redis_client.xpending_range(
+        name=store.stream_name,
+        groupname=store.service_name,
+        min='-',
+        max='+',
+        count=10
+    )
+    assert len(pending) == 0, "Each message should be acked after its handler"
+
+@pytest.mark.asyncio
+async def test_write_events(event_store):
+    events = [Event(id=f"bulk-{i}", name="transcriptions_created", data={"count": i}, meta={}) for i in range(3)]
+
+    msg_ids = await event_store.write_events(events)
+
+    assert len(msg_ids) == 3
+    messages = await event_store.redis.xrange("transcriptions_created")
+    assert [message_id.decode() for message_id, _ in messages] == msg_ids
+    assert await event_store.write_events([]) == []
+
+@pytest.mark.asyncio
+async def test_batched_acks(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        max_concurrency=5,
+        ack_batch_size=3,
+        ack_interval=60
+    )
+    processed = []
+    acks = []
+    xack = redis_client.xack
+
+    async def counting_xack(*args):
+        acks.append(args[2:])
+        return await xack(*args)
+
+    async def handler(event):
+        processed.append(event)
+        if len(processed) == 4:
+            store._running = False
+
+    redis_client.xack = counting_xack
+    await store.write_events([
+        Event(id=f"test-{i}", name="transcriptions_created", data={"count": i}, meta={})
+        for i in range(4)
+    ])
+    await asyncio.wait_for(store.process_events(handler), timeout=2.0)
+
+    # One full batch of 3, then the remainder flushed on shutdown
+    assert [len(ids) for ids in acks] == [3, 1]
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+
+@pytest.mark.asyncio
+async def test_ack_interval_flushes_partial_batch(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        ack_batch_size=10,
+        ack_interval=0.1
+    )
+
+    async def handler(event):
+        pass
+
+    task = asyncio.create_task(store.process_events(handler))
+    await store.write_event(Event(id="test", name="transcriptions_created", data={}, meta={}))
+    await asyncio.sleep(0.5)
+
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0, "Partial batch should be acked after ack_interval"
+    store._running = False
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+@pytest.mark.asyncio
+async def test_publish_results_with_ack(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="youtube_audio_requested",
+        service_name="test_service",
+        publish_results=True
+    )
+
+    async def handler(event):
+        store._running = False
+        return Event(id="out", name="transcriptions_created", data=[{"title": "t"}], meta=event.meta)
+
+    await store.write_event(Event(id="in", name="youtube_audio_requested", data={"url": "u"}, meta={"request_id": "r"}))
+    await asyncio.wait_for(store.process_events(handler), timeout=2.0)
+
+    published = await redis_client.xrange("transcriptions_created")
+    assert len(published) == 1
+    assert json.loads(published[0][1][b'meta']) == {"request_id": "r"}
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+
+def test_default_consumer_names_are_unique(redis_client):
+    stores = [
+        RedisEventStore(redis=redis_client, event_name="transcriptions_created", service_name="test_service")
+        for _ in range(2)
+    ]
+    # Stores sharing a name would re-run each other's in-flight messages
+    assert stores[0].consumer_name != stores[1].consumer_name
+
+@pytest.mark.asyncio
+async def test_restart_resumes_own_pending(redis_client, test_event):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        consumer_name="worker-1"
+    )
+    await store.ensure_consumer_group()
+    await store.write_event(test_event)
+    # A previous run of worker-1 received the message and died before acking it
+    await redis_client.xreadgroup("test_service", "worker-1", {"transcriptions_created": ">"})
+
+    processed = []
+
+    async def handler(event):
+        processed.append(event)
+        store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=2.0)
+
+    assert [event.data for event in processed] == [test_event.data]
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+
+@pytest.mark.asyncio
+async def test_claims_stalled_messages(redis_client, test_event):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        consumer_name="worker-2",
+        claim_min_idle=0.2,
+        retry_max_delay=0.1,
+        claim_interval=0.1
+    )
+    await store.ensure_consumer_group()
+    await store.write_event(test_event)
+    # worker-1 received the message and went away
+    await redis_client.xreadgroup("test_service", "worker-1", {"transcriptions_created": ">"})
+
+    processed = []
+
+    async def handler(event):
+        processed.append(event)
+        store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=2.0)
+
+    assert [event.data for event in processed] == [test_event.data]
+    stats = await store.pending_stats()
+    assert stats['pending'] == 0
+
+@pytest.mark.asyncio
+async def test_drained_consumers_are_removed(redis_client, test_event):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        consumer_name="worker-2",
+        claim_min_idle=0.2,
+        retry_max_delay=0.1,
+        claim_interval=0.1
+    )
+    await store.ensure_consumer_group()
+    await store.write_event(test_event)
+    # worker-1 received the message and went away
+    await redis_client.xreadgroup("test_service", "worker-1", {"transcriptions_created": ">"})
+    await store.pending_stats()
+    assert REGISTRY.get_sample_value(
+        'youtube_downloader_pending_messages', {'stream': store.stream_name, 'consumer': "worker-1"}
+    ) == 1
+
+    async def handler(event):
+        store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=2.0)
+    await store.pending_stats()
+
+    consumers = await redis_client.xinfo_consumers(store.stream_name, store.service_name)
+    assert [consumer['name'] for consumer in consumers] == [b"worker-2"]
+    assert REGISTRY.get_sample_value(
+        'youtube_downloader_pending_messages', {'stream': store.stream_name, 'consumer': "worker-1"}
+    ) is None
+
+@pytest.mark.asyncio
+async def test_in_flight_messages_are_not_claimed(redis_client, test_event):
+    stores = [
+        RedisEventStore(
+            redis=redis_client,
+            event_name="transcriptions_created",
+            service_name="test_service",
+            consumer_name=f"worker-{i}",
+            claim_min_idle=0.3,
+            retry_max_delay=0.1,
+            claim_interval=0.1
+        )
+        for i in range(2)
+    ]
+    processed = []
+
+    async def handler(event):
+        processed.append(event)
+        # Outlives claim_min_idle several times over
+        await asyncio.sleep(1.0)
+
+    tasks = [asyncio.create_task(store.process_events(handler)) for store in stores]
+    await asyncio.sleep(0.1)
+    await stores[0].write_event(test_event)
+    await asyncio.sleep(1.5)
+    for store in stores:
+        store._running = False
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=6.0)
+
+    assert len(processed) == 1, "A message being handled should not be claimed by another consumer"
+
+@pytest.mark.asyncio
+async def test_pending_stats(event_store, redis_client, test_event):
+    await event_store.ensure_consumer_group()
+    await event_store.write_event(test_event)
+    await redis_client.xreadgroup("test_service", "worker-1", {"transcriptions_created": ">"})
+
+    stats = await event_store.pending_stats()
+
+    assert stats['pending'] == 1
+    assert stats['consumers'] == {"worker-1": 1}
+    assert stats['oldest_idle'] >= 0
+
+def raw_entry(message_id, event, codec=None):
+    fields = encode_event(event, codec)
+    return message_id.encode(), {
+        key.encode(): value if isinstance(value, bytes) else str(value).encode()
+        for key, value in fields.items()
+    }
+
+def test_encode_event_versions_entries(test_event):
+    fields = encode_event(test_event)
+    assert fields['v'] == SCHEMA_VERSION
+    assert 'codec' not in fields, "JSON entries keep the plain layout"
+    assert json.loads(fields['data']) == test_event.data
+
+def test_decode_legacy_entry():
+    event = decode_message(b'1-0', {
+        b'name': b'transcriptions_created',
+        b'data': b'{"title": "Test"}',
+        b'meta': b'null',
+        b'timestamp': b'2024-01-01T00:00:00Z'
+    })
+    assert event == Event(
+        id='1-0',
+        name='transcriptions_created',
+        data={'title': 'Test'},
+        timestamp='2024-01-01T00:00:00Z'
+    )
+
+def test_decode_rejects_newer_schema(test_event):
+    message_id, data = raw_entry('1-0', test_event)
+    data[b'v'] = str(SCHEMA_VERSION + 1).encode()
+    with pytest.raises(ValueError, match="schema version"):
+        decode_message(message_id, data)
+
+def test_decode_messages_batch(test_event):
+    entries = [
+        raw_entry(f'1-{n}', Event(id='', name='transcriptions_created', data={'n': n}, meta={'request_id': n}))
+        for n in range(5)
+    ]
+    events, failures = decode_messages(entries)
+    assert failures == []
+    assert [event.data['n'] for event in events] == list(range(5))
+    assert [event.meta['request_id'] for event in events] == list(range(5))
+    assert events[2].id == '1-2'
+
+def test_decode_messages_isolates_bad_entries(test_event):
+    good = raw_entry('1-0', test_event)
+    bad = raw_entry('1-1', test_event)
+    bad[1][b'data'] = b'invalid{json'
+    deleted = (b'1-2', {})
+    events, failures = decode_messages([good, bad, deleted, raw_entry('1-3', test_event)])
+    assert [event.id for event in events] == ['1-0', '1-3']
+    assert len(failures) == 1
+    assert failures[0][0] == bad
+    assert isinstance(failures[0][1], json.JSONDecodeError)
+
+def test_decode_messages_comma_payload_stays_in_its_entry(test_event):
+    smuggled = raw_entry('1-0', test_event)
+    smuggled[1][b'data'] = b'{"a":1},{"evil":1}'
+    events, failures = decode_messages([smuggled, raw_entry('2-0', test_event)])
+    assert [event.id for event in events] == ['2-0']
+    assert events[0].data == test_event.data
+    assert failures[0][0] == smuggled
+
+@pytest.mark.asyncio
+async def test_msgpack_codec_round_trip(redis_client, test_event):
+    pytest.importorskip("msgpack")
+    from infra.codec import get_codec
+    producer = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="producer",
+        codec=get_codec("msgpack")
+    )
+    consumer = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service"
+    )
+    await consumer.ensure_consumer_group()
+    await producer.write_event(test_event)
+    events = await consumer._read_events(10, block=100)
+    assert [event.data for event in events] == [test_event.data]
+
+def test_stream_limits_xadd_args():
+    assert StreamLimits().xadd_args() == {}
+    assert StreamLimits(max_len=1000).xadd_args() == {'maxlen': 1000, 'approximate': True}
+    args = StreamLimits(max_age=60).xadd_args()
+    assert args['approximate'] is True
+    cutoff = int(args['minid'].split('-')[0])
+    assert abs(cutoff - (time.time() - 60) * 1000) < 5000
+    with pytest.raises(ValueError):
+        StreamLimits(max_len=10, max_age=60)
+    with pytest.raises(ValueError):
+        StreamLimits(overload='drop')
+
+@pytest.mark.asyncio
+async def test_writes_trim_stream(redis_client):
+    store = RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        stream_limits={"transcriptions_created": StreamLimits(max_len=100)}
+    )
+    for first in range(0, 1000, 100):
+        await store.write_events([
+            Event(id=f"id-{n}", name="transcriptions_created", data={'n': n})
+            for n in range(first, first + 100)
+        ])
+    # Approximate trimming only drops whole nodes, so the length overshoots
+    assert await redis_client.xlen("transcriptions_created") < 500
+
+@pytest.mark.asyncio
+async def test_backlog(event_store, test_event):
+    assert await event_store.backlog(event_store.stream_name) == 0
+    await event_store.ensure_consumer_group()
+    for _ in range(3):
+        await event_store.write_event(test_event)
+    assert await event_store.backlog(event_store.stream_name) == 3
+    await event_store._read_events(2, block=100)
+    # Delivered but unacked messages still count
+    assert await event_store.backlog(event_store.stream_name) == 3
+
+def limited_store(redis_client, **limits):
+    return RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        stream_limits={"transcriptions_created": StreamLimits(max_backlog=2, **limits)},
+        backlog_check_interval=0.05
+    )
+
+@pytest.mark.asyncio
+async def test_backpressure_rejects(redis_client, test_event):
+    store = limited_store(redis_client)
+    await store.ensure_consumer_group()
+    await store.write_events([test_event, test_event])
+    store._backlogs.clear()
+    with pytest.raises(BackpressureError) as error:
+        await store.write_event(test_event)
+    assert error.value.backlog == 2
+    assert await redis_client.xlen("transcriptions_created") == 2
+
+@pytest.mark.asyncio
+async def test_backpressure_sheds(redis_client, test_event):
+    store = limited_store(redis_client, overload='shed')
+    await store.ensure_consumer_group()
+    await store.write_events([test_event, test_event])
+    store._backlogs.clear()
+    assert await store.write_event(test_event) is None
+    assert await store.write_events([test_event]) == []
+    assert await redis_client.xlen("transcriptions_created") == 2
+
+@pytest.mark.asyncio
+async def test_backpressure_delays_until_drained(redis_client, test_event):
+    store = limited_store(redis_client, overload='delay', overload_timeout=5)
+    await store.ensure_consumer_group()
+    await store.write_events([test_event, test_event])
+    store._backlogs.clear()
+
+    write = asyncio.create_task(store.write_event(test_event))
+    await asyncio.sleep(0.2)
+    assert not write.done()
+    entries = await store._read_entries(2, block=100)
+    await redis_client.xack(store.stream_name, store.service_name, *[message_id for message_id, _ in entries])
+    assert await asyncio.wait_for(write, timeout=2)
+
+@pytest.mark.asyncio
+async def test_backpressure_delay_times_out(redis_client, test_event):
+    store = limited_store(redis_client, overload='delay', overload_timeout=0.2)
+    await store.ensure_consumer_group()
+    await store.write_events([test_event, test_event])
+    store._backlogs.clear()
+    with pytest.raises(BackpressureError):
+        await store.write_event(test_event)
+
+@pytest.mark.asyncio
+async def test_trimmed_pending_messages_are_acked(event_store, test_event):
+    await event_store.ensure_consumer_group()
+    message_id = await event_store.write_event(test_event)
+    await event_store._read_events(1, block=100)
+    await event_store.redis.xdel(event_store.stream_name, message_id)
+
+    assert await event_store._read_events(1, start='0') == []
+    pending = await event_store.redis.xpending(event_store.stream_name, event_store.service_name)
+    assert pending['pending'] == 0
+
+def tenant_event(tenant, n):
+    return Event(
+        id="",
+        name="transcriptions_created",
+        data={'n': n},
+        meta={'tenant_id': tenant, 'request_id': f"{tenant}-{n}"}
+    )
+
+def tenant_store(redis_client, **options):
+    return RedisEventStore(
+        redis=redis_client,
+        event_name="transcriptions_created",
+        service_name="test_service",
+        tenant_key=lambda event: event.meta.get('tenant_id'),
+        **options
+    )
+
+@pytest.mark.asyncio
+async def test_tenants_are_served_round_robin(redis_client):
+    store = tenant_store(redis_client, prefetch=20)
+    await store.ensure_consumer_group()
+    await store.write_events(
+        [tenant_event("bulk", n) for n in range(6)] + [tenant_event("small", n) for n in range(2)]
+    )
+    order = []
+    async def handler(event):
+        order.append(event.meta['request_id'])
+        if len(order) == 8:
+            store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=5)
+
+    assert order[:4] == ["bulk-0", "small-0", "bulk-1", "small-1"]
+    assert sorted(order) == sorted([f"bulk-{n}" for n in range(6)] + ["small-0", "small-1"])
+
+@pytest.mark.asyncio
+async def test_tenant_concurrency_cap(redis_client):
+    store = tenant_store(redis_client, max_concurrency=4, tenant_concurrency=2, prefetch=10)
+    await store.ensure_consumer_group()
+    await store.write_events([tenant_event("bulk", n) for n in range(6)] + [tenant_event("small", 0)])
+    active = {}
+    peak = {}
+    handled = []
+    async def handler(event):
+        tenant = event.meta['tenant_id']
+        active[tenant] = active.get(tenant, 0) + 1
+        peak[tenant] = max(peak.get(tenant, 0), active[tenant])
+        await asyncio.sleep(0.05)
+        active[tenant] -= 1
+        handled.append(event)
+        if len(handled) == 7:
+            store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=5)
+
+    assert peak == {"bulk": 2, "small": 1}
+
+@pytest.mark.asyncio
+async def test_bulk_tenant_is_deferred_behind_others(redis_client):
+    store = tenant_store(redis_client, prefetch=2, tenant_prefetch=2)
+    await store.ensure_consumer_group()
+    await store.write_events(
+        [tenant_event("small", 0)] + [tenant_event("bulk", n) for n in range(20)] + [tenant_event("small", 1)]
+    )
+    order = []
+    async def handler(event):
+        order.append(event.meta['request_id'])
+        # The small tenant is still being served while the bulk one is read
+        await asyncio.sleep(0.2 if event.meta['tenant_id'] == "small" else 0.01)
+        if len(order) == 22:
+            store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=10)
+
+    assert order.index("small-1") < 5, "The small tenant shouldn't wait for the whole bulk submission"
+    assert sorted(order) == sorted([f"bulk-{n}" for n in range(20)] + ["small-0", "small-1"])
+    pending = await redis_client.xpending(store.stream_name, store.service_name)
+    assert pending['pending'] == 0
+
+@pytest.mark.asyncio
+async def test_single_tenant_is_never_deferred(redis_client):
+    store = tenant_store(redis_client, prefetch=10, tenant_prefetch=4)
+    await store.ensure_consumer_group()
+    await store.write_events([tenant_event("bulk", n) for n in range(20)])
+    order = []
+    async def handler(event):
+        order.append(event.meta['request_id'])
+        if len(order) == 20:
+            store._running = False
+
+    await asyncio.wait_for(store.process_events(handler), timeout=5)
+
+    # Nothing re-added: same order, no new entries
+    assert order == [f"bulk-{n}" for n in range(20)]
+    assert await redis_client.xlen(store.stream_name) == 20
@@ -0,0 +1,132 @@
+import json
+import pytest
+import asyncio
+from redis.asyncio import Redis
+from infra.single_flight import SingleFlight
+
+@pytest.fixture
+async def redis_client():
+    client = Redis(
+        host='0.0.0.0',
+        port=6379,
+        decode_responses=False
+    )
+    yield client
+    await client.flushall()
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {'parts': [calls]}
+
+    results = await asyncio.gather(*(flight.do('video', fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result == {'parts': [1]} for result in results)
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 4}
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def fetch(key):
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(
+        flight.do('a', lambda: fetch('a')),
+        flight.do('b', lambda: fetch('b'))
+    )
+
+    assert results == ['a', 'b']
+    assert flight.leaders == 2
+
+@pytest.mark.asyncio
+async def test_error_is_shared_and_not_remembered():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("download failed")
+
+    results = await asyncio.gather(
+        *(flight.do('video', fail) for _ in range(3)),
+        return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # A later call runs again instead of reusing the failure
+    with pytest.raises(ValueError):
+        await flight.do('video', fail)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_follower_cancel_does_not_cancel_leader():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    leader = asyncio.create_task(flight.do('video', fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do('video', fetch))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+
+    assert await leader == 'done'
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+
+@pytest.mark.asyncio
+async def test_coalesces_across_workers(redis_client):
+    # Two instances stand in for two worker processes
+    workers = [SingleFlight(redis_client, poll_interval=0.01) for _ in range(2)]
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return [{'path': 'title', 'title': 'title.mp4'}]
+
+    results = await asyncio.gather(*(
+        worker.do('video', fetch, encode=json.dumps, decode=json.loads)
+        for worker in workers
+    ))
+
+    assert calls == 1
+    assert results[0] == results[1] == [{'path': 'title', 'title': 'title.mp4'}]
+    assert await redis_client.get('singleflight:video:lock') is None
+
+@pytest.mark.asyncio
+async def test_waiting_worker_takes_over_after_failure(redis_client):
+    workers = [SingleFlight(redis_client, poll_interval=0.01) for _ in range(2)]
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        if calls == 1:
+            raise ValueError("download failed")
+        return ['ok']
+
+    results = await asyncio.gather(
+        *(worker.do('video', fetch, encode=json.dumps, decode=json.loads) for worker in workers),
+        return_exceptions=True
+    )
+
+    assert calls == 2
+    assert sorted(map(repr, results)) == sorted([repr(ValueError("download failed")), repr(['ok'])])
@@ -0,0 +1,89 @@
+import os
+import pytest
+import asyncio
+import threading
+from infra.ytdlp import YoutubeDLPool
+
+OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noprogress': True,
+    'enable_file_urls': True
+}
+
+@pytest.fixture
+def pool():
+    pool = YoutubeDLPool(workers=2)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def media_url(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(os.urandom(64 * 1024))
+    return path.as_uri()
+
+@pytest.mark.asyncio
+async def test_concurrent_downloads_reuse_instances(pool, media_url, tmp_path):
+    outputs = [str(tmp_path / f"out{i}.mp4") for i in range(4)]
+
+    infos = await asyncio.gather(*(
+        pool.extract_info(media_url, OPTS, outtmpl=output) for output in outputs
+    ))
+
+    assert all(info['id'] == 'clip' for info in infos)
+    for output in outputs:
+        assert os.path.getsize(output) == 64 * 1024
+    # One warm instance per worker thread, not one per job
+    assert len(pool._instances) <= pool.workers
+
+@pytest.mark.asyncio
+async def test_progress_bridged_to_loop(pool, media_url, tmp_path):
+    statuses = []
+
+    def on_progress(status):
+        statuses.append((threading.current_thread(), status['status']))
+
+    await pool.extract_info(
+        media_url,
+        OPTS,
+        outtmpl=str(tmp_path / "out.mp4"),
+        on_progress=on_progress
+    )
+    await asyncio.sleep(0)
+
+    assert statuses
+    assert all(thread is threading.main_thread() for thread, _ in statuses)
+    assert statuses[-1][1] == 'finished'
+
+@pytest.mark.asyncio
+async def test_close_does_not_wait_for_running_job():
+    pool = YoutubeDLPool(workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    closed = []
+
+    class BlockingYDL:
+        params = {'outtmpl': {}}
+
+        def extract_info(self, url, download=True):
+            started.set()
+            release.wait(5)
+            return {'id': url}
+
+        def close(self):
+            closed.append(self)
+
+    ydl = BlockingYDL()
+    pool._get_ydl = lambda opts: ydl
+    pool._instances.append(ydl)
+    job = asyncio.create_task(pool.extract_info('video', OPTS))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+    pool.close()
+    # The running job keeps its instance until it finishes
+    assert closed == []
+
+    release.set()
+    assert await job == {'id': 'video'}
+    assert closed == [ydl]
@@ -0,0 +1,222 @@
+import sys
+import uuid
+import httpx
+import pytest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from redis.asyncio import Redis
+from fastapi.testclient import TestClient
+import main
+from infra.cache import TTLCache
+
+# Fills the stderr pipe before writing any audio, then streams 1 MiB
+FAKE_YTDLP = (
+    "import sys\n"
+    "sys.stderr.write('progress ' * 50000)\n"
+    "sys.stderr.flush()\n"
+    "sys.stdout.buffer.write(b'a' * 1024 * 1024)\n"
+)
+
+@pytest.fixture(autouse=True)
+def info_cache(monkeypatch):
+    monkeypatch.setattr(main, 'info_cache', TTLCache(max_size=16, ttl=60))
+    monkeypatch.setattr(main, 'info_cache_redis', None)
+    monkeypatch.setattr(main, 'info_cache_redis_hits', 0)
+    return main.info_cache
+
+@pytest.fixture
+def download_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'DOWNLOAD_DIR', tmp_path / "downloads")
+    monkeypatch.setattr(main, 'INCOMING_DIR', tmp_path / "downloads" / "incoming")
+    return tmp_path / "downloads"
+
+@pytest.fixture
+def client(download_dir, monkeypatch):
+    monkeypatch.setattr(main, 'stream_command', lambda url: [sys.executable, '-c', FAKE_YTDLP])
+    # Entering the client runs the startup hook that opens the download cache
+    with TestClient(main.app) as client:
+        yield client
+
+def test_stream_with_busy_stderr(client, monkeypatch):
+    async def load_video_info(url, no_cache=False):
+        await asyncio.sleep(0.05)
+        return {'title': 'Clip'}
+    monkeypatch.setattr(main, 'load_video_info', load_video_info)
+    url = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+
+    response = client.get("/audio/download", params={"url": url, "stream": "true"})
+
+    assert response.status_code == 200
+    assert response.content == b'a' * 1024 * 1024
+    assert response.headers['content-disposition'] == "attachment; filename*=utf-8''Clip.mp4"
+    path, metadata = main.download_cache.get(main.download_cache_key(url))
+    assert metadata == {'title': 'Clip'}
+    assert path.stat().st_size == 1024 * 1024
+    assert main.pending_downloads == 0
+
+def test_stream_survives_failed_title_lookup(client, monkeypatch):
+    async def load_video_info(url, no_cache=False):
+        raise ValueError("unavailable")
+    monkeypatch.setattr(main, 'load_video_info', load_video_info)
+
+    response = client.get("/audio/download", params={"url": "https://youtu.be/abcdefghijk", "stream": "true"})
+
+    assert response.status_code == 200
+    assert response.headers['content-disposition'] == "attachment; filename*=utf-8''audio.mp4"
+
+def test_cache_hit_is_pinned_while_sent(client):
+    url = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+    source = main.INCOMING_DIR / "clip.mp4"
+    source.write_bytes(b'cached audio')
+    main.download_cache.put(main.download_cache_key(url), source, {'title': 'Clip'})
+
+    response = client.get("/audio/download", params={"url": url})
+
+    assert response.headers['x-cache'] == "HIT"
+    assert response.content == b'cached audio'
+    assert main.download_cache._pins == {}
+
+def test_each_process_gets_its_own_cache_directory(download_dir):
+    main.open_download_cache()
+    first = main.download_cache
+    try:
+        # A second process would find the directory locked
+        main.open_download_cache()
+        assert main.download_cache.directory == download_dir / "worker-1"
+        main.download_cache.close()
+    finally:
+        first.close()
+    assert first.directory == download_dir
+
+@pytest.fixture
+async def api(download_dir):
+    """Async client, so tests can hold requests open while sending others"""
+    main.open_download_cache()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    main.download_cache.close()
+
+@pytest.fixture
+def blocked_downloads(monkeypatch):
+    """One download slot and one queue slot; downloads wait for the event"""
+    release = threading.Event()
+    monkeypatch.setattr(main, 'MAX_CONCURRENT_DOWNLOADS', 1)
+    monkeypatch.setattr(main, 'MAX_QUEUED_DOWNLOADS', 1)
+    monkeypatch.setattr(main, 'download_executor', ThreadPoolExecutor(max_workers=1))
+
+    def download_audio_file(url):
+        release.wait(5)
+        path = main.INCOMING_DIR / f"{uuid.uuid4()}.mp4"
+        path.write_bytes(b'audio')
+        return path, 'Clip'
+
+    monkeypatch.setattr(main, 'download_audio_file', download_audio_file)
+    yield release
+    release.set()
+    main.download_executor.shutdown()
+
+async def wait_for_pending(count):
+    while main.pending_downloads < count:
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_downloads_beyond_the_queue_get_503(api, blocked_downloads):
+    requests = [
+        asyncio.create_task(api.get("/audio/download", params={"url": f"https://youtu.be/video{i}0000"}))
+        for i in range(2)
+    ]
+    await asyncio.wait_for(wait_for_pending(2), 1)
+
+    rejected = await api.get("/audio/download", params={"url": "https://youtu.be/video20000"})
+    assert rejected.status_code == 503
+    assert rejected.headers['retry-after'] == str(main.DOWNLOAD_RETRY_AFTER)
+
+    await asyncio.sleep(0.1)
+    blocked_downloads.set()
+    running, queued = await asyncio.gather(*requests)
+    assert running.status_code == queued.status_code == 200
+    assert running.content == b'audio'
+    # The queued download waited for the running one's worker
+    assert float(running.headers['x-queue-time']) < 0.1
+    assert float(queued.headers['x-queue-time']) >= 0.1
+    assert main.pending_downloads == 0
+
+@pytest.mark.asyncio
+async def test_info_answers_while_downloads_block(api, blocked_downloads, monkeypatch):
+    monkeypatch.setattr(main, 'fetch_video_info', lambda url: {'title': 'Clip'})
+    download = asyncio.create_task(api.get("/audio/download", params={"url": "https://youtu.be/video00000"}))
+    await asyncio.wait_for(wait_for_pending(1), 1)
+
+    info = await asyncio.wait_for(api.get("/info", params={"url": "https://youtu.be/video10000"}), 1)
+
+    assert info.json() == {'title': 'Clip'}
+    assert not download.done()
+    blocked_downloads.set()
+    assert (await download).status_code == 200
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Stub yt-dlp lookup returning a new title on every call"""
+    calls = []
+
+    def fetch_video_info(url):
+        calls.append(url)
+        return {'title': f"Clip {len(calls)}"}
+
+    monkeypatch.setattr(main, 'fetch_video_info', fetch_video_info)
+    return calls
+
+def test_info_cached_across_url_forms(client, fetched):
+    first = client.get("/info", params={"url": "https://www.youtube.com/watch?v=jNQXAC9IVRw"})
+    second = client.get("/info", params={"url": "https://youtu.be/jNQXAC9IVRw?t=1"})
+
+    assert first.json() == second.json() == {'title': 'Clip 1'}
+    assert len(fetched) == 1
+    stats = client.get("/info/cache").json()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['redis_enabled'] is False
+
+def test_info_no_cache_refreshes_entry(client, fetched):
+    url = "https://youtu.be/jNQXAC9IVRw"
+    client.get("/info", params={"url": url})
+
+    fresh = client.get("/info", params={"url": url, "no_cache": "true"})
+    cached = client.get("/info", params={"url": url})
+
+    assert fresh.json() == cached.json() == {'title': 'Clip 2'}
+    assert len(fetched) == 2
+
+def test_info_cache_expires(client, fetched):
+    url = "https://youtu.be/jNQXAC9IVRw"
+    with patch("infra.cache.time.monotonic", return_value=1000):
+        client.get("/info", params={"url": url})
+    with patch("infra.cache.time.monotonic", return_value=1059):
+        assert client.get("/info", params={"url": url}).json() == {'title': 'Clip 1'}
+    with patch("infra.cache.time.monotonic", return_value=1061):
+        assert client.get("/info", params={"url": url}).json() == {'title': 'Clip 2'}
+
+@pytest.mark.asyncio
+async def test_info_shared_through_redis(api, fetched, monkeypatch):
+    redis = Redis(host='0.0.0.0', port=6379)
+    monkeypatch.setattr(main, 'info_cache_redis', redis)
+    url = "https://youtu.be/jNQXAC9IVRw"
+    try:
+        await api.get("/info", params={"url": url})
+        assert await redis.ttl("info:Youtube:jNQXAC9IVRw") > 0
+
+        # Another replica: empty process cache, same Redis
+        monkeypatch.setattr(main, 'info_cache', TTLCache(max_size=16, ttl=60))
+        replica = await api.get("/info", params={"url": url})
+
+        assert replica.json() == {'title': 'Clip 1'}
+        assert len(fetched) == 1
+        stats = (await api.get("/info/cache")).json()
+        assert stats['redis_enabled'] is True
+        assert stats['redis_hits'] == 1
+    finally:
+        await redis.flushall()
+        await redis.aclose()
@@ -0,0 +1,37 @@
+import pytest
+from domain.constants import ServiceConfig
+from domain.handler.route_request import lane_stream
+from infra.redis import StreamLimits
+from youtube_downloader import DEAD_LETTER_STREAM, YoutubeDownloaderMicroservice
+
+@pytest.fixture
+def create_service(monkeypatch):
+    services = []
+
+    async def create(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        service = await YoutubeDownloaderMicroservice.create()
+        services.append(service)
+        return service
+
+    yield create
+    for service in services:
+        for pool in (service.deps.ytdl_pool, service.probe_pool):
+            pool.close()
+
+@pytest.mark.asyncio
+async def test_lane_streams_are_trimmed(create_service):
+    service = await create_service(PRIORITY_LANES='true', LANE_STREAM_MAX_LEN='500')
+
+    # The router writes the lane streams; each lane consumer reads its own
+    for store in [service.event_store, *service.lane_stores.values()]:
+        for lane in service.lanes:
+            assert store.stream_limits[lane_stream(lane)] == StreamLimits(max_len=500)
+            assert store._xadd_args(lane_stream(lane)) == {'maxlen': 500, 'approximate': True}
+
+@pytest.mark.asyncio
+async def test_lane_stream_trimming_can_be_disabled(create_service):
+    service = await create_service(PRIORITY_LANES='true', LANE_STREAM_MAX_LEN='0')
+
+    assert set(service.event_store.stream_limits) == {ServiceConfig.RESULT_EVENT_NAME, DEAD_LETTER_STREAM}
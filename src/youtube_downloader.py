@@ -1,13 +1,35 @@
 import os
 import asyncio
+from typing import Callable, Dict, Hashable, List, Optional
 from dotenv import load_dotenv
 from redis.asyncio import Redis
 from domain.constants import ServiceConfig
-from infra.core_types import FileStorage
+from domain.constants import DownloadCacheConfig, EventStoreConfig, FairQueueConfig, LaneConfig, MediaConfig, MetricsConfig, SingleFlightConfig, TranscriptionCacheConfig, TranscriptionLimitConfig, YtDlpConfig
+from infra.aio import gather_or_cancel
+from infra.cache import TTLCache
+from infra.codec import get_codec
+from infra.core_types import Event, FileStorage
+from infra.limiter import RateLimiter
+from infra.media import MediaRunner
+from infra.metrics import register_cache, start_metrics_server, track_stage
+from infra.single_flight import SingleFlight
+from infra.ytdlp import YoutubeDLPool
 from infra.minio import MinioFileStorage
-from infra.redis import RedisEventStore
+from infra.redis import RedisEventStore, StreamLimits
+from domain.handler.route_request import lane_stream, route_youtube_audio
 from domain.handler.transcribe_audio import process_youtube_audio
+from domain.lanes import Lane, allocate_concurrency, build_lanes
 from domain.dependencies import Dependencies
+from domain.types import TranscriptionCreatedEvent
+
+# Failures from the request stream and every lane end up here
+DEAD_LETTER_STREAM = f"{ServiceConfig.EVENT_NAME}:dead"
+
+def tenant_from_meta(meta_key: str) -> Callable[[Event], Optional[Hashable]]:
+    """Tenant key reading one field of the event meta"""
+    def tenant_key(event: Event) -> Optional[Hashable]:
+        return event.meta.get(meta_key) if isinstance(event.meta, dict) else None
+    return tenant_key
 
 class YoutubeDownloaderMicroservice:
     """
@@ -32,35 +54,225 @@ class YoutubeDownloaderMicroservice:
             secure=os.getenv('MINIO_SECURE', 'False').lower() == 'true'
         )
         
-        return YoutubeDownloaderMicroservice(redis, file_storage)
+        download_cache = TTLCache(
+            max_size=int(os.getenv('DOWNLOAD_CACHE_MAX_BYTES', DownloadCacheConfig.MAX_BYTES)),
+            ttl=int(os.getenv('DOWNLOAD_CACHE_TTL', DownloadCacheConfig.TTL)),
+            sizeof=lambda cached: cached.size
+        )
+        transcription_cache = TTLCache(
+            max_size=int(os.getenv('TRANSCRIPTION_CACHE_MAX_BYTES', TranscriptionCacheConfig.MAX_BYTES)),
+            sizeof=lambda cached: cached.size
+        )
+        transcription_limiter = RateLimiter(
+            max_concurrency=int(os.getenv('TRANSCRIPTION_CONCURRENCY', TranscriptionLimitConfig.MAX_CONCURRENCY)),
+            requests_per_minute=int(os.getenv('TRANSCRIPTION_RPM', TranscriptionLimitConfig.REQUESTS_PER_MINUTE))
+        )
+        media_runner = MediaRunner(
+            max_processes=int(os.getenv('MEDIA_MAX_PROCESSES', MediaConfig.MAX_PROCESSES)),
+            timeout=float(os.getenv('MEDIA_TIMEOUT', MediaConfig.TIMEOUT))
+        )
+        max_concurrency = int(os.getenv('MAX_CONCURRENCY', 1))
+        lanes = None
+        if os.getenv('PRIORITY_LANES', 'False').lower() == 'true':
+            lanes = build_lanes(
+                short_max=float(os.getenv('LANE_SHORT_MAX_DURATION', LaneConfig.SHORT_MAX_DURATION)),
+                medium_max=float(os.getenv('LANE_MEDIUM_MAX_DURATION', LaneConfig.MEDIUM_MAX_DURATION)),
+                weights=os.getenv('LANE_WEIGHTS', LaneConfig.WEIGHTS)
+            )
+        # With fewer yt-dlp workers than handler slots, short jobs would
+        # queue behind long downloads for a worker
+        handler_slots = sum(allocate_concurrency(max_concurrency, lanes).values()) if lanes else max_concurrency
+        ytdl_pool = YoutubeDLPool(
+            workers=int(os.getenv('YTDLP_WORKERS', max(YtDlpConfig.WORKERS, handler_slots)))
+        )
+        # Coalesce downloads across workers through Redis unless disabled
+        shared = os.getenv('SINGLE_FLIGHT_REDIS', 'True').lower() == 'true'
+        single_flight = SingleFlight(
+            redis=redis if shared else None,
+            lock_timeout=float(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', SingleFlightConfig.LOCK_TIMEOUT)),
+            result_ttl=float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', SingleFlightConfig.RESULT_TTL))
+        )
+
+        stream_limits = {}
+        result_max_len = int(os.getenv('RESULT_STREAM_MAX_LEN', EventStoreConfig.RESULT_STREAM_MAX_LEN))
+        if result_max_len:
+            stream_limits[ServiceConfig.RESULT_EVENT_NAME] = StreamLimits(max_len=result_max_len)
+        dead_letter_max_len = int(os.getenv('DEAD_LETTER_MAX_LEN', EventStoreConfig.DEAD_LETTER_MAX_LEN))
+        if dead_letter_max_len:
+            stream_limits[DEAD_LETTER_STREAM] = StreamLimits(max_len=dead_letter_max_len)
+        lane_max_len = int(os.getenv('LANE_STREAM_MAX_LEN', LaneConfig.STREAM_MAX_LEN))
+        if lanes and lane_max_len:
+            for lane in lanes:
+                stream_limits[lane_stream(lane)] = StreamLimits(max_len=lane_max_len)
+
+        return YoutubeDownloaderMicroservice(
+            redis,
+            file_storage,
+            max_concurrency=max_concurrency,
+            lanes=lanes,
+            router_concurrency=int(os.getenv('ROUTER_CONCURRENCY', LaneConfig.ROUTER_CONCURRENCY)),
+            ack_batch_size=int(os.getenv('ACK_BATCH_SIZE', EventStoreConfig.ACK_BATCH_SIZE)),
+            ack_interval=float(os.getenv('ACK_INTERVAL', EventStoreConfig.ACK_INTERVAL)),
+            publish_with_ack=os.getenv('PUBLISH_WITH_ACK', str(EventStoreConfig.PUBLISH_WITH_ACK)).lower() == 'true',
+            consumer_name=os.getenv('CONSUMER_NAME'),
+            claim_min_idle=float(os.getenv('CLAIM_MIN_IDLE', EventStoreConfig.CLAIM_MIN_IDLE)),
+            claim_interval=float(os.getenv('CLAIM_INTERVAL', EventStoreConfig.CLAIM_INTERVAL)),
+            max_attempts=int(os.getenv('MAX_ATTEMPTS', EventStoreConfig.MAX_ATTEMPTS)),
+            retry_base_delay=float(os.getenv('RETRY_BASE_DELAY', EventStoreConfig.RETRY_BASE_DELAY)),
+            retry_max_delay=float(os.getenv('RETRY_MAX_DELAY', EventStoreConfig.RETRY_MAX_DELAY)),
+            codec=os.getenv('EVENT_CODEC', EventStoreConfig.CODEC),
+            stream_limits=stream_limits,
+            tenant_meta_key=os.getenv('TENANT_META_KEY', FairQueueConfig.TENANT_META_KEY),
+            tenant_concurrency=int(os.getenv('TENANT_CONCURRENCY', FairQueueConfig.TENANT_CONCURRENCY)) or None,
+            prefetch=int(os.getenv('PREFETCH', FairQueueConfig.PREFETCH)),
+            tenant_prefetch=int(os.getenv('TENANT_PREFETCH', FairQueueConfig.TENANT_PREFETCH)) or None,
+            max_deferrals=int(os.getenv('MAX_DEFERRALS', FairQueueConfig.MAX_DEFERRALS)),
+            metrics_port=int(os.getenv('METRICS_PORT', MetricsConfig.PORT)),
+            download_cache=download_cache,
+            transcription_cache=transcription_cache,
+            transcription_limiter=transcription_limiter,
+            media_runner=media_runner,
+            ytdl_pool=ytdl_pool,
+            single_flight=single_flight
+        )
 
     def __init__(
         self,
         redis: Redis,
         file_storage: FileStorage,
+        max_concurrency: int = 1,
+        lanes: Optional[List[Lane]] = None,
+        router_concurrency: int = LaneConfig.ROUTER_CONCURRENCY,
+        ack_batch_size: int = 1,
+        ack_interval: float = 1.0,
+        publish_with_ack: bool = False,
+        consumer_name: Optional[str] = None,
+        claim_min_idle: Optional[float] = None,
+        claim_interval: float = 30.0,
+        max_attempts: int = 5,
+        retry_base_delay: float = 5.0,
+        retry_max_delay: float = 60.0,
+        codec: str = 'json',
+        stream_limits: Optional[Dict[str, StreamLimits]] = None,
+        tenant_meta_key: Optional[str] = None,
+        tenant_concurrency: Optional[int] = None,
+        prefetch: int = 0,
+        tenant_prefetch: Optional[int] = None,
+        max_deferrals: int = 1,
+        metrics_port: int = 0,
+        download_cache: Optional[TTLCache] = None,
+        transcription_cache: Optional[TTLCache] = None,
+        transcription_limiter: Optional[RateLimiter] = None,
+        media_runner: Optional[MediaRunner] = None,
+        ytdl_pool: Optional[YoutubeDLPool] = None,
+        single_flight: Optional[SingleFlight] = None,
+        probe_pool: Optional[YoutubeDLPool] = None,
     ):
         self.redis = redis
-        self.event_store = RedisEventStore(
+        self.metrics_port = metrics_port
+        self.publish_results = publish_with_ack
+        self.lanes = lanes
+        store_options = dict(
             redis=redis,
-            event_name=ServiceConfig.EVENT_NAME,
-            service_name=ServiceConfig.NAME
+            service_name=ServiceConfig.NAME,
+            ack_batch_size=ack_batch_size,
+            ack_interval=ack_interval,
+            consumer_name=consumer_name,
+            claim_min_idle=claim_min_idle,
+            claim_interval=claim_interval,
+            max_attempts=max_attempts,
+            retry_base_delay=retry_base_delay,
+            retry_max_delay=retry_max_delay,
+            codec=get_codec(codec),
+            stream_limits=stream_limits,
+            dead_letter_stream=DEAD_LETTER_STREAM,
+            tenant_key=tenant_from_meta(tenant_meta_key) if tenant_meta_key else None,
+            tenant_concurrency=tenant_concurrency,
+            prefetch=prefetch,
+            tenant_prefetch=tenant_prefetch,
+            max_deferrals=max_deferrals
         )
+        self.lane_stores: Dict[str, RedisEventStore] = {}
+        self.probe_pool = None
+        if lanes:
+            # The router publishes each lane event and acks its request
+            # atomically. Probes are quick, so it reads requests in order;
+            # fair queuing happens in the lanes, where jobs wait.
+            self.event_store = RedisEventStore(
+                event_name=ServiceConfig.EVENT_NAME,
+                max_concurrency=router_concurrency,
+                publish_results=True,
+                **{**store_options, 'tenant_key': None, 'prefetch': 0, 'tenant_prefetch': None}
+            )
+            slots = allocate_concurrency(max_concurrency, lanes)
+            self.lane_stores = {
+                lane.name: RedisEventStore(
+                    event_name=lane_stream(lane),
+                    max_concurrency=slots[lane.name],
+                    publish_results=publish_with_ack,
+                    **store_options
+                )
+                for lane in lanes
+            }
+            # Probes get their own threads so they never wait behind downloads
+            self.probe_pool = probe_pool or YoutubeDLPool(workers=router_concurrency)
+        else:
+            self.event_store = RedisEventStore(
+                event_name=ServiceConfig.EVENT_NAME,
+                max_concurrency=max_concurrency,
+                publish_results=publish_with_ack,
+                **store_options
+            )
         self.deps = Dependencies(
             file_storage=file_storage,
-            event_store=self.event_store
+            event_store=self.event_store,
+            download_cache=download_cache,
+            transcription_cache=transcription_cache,
+            transcription_limiter=transcription_limiter,
+            media_runner=media_runner,
+            ytdl_pool=ytdl_pool,
+            single_flight=single_flight
         )
+        register_cache('download', self.deps.download_cache)
+        register_cache('transcription', self.deps.transcription_cache)
+
+    async def handle_event(self, event: Event) -> Optional[TranscriptionCreatedEvent]:
+        """
+        Process one requested download, timed as the "job" stage. When the
+        event store publishes results with the ack, the output event is
+        returned to it instead of being written here.
+        """
+        with track_stage('job'):
+            out_event = await process_youtube_audio(self.deps, event, publish=not self.publish_results)
+        return out_event if self.publish_results else None
+
+    async def route_event(self, event: Event) -> Event:
+        """Probe a request's duration and hand it to its lane"""
+        return await route_youtube_audio(self.deps, event, self.lanes, self.probe_pool)
 
     async def start(self) -> None:
         """Main execution loop of the summarizer service"""
         try:
             print(f"Starting {ServiceConfig.NAME} service...")
-            await self.event_store.process_events(
-                lambda event: process_youtube_audio(self.deps, event)
-            )
+            if self.metrics_port:
+                start_metrics_server(self.metrics_port)
+                print(f"Serving metrics on port {self.metrics_port}")
+            if self.lane_stores:
+                slots = ', '.join(f"{name}: {store.max_concurrency}" for name, store in self.lane_stores.items())
+                print(f"Routing requests to priority lanes ({slots})")
+                await gather_or_cancel(
+                    self.event_store.process_events(self.route_event),
+                    *(store.process_events(self.handle_event) for store in self.lane_stores.values())
+                )
+            else:
+                await self.event_store.process_events(self.handle_event)
         except Exception as e:
             print(f"Fatal error in {ServiceConfig.NAME} service: {e}")
             raise
         finally:
+            self.deps.ytdl_pool.close()
+            if self.probe_pool is not None:
+                self.probe_pool.close()
             await self.redis.aclose()
 
 def main():